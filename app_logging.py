@@ -0,0 +1,144 @@
+"""구조화 로깅 (레벨 + 요청 상관 ID + 비밀값 가림 + 백그라운드 스레드 출력)
+
+예전에는 모든 모듈이 print로 stdout에 바로 썼다. /estimate 한 번에 payload 전체, CELL_MAP 키 목록,
+필드마다 DEBUG 줄이 동기 write로 나갔고, 어느 줄이 어느 요청의 것인지 구분할 수 없었다.
+
+- setup_logging(): 루트 로거에 QueueHandler만 붙이고 실제 출력(StreamHandler)은 QueueListener 스레드에서
+  → 요청 스레드는 큐에 넣고 바로 돌아감
+- 레벨은 LOG_LEVEL (기본 INFO → DEBUG 덤프는 꺼짐), 형식은 LOG_FORMAT: json(한 줄 JSON) / text
+- 모든 레코드에 request_id (contextvar) — HTTP 요청은 미들웨어가, 백그라운드 작업은 job id로 설정.
+  스레드풀로 넘기는 쪽(run_blocking, pipeline)은 contextvars를 복사해서 넘김
+- 큐에 넣기 전에 메시지·예외에서 api_token, Bearer/ya29 토큰, private_key 등을 가림
+- extra={"fields": {...}}로 넘긴 값은 json 형식에서 최상위 필드로 출력
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import time
+import uuid
+
+from config import LOG_LEVEL, LOG_FORMAT
+
+_request_id = contextvars.ContextVar("request_id", default="-")
+
+_SECRET_PATTERNS = [
+    (re.compile(r"-----BEGIN [A-Z ]*PRIVATE KEY-----.*?-----END [A-Z ]*PRIVATE KEY-----", re.S),
+     "[REDACTED PRIVATE KEY]"),
+    (re.compile(r"""(["']?(?:private_key|api_token|access_token|refresh_token|client_secret|password)["']?"""
+                r"""\s*[:=]\s*["']?)[^"'&\s,}]+"""), r"\1***"),
+    (re.compile(r"(Bearer\s+)[A-Za-z0-9._~+/=-]+"), r"\1***"),
+    (re.compile(r"ya29\.[A-Za-z0-9._-]+"), "ya29.***"),
+]
+
+_listener = None
+
+
+def redact(text):
+    for pattern, replacement in _SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def new_request_id():
+    return uuid.uuid4().hex[:12]
+
+
+def bind_request_id(request_id):
+    """현재 컨텍스트의 요청 ID 설정 → reset_request_id(token)로 되돌림"""
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """호출한 스레드에서 요청 ID를 붙이고 메시지를 완성해 비밀값을 가린 뒤 큐에 넣음"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.request_id = _request_id.get()
+        record.msg, record.args = redact(record.getMessage()), None
+        if record.exc_info:
+            record.exc_text = redact(logging.Formatter().formatException(record.exc_info))
+        elif record.exc_text:
+            record.exc_text = redact(record.exc_text)
+        record.exc_info = None  # traceback 객체는 큐로 넘기지 않음 (exc_text로 충분)
+        return record
+
+
+class _RequestIdFilter(logging.Filter):
+    """큐 없이 바로 출력할 때 (shutdown_logging 이후) 요청 ID·비밀값 가림을 대신 처리"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        record.msg, record.args = redact(record.getMessage()), None
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, dict):
+            entry.update(fields)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+_TEXT_FORMAT = "%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s"
+
+
+def setup_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, stream=None):
+    """루트 로거 설정 (여러 번 불러도 마지막 설정 하나만 유지)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(_TEXT_FORMAT))
+    records = queue.SimpleQueue()
+    queue_handler = _QueueHandler(records)
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=False)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """큐에 남은 레코드를 모두 출력하고 리스너 스레드 종료 → 이후 로그는 호출 스레드에서 바로 출력"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        if isinstance(h, _QueueHandler):
+            root.removeHandler(h)
+    for handler in _listener.handlers:
+        handler.addFilter(_RequestIdFilter())
+        root.addHandler(handler)
+    _listener = None
+
+
+atexit.register(shutdown_logging)
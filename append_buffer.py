@@ -0,0 +1,259 @@
+"""데이터 수집 시트 write-behind append 버퍼
+
+/collect-data는 마지막에 공용 DATA_COLLECTION_SHEET_ID에 ws.append_row(row)를 동기로 보냈다.
+요청이 몰리면 한 행짜리 append가 같은 시트에서 경합하고 사용자별 Sheets 할당량을 소모한다.
+
+- enqueue(row): 행을 로컬 SQLite 저널(append_journal)에 기록하고 바로 반환 → 요청은 Google 응답을 기다리지 않음
+- 플러시 스레드가 flush_interval마다(또는 max_rows가 쌓이면 즉시) 저널의 행을 values.append 한 번으로 전송 후 삭제
+- 여러 gunicorn 워커가 같은 저널을 쓰므로 플러시는 임대(lease)를 가진 한 워커만 → 행 순서 유지
+- 프로세스가 죽어도 행은 저널에 남아 다음 플러시(재시작 포함)에서 전송. 전송 직후 삭제 전에 죽으면
+  같은 행이 한 번 더 전송될 수 있음 (유실보다 중복을 택함)
+- 다시 보내도 실패할 행(400 등 영구 오류)이나 max_attempts를 넘게 실패한 행은 한 행씩 보내 골라낸 뒤
+  append_dead로 옮김 (stats의 dead / dead_rows) → 뒤의 행이 막히지 않음
+- 배치마다 임대를 연장하고, 임대를 잃으면 플러시 중단 (다른 워커와 같은 행을 두 번 보내지 않도록)
+- stop(): 서버 종료 시 남은 행을 모두 보내고 끝냄
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+import state_db
+from config import APPEND_FLUSH_MS, APPEND_BATCH_ROWS, APPEND_RETRY_SEC, APPEND_MAX_ATTEMPTS
+from rate_limit import is_permanent_error
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS append_journal (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        target TEXT NOT NULL,
+        row TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS append_dead (
+        id INTEGER PRIMARY KEY,
+        target TEXT NOT NULL,
+        row TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        attempts INTEGER NOT NULL,
+        last_error TEXT,
+        dead_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS append_lease (
+        target TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    """,
+]
+
+# 플러시 도중 워커가 죽었을 때 다른 워커가 임대를 넘겨받기까지의 시간
+_LEASE_SEC = 120
+
+
+class AppendBuffer:
+    """append_func(rows) -> values.append 응답, on_flushed(response, rows): 전송 후 호출 (미러 반영 등)
+
+    is_permanent(예외): 다시 보내도 실패할 오류인지 (기본: rate_limit.is_permanent_error)
+    """
+
+    def __init__(self, target, append_func, on_flushed=None, flush_interval_ms=APPEND_FLUSH_MS,
+                 max_rows=APPEND_BATCH_ROWS, retry_interval=APPEND_RETRY_SEC, max_attempts=APPEND_MAX_ATTEMPTS,
+                 is_permanent=is_permanent_error, db_path=None):
+        self.target = target
+        self.append_func = append_func
+        self.on_flushed = on_flushed
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_rows = max_rows
+        self.retry_interval = retry_interval
+        self.max_attempts = max_attempts
+        self.is_permanent = is_permanent
+        self.db_path = db_path
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._schema_ready = False
+        self._flush_lock = threading.Lock()   # 이 프로세스 안에서 플러시는 하나만
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._enqueued_since_flush = 0
+        self.flushed_rows = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_flush_at = None
+
+    def _conn(self):
+        conn = state_db.get_conn(self.db_path)
+        if not self._schema_ready:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            self._schema_ready = True
+        return conn
+
+    # --- 쓰기 ---
+
+    def enqueue(self, row):
+        """행을 저널에 기록 (커밋되면 유실되지 않음). 저널 id 반환"""
+        cur = self._conn().execute(
+            "INSERT INTO append_journal (target, row, created_at) VALUES (?, ?, ?)",
+            (self.target, json.dumps(row, ensure_ascii=False), time.time()),
+        )
+        self._enqueued_since_flush += 1
+        if self._enqueued_since_flush >= self.max_rows:
+            self._wakeup.set()
+        return cur.lastrowid
+
+    def pending(self):
+        return self._conn().execute(
+            "SELECT COUNT(*) FROM append_journal WHERE target = ?", (self.target,)).fetchone()[0]
+
+    # --- 플러시 ---
+
+    def _acquire_lease(self):
+        self._conn()
+        now = time.time()
+        with state_db.transaction(self.db_path) as conn:
+            row = conn.execute("SELECT owner, expires_at FROM append_lease WHERE target = ?", (self.target,)).fetchone()
+            if row and row["owner"] != self.owner and row["expires_at"] > now:
+                return False
+            conn.execute(
+                "INSERT INTO append_lease (target, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(target) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at",
+                (self.target, self.owner, now + _LEASE_SEC),
+            )
+            return True
+
+    def _renew_lease(self):
+        """아직 임대를 가지고 있으면 연장하고 True (만료돼 다른 워커가 넘겨받았으면 False)"""
+        return self._conn().execute(
+            "UPDATE append_lease SET expires_at = ? WHERE target = ? AND owner = ?",
+            (time.time() + _LEASE_SEC, self.target, self.owner),
+        ).rowcount == 1
+
+    def _bury(self, row_id, error):
+        """보낼 수 없는 행을 저널에서 append_dead로 옮김"""
+        with state_db.transaction(self.db_path) as conn:
+            conn.execute(
+                "INSERT INTO append_dead (id, target, row, created_at, attempts, last_error, dead_at) "
+                "SELECT id, target, row, created_at, attempts, ?, ? FROM append_journal WHERE id = ?",
+                (str(error)[:500], time.time(), row_id),
+            )
+            conn.execute("DELETE FROM append_journal WHERE id = ?", (row_id,))
+
+    def _release_lease(self):
+        self._conn().execute("DELETE FROM append_lease WHERE target = ? AND owner = ?", (self.target, self.owner))
+
+    def flush(self):
+        """저널의 행을 max_rows씩 끝까지 전송. 보낸 행 수 반환 (다른 워커가 플러시 중이면 0). 전송 실패는 예외"""
+        with self._flush_lock:
+            self._enqueued_since_flush = 0
+            if not self.pending() or not self._acquire_lease():
+                return 0
+            sent = 0
+            one_by_one = False  # 영구 오류가 난 배치는 한 행씩 보내 문제 행을 골라냄
+            try:
+                while True:
+                    if not self._renew_lease():
+                        log.warning("⚠️ [append 버퍼] 플러시 임대를 잃음 → 중단 (임대를 가진 워커가 이어서 전송)")
+                        return sent
+                    batch = self._conn().execute(
+                        "SELECT id, row, attempts FROM append_journal WHERE target = ? ORDER BY id LIMIT ?",
+                        (self.target, 1 if one_by_one else self.max_rows),
+                    ).fetchall()
+                    if not batch:
+                        return sent
+                    ids = [r["id"] for r in batch]
+                    rows = [json.loads(r["row"]) for r in batch]
+                    try:
+                        response = self.append_func(rows)
+                    except Exception as e:
+                        self.failures += 1
+                        self.last_error = str(e)
+                        self._conn().execute(
+                            f"UPDATE append_journal SET attempts = attempts + 1, last_error = ? "
+                            f"WHERE id IN ({','.join('?' * len(ids))})",
+                            [str(e)[:500], *ids],
+                        )
+                        hopeless = self.is_permanent(e) or max(r["attempts"] for r in batch) + 1 >= self.max_attempts
+                        if not hopeless:
+                            raise
+                        if len(batch) > 1:
+                            one_by_one = True
+                            continue
+                        self._bury(ids[0], e)
+                        log.error(f"❌ [append 버퍼] 보낼 수 없는 행을 dead로 옮김 (id {ids[0]}): {e}")
+                        one_by_one = False
+                        continue
+                    self._conn().execute(f"DELETE FROM append_journal WHERE id IN ({','.join('?' * len(ids))})", ids)
+                    sent += len(rows)
+                    self.flushed_rows += len(rows)
+                    self.batches += 1
+                    self.last_error = None
+                    self.last_flush_at = time.time()
+                    if self.on_flushed:
+                        try:
+                            self.on_flushed(response, rows)
+                        except Exception as e:
+                            log.warning(f"⚠️ [append 버퍼] 전송 후 처리 실패: {e}")
+            finally:
+                self._release_lease()
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name=f"append-{self.target[:8]}", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                sent = self.flush()
+                if sent:
+                    log.info(f"✅ [append 버퍼] {sent}행 전송")
+            except Exception as e:
+                log.warning(f"⚠️ [append 버퍼] 전송 실패 ({self.retry_interval}초 후 재시도): {e}")
+                self._stop.wait(self.retry_interval)
+
+    def stop(self, timeout=10):
+        """플러시 스레드를 멈추고 남은 행을 전송 (서버 종료 시). 남은 행 수 반환"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        try:
+            self.flush()
+        except Exception as e:
+            log.warning(f"⚠️ [append 버퍼] 종료 시 전송 실패 (저널에 보관, 재시작 후 전송): {e}")
+        return self.pending()
+
+    def dead_rows(self, limit=20):
+        rows = self._conn().execute(
+            "SELECT id, row, attempts, last_error, created_at, dead_at FROM append_dead WHERE target = ? "
+            "ORDER BY id DESC LIMIT ?", (self.target, limit),
+        ).fetchall()
+        return [{**dict(r), "row": json.loads(r["row"])} for r in rows]
+
+    def stats(self):
+        return {
+            "pending": self.pending(),
+            "dead": self._conn().execute(
+                "SELECT COUNT(*) FROM append_dead WHERE target = ?", (self.target,)).fetchone()[0],
+            "dead_rows": self.dead_rows(),
+            "flushed_rows": self.flushed_rows,
+            "batches": self.batches,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_flush_at": self.last_flush_at,
+        }
@@ -0,0 +1,52 @@
+"""대체 PDF 렌더링 처리량 (renders/sec) — 제품 1 / 5 / 10개
+
+    python benchmarks/bench_fallback_pdf.py [반복 횟수]
+
+- cold: 렌더링마다 폰트 등록·스타일 생성 (예전 create_test_pdf와 같은 방식)
+- warm: 프로세스당 한 번 만든 kit 재사용 (현재 프로세스)
+- pool: FallbackRenderer(workers=2) — 요청 스레드 4개가 동시에 렌더링을 맡기는 경우
+"""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fallback_pdf import FallbackRenderer, _Kit, get_kit, render_estimate_pdf  # noqa: E402
+
+
+def make_data(n_products):
+    return {
+        "estimate_number": "DLP250101-B-1",
+        "estimate_date": "2025-01-01",
+        "supplier_person": "차재원",
+        "receiver_company": "(주)경신이엔피",
+        "receiver_person": "홍길동",
+        "products": [
+            {"name": f"라벨 프린터 {i}", "detail": "상세 사양 " * 5, "qty": i + 1, "price": 1_000_000, "total": 1_000_000 * (i + 1)}
+            for i in range(n_products)
+        ],
+    }
+
+
+def rate(func, repeat):
+    t0 = time.perf_counter()
+    func(repeat)
+    return repeat / (time.perf_counter() - t0)
+
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    get_kit()
+    renderer = FallbackRenderer(workers=2, timeout=60)
+    renderer.render(make_data(1))  # 자식 프로세스 spawn/예열
+    print(f"{'products':>8} {'cold/s':>8} {'warm/s':>8} {'pool/s':>8}")
+    for n in (1, 5, 10):
+        data = make_data(n)
+        cold = rate(lambda k: [render_estimate_pdf(data, kit=_Kit()) for _ in range(k)], repeat)
+        warm = rate(lambda k: [render_estimate_pdf(data) for _ in range(k)], repeat)
+        with ThreadPoolExecutor(max_workers=4) as threads:
+            pool = rate(lambda k: list(threads.map(lambda _: renderer.render(data), range(k))), repeat)
+        print(f"{n:>8} {cold:>8.1f} {warm:>8.1f} {pool:>8.1f}")
+    renderer.shutdown()
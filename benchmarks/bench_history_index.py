@@ -0,0 +1,84 @@
+"""발행목록 검색: 선형 스캔(예전 구현) vs n-gram 색인
+
+    python benchmarks/bench_history_index.py            # 10k / 100k / 1M 행
+    python benchmarks/bench_history_index.py 10000      # 행 수 지정
+
+합성 데이터(회사명 조합 + 견적번호 + 담당자)로 색인 구축 시간과 조회 지연(p50/p95)을 비교한다.
+"""
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from history_index import HistoryIndex, norm_text  # noqa: E402
+
+WORDS = ["경신", "이엔피", "(주)", "한빛", "테크", "코리아", "전자", "정밀", "산업", "ABC", "글로벌", "바이오",
+         "솔루션", "에너지", "화학", "모터스", "디지털", "시스템", "엔지니어링", "반도체"]
+MANAGERS = ["차재원", "이훈수", "김민수", "박지영", "정우성"]
+QUERIES = [("", "경신이"), ("", "반도체정밀"), ("", "dlp2501"), ("차재원", ""), ("이훈수", "바이오"),
+           ("", "b-1234"), ("", "없는회사명"), ("", "")]
+
+
+def make_rows(n, seed=1):
+    rng = random.Random(seed)
+    rows = [["견적일자", "견적번호", "견적담당자", "수신자-회사명"]]
+    for i in range(n):
+        company = "".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+        day = f"25{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}"
+        row = ["2025-01-01", f"DLP{day}-B-{i}", rng.choice(MANAGERS), company] + [""] * 21
+        rows.append(row)
+    return rows
+
+
+def linear_search(rows, pn, qn, limit):
+    items = []
+    for row in reversed(rows[1:]):
+        number, manager, company = row[1], row[2], row[3]
+        if not number and not company:
+            continue
+        if pn and pn not in norm_text(manager):
+            continue
+        if qn and qn not in norm_text(company) and qn not in norm_text(number):
+            continue
+        items.append(number)
+        if len(items) >= limit:
+            break
+    return items
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def run(n):
+    rows = make_rows(n)
+    t0 = time.perf_counter()
+    index = HistoryIndex()
+    for i, row in enumerate(rows):
+        index.add(i + 1, row)
+    build_s = time.perf_counter() - t0
+    print(f"\n## {n:,} 행 — 색인 구축 {build_s:.1f}s")
+    print(f"{'person':<8} {'q':<12} {'linear p50/p95 ms':>20} {'index p50/p95 ms':>20}")
+    repeat = 20 if n <= 100_000 else 5
+    for person, q in QUERIES:
+        pn, qn = norm_text(person), norm_text(q)
+        expected = linear_search(rows, pn, qn, 20)
+        assert [it["number"] for it in index.search(pn, qn, 20)] == expected
+        lin = timed(lambda: linear_search(rows, pn, qn, 20), repeat)
+        idx = timed(lambda: index.search(pn, qn, 20), repeat * 10)
+        print(f"{person:<8} {q:<12} {lin[0]:>9.2f}/{lin[1]:<9.2f} {idx[0]:>9.3f}/{idx[1]:<9.3f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes:
+        run(size)
@@ -0,0 +1,105 @@
+"""PDF 전달 경로: 예전(임시 파일 + 업로드마다 다시 읽기) vs PdfArtifact(버퍼 공유 + 스트리밍 multipart)
+
+    python benchmarks/bench_pdf_pipeline.py             # 200KB / 2MB / 20MB
+    python benchmarks/bench_pdf_pipeline.py 5000000     # 바이트 수 지정
+
+네트워크 없이, export 응답을 64KB 청크로 받는 것부터 Drive 업로드 본문 읽기(googleapiclient)와
+Pipedrive multipart 본문 전송(8KB 블록으로 소켓에 쓰는 것 흉내)까지의 시간과 tracemalloc 최대 메모리를 잰다.
+"""
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import requests  # noqa: E402
+from googleapiclient.http import MediaFileUpload, MediaIoBaseUpload  # noqa: E402
+
+from pdf_artifact import PdfArtifact, scratch_dir  # noqa: E402
+
+CHUNK = 64 * 1024
+
+
+def export_chunks(size):
+    block = os.urandom(CHUNK)
+    sent = 0
+    while sent < size:
+        n = min(CHUNK, size - sent)
+        yield block[:n]
+        sent += n
+
+
+def drain(body):
+    """http.client가 파일 객체 본문을 보내는 방식 (8KB씩 read)"""
+    if isinstance(body, (bytes, bytearray)):
+        return len(body)
+    total = 0
+    while True:
+        block = body.read(8192)
+        if not block:
+            return total
+        total += len(block)
+
+
+def legacy(size, workdir):
+    content = b"".join(export_chunks(size))  # response.content
+    path = os.path.join(workdir, "애니트론견적서_회사_DLP250101-B-1.pdf")
+    with open(path, "wb") as f:
+        f.write(content)
+    del content
+    media = MediaFileUpload(path, mimetype="application/pdf")
+    drive_body = media.getbytes(0, media.size())
+    del drive_body
+    with open(path, "rb") as fh:
+        prepared = requests.Request("POST", "http://pipedrive.invalid/files",
+                                    files={"file": ("a.pdf", fh, "application/pdf")},
+                                    data={"deal_id": 1}).prepare()
+        drain(prepared.body)
+    os.remove(path)
+
+
+def streaming(size, _workdir):
+    with scratch_dir() as scratch:
+        pdf = PdfArtifact(scratch)
+        for chunk in export_chunks(size):
+            pdf.write(chunk)
+        pdf.freeze()
+        media = MediaIoBaseUpload(pdf.open(), mimetype="application/pdf",
+                                  chunksize=4 * 1024 * 1024, resumable=not pdf.in_memory)
+        if pdf.in_memory:
+            drive_body = media.getbytes(0, media.size())  # multipart 업로드는 googleapiclient가 본문을 만듦
+            del drive_body
+        else:
+            for start in range(0, media.size(), media.chunksize()):
+                media.getbytes(start, media.chunksize())
+        body, content_type = pdf.multipart_body("file", "a.pdf", fields={"deal_id": 1})
+        prepared = requests.Request("POST", "http://pipedrive.invalid/files", data=body,
+                                    headers={"Content-Type": content_type}).prepare()
+        drain(prepared.body)
+        body.close()
+
+
+def measure(func, size, workdir, repeat=5):
+    times, peaks = [], []
+    for _ in range(repeat):
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        func(size, workdir)
+        times.append((time.perf_counter() - t0) * 1000)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    times.sort()
+    return times[len(times) // 2], max(peaks)
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [200_000, 2_000_000, 20_000_000]
+    print(f"{'size':>12} {'legacy ms':>10} {'legacy peak':>12} {'stream ms':>10} {'stream peak':>12}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            lt, lp = measure(legacy, size, workdir)
+            st, sp = measure(streaming, size, workdir)
+            print(f"{size:>12,} {lt:>10.1f} {lp / 1e6:>10.1f}MB {st:>10.1f} {sp / 1e6:>10.1f}MB")
@@ -0,0 +1,85 @@
+"""견적번호 일련번호 발급기 (SQLite WAL)
+
+예전 pdf_count.json 방식은 발급마다 파일 전체를 읽고-고치고-다시 쓰는 구조라
+gunicorn 워커끼리 동시에 발급하면 같은 번호가 나가고, 파일은 날짜가 쌓이며 계속 커졌다.
+여기서는 (날짜, 범위) 카운터 한 행을 트랜잭션 안에서 원자적으로 +1 한다.
+
+- scope: "" = 하루 전체 공용 카운터 (기존 동작), 담당자 ID = 담당자별 카운터 (ESTIMATE_SEQ_PER_PERSON)
+- 조회(current_count)는 기본키 단건 SELECT — /estimate check_only 미리보기용
+- 처음 열 때 pdf_count.json 값을 가져오고(더 큰 값 유지), 보관 기간이 지난 날짜는 정리
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+import state_db
+from config import ESTIMATE_SEQ_RETENTION_DAYS
+
+log = logging.getLogger(__name__)
+
+LEGACY_COUNT_FILE = "pdf_count.json"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS estimate_seq (
+    day TEXT NOT NULL,              -- YYYY-MM-DD
+    scope TEXT NOT NULL DEFAULT '',
+    value INTEGER NOT NULL,
+    PRIMARY KEY (day, scope)
+)
+"""
+
+_initialized = set()  # 초기화(스키마/이관/정리)를 마친 DB 경로
+_init_lock = threading.Lock()
+
+
+def _conn(db_path=None):
+    conn = state_db.get_conn(db_path)
+    if db_path not in _initialized:
+        with _init_lock:
+            if db_path not in _initialized:
+                conn.execute(_SCHEMA)
+                _import_legacy(conn)
+                cutoff = time.strftime("%Y-%m-%d", time.localtime(time.time() - ESTIMATE_SEQ_RETENTION_DAYS * 86400))
+                conn.execute("DELETE FROM estimate_seq WHERE day < ?", (cutoff,))
+                _initialized.add(db_path)
+    return conn
+
+
+def _import_legacy(conn):
+    """pdf_count.json → estimate_seq 이관 (여러 번 실행돼도 큰 값만 유지)"""
+    if not os.path.exists(LEGACY_COUNT_FILE):
+        return
+    try:
+        with open(LEGACY_COUNT_FILE, "r", encoding="utf-8") as f:
+            legacy = json.load(f)
+        conn.executemany(
+            "INSERT INTO estimate_seq (day, scope, value) VALUES (?, '', ?) "
+            "ON CONFLICT(day, scope) DO UPDATE SET value = MAX(value, excluded.value)",
+            [(day, int(count)) for day, count in legacy.items()],
+        )
+    except Exception as e:
+        log.warning(f"⚠️ pdf_count.json 이관 실패 (무시): {e}")
+
+
+def next_number(day, scope="", db_path=None):
+    """day(YYYY-MM-DD)·scope의 다음 번호를 원자적으로 발급 (1부터)"""
+    _conn(db_path)
+    with state_db.transaction(db_path) as conn:
+        conn.execute(
+            "INSERT INTO estimate_seq (day, scope, value) VALUES (?, ?, 1) "
+            "ON CONFLICT(day, scope) DO UPDATE SET value = value + 1",
+            (day, scope),
+        )
+        return conn.execute(
+            "SELECT value FROM estimate_seq WHERE day = ? AND scope = ?", (day, scope)
+        ).fetchone()[0]
+
+
+def current_count(day, scope="", db_path=None):
+    """지금까지 발급된 번호 수 (발급 없음 = 0)"""
+    row = _conn(db_path).execute(
+        "SELECT value FROM estimate_seq WHERE day = ? AND scope = ?", (day, scope)
+    ).fetchone()
+    return row[0] if row else 0
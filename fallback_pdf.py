@@ -0,0 +1,222 @@
+"""reportlab 대체 견적서 PDF 렌더러 (Google export 실패 시)
+
+예전 create_test_pdf는 호출마다 reportlab 모듈 import, STSong-Light CID 폰트 등록,
+ParagraphStyle/TableStyle 생성을 다시 하고, 요청 스레드에서 CPU를 쓰며 렌더링했다.
+
+- 폰트·스타일·표 스타일은 프로세스당 한 번만 만든 묶음(kit)을 재사용
+- 렌더링은 작은 프로세스 풀에서 실행 → 서버 워커의 GIL을 잡지 않음 (FALLBACK_PDF_WORKERS=0이면 현재 프로세스)
+- render_estimate_pdf(data)는 dict → PDF bytes 순수 함수라 풀 작업으로 그대로 넘길 수 있음
+"""
+import io
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import FALLBACK_PDF_WORKERS, FALLBACK_PDF_TIMEOUT
+
+log = logging.getLogger(__name__)
+
+_kit = None
+_kit_lock = threading.Lock()
+
+
+class _Kit:
+    """폰트 등록 + 스타일/표 스타일 (렌더링마다 공유, 읽기 전용)"""
+
+    def __init__(self):
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_CENTER
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.platypus import TableStyle
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+
+        # 한글 폰트 등록
+        try:
+            pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
+            font = 'STSong-Light'
+        except Exception as e:
+            log.warning(f"한글 폰트 등록 실패: {e}")
+            font = 'Helvetica'
+        self.font = font
+
+        styles = getSampleStyleSheet()
+        self.title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontName=font,
+            fontSize=18,
+            spaceAfter=30,
+            alignment=TA_CENTER,
+            textColor=colors.HexColor('#21808c')
+        )
+        self.basic_style = TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
+            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#21808c')),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, -1), font),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ])
+        self.product_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#21808c')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, -1), font),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('ALIGN', (2, 1), (2, -1), 'LEFT'),  # 상세정보는 왼쪽 정렬
+        ])
+        self.summary_style = TableStyle([
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#21808c')),
+            ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, -1), font),
+            ('FONTSIZE', (0, 0), (-1, -1), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ])
+
+
+def get_kit():
+    global _kit
+    if _kit is None:
+        with _kit_lock:
+            if _kit is None:
+                _kit = _Kit()
+    return _kit
+
+
+def _warm():
+    get_kit()  # 풀 작업 결과로 kit을 돌려보내지 않도록 (pickle 불필요)
+
+
+def _product_type(product):
+    product_type = product.get('type', '')
+    if not product_type:
+        name = product.get('name', '')
+        if '라벨' in name or '프린터' in name:
+            product_type = '프린터'
+        elif '패키징' in name:
+            product_type = '장비'
+        else:
+            product_type = '기타'
+    return product_type
+
+
+def render_estimate_pdf(data, kit=None):
+    """견적 데이터(dict) → PDF bytes"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import cm
+    from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+
+    kit = kit or get_kit()
+    out = io.BytesIO()
+    doc = SimpleDocTemplate(out, pagesize=A4)
+    story = [
+        Paragraph(f"견적서 - {data.get('estimate_number', '')}", kit.title_style),
+        Spacer(1, 20),
+    ]
+
+    # 기본 정보 테이블
+    basic_info = [
+        ['견적일자', data.get('estimate_date', '')],
+        ['견적번호', data.get('estimate_number', '')],
+        ['공급자', '(주)바이텍테크놀로지'],
+        ['담당자', data.get('supplier_person', '')],
+        ['수신자 회사', data.get('receiver_company', '')],
+        ['수신자 담당자', data.get('receiver_person', '')],
+        ['납기일', data.get('delivery_date', '')],
+        ['제품교육', data.get('product_training', '')]
+    ]
+    basic_table = Table(basic_info, colWidths=[3*cm, 12*cm])
+    basic_table.setStyle(kit.basic_style)
+    story += [basic_table, Spacer(1, 20)]
+
+    # 제품 정보 테이블 (제품명이 있는 경우만)
+    products = data.get('products', [])
+    product_data = [['구분', '제품명', '상세정보', '수량', '단가(원)', '합계(원)']]
+    for product in products:
+        if product.get('name'):
+            product_data.append([
+                _product_type(product),
+                product.get('name', ''),
+                product.get('detail', ''),
+                str(product.get('qty', '1')),
+                f"{product.get('price', 0):,}",
+                f"{product.get('total', 0):,}"
+            ])
+    if len(product_data) > 1:
+        product_table = Table(product_data, colWidths=[2*cm, 3*cm, 4*cm, 1.5*cm, 2.5*cm, 2*cm])
+        product_table.setStyle(kit.product_style)
+        story += [product_table, Spacer(1, 20)]
+
+    # 합계 테이블
+    total_sum = sum(product.get("total", 0) for product in products if product.get("total"))
+    vat = round(total_sum * 0.1)
+    final_total = total_sum + vat
+    summary_table = Table([
+        ['공급가액', f"{total_sum:,}원"],
+        ['부가세 (10%)', f"{vat:,}원"],
+        ['총액', f"{final_total:,}원"]
+    ], colWidths=[4*cm, 4*cm])
+    summary_table.setStyle(kit.summary_style)
+    story.append(summary_table)
+
+    doc.build(story)
+    return out.getvalue()
+
+
+class FallbackRenderer:
+    """render_estimate_pdf를 프로세스 풀에서 실행 (풀 생성 실패/비활성이면 현재 프로세스에서)"""
+
+    def __init__(self, workers=FALLBACK_PDF_WORKERS, timeout=FALLBACK_PDF_TIMEOUT):
+        self.workers = workers
+        self.timeout = timeout
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._pool is None:
+                # 서버 워커는 스레드가 많아 fork가 위험 → spawn, 자식은 시작 시 kit을 미리 만들어 둠
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_warm,
+                )
+            return self._pool
+
+    def warm(self):
+        """서버 시작 시 자식 프로세스를 미리 띄움 (첫 대체 렌더링이 spawn을 기다리지 않도록)"""
+        pool = self._get_pool()
+        if pool is None:
+            _warm()
+        else:
+            pool.submit(_warm)
+
+    def render(self, data, renderer=render_estimate_pdf):
+        """renderer(data) → bytes 실행 (풀로 넘기므로 모듈 최상위 함수여야 함 — 예: local_pdf.render_estimate_local)"""
+        pool = self._get_pool()
+        if pool is None:
+            return renderer(data)
+        try:
+            return pool.submit(renderer, data).result(timeout=self.timeout)
+        except BrokenProcessPool:
+            # 자식 프로세스가 죽었으면 다음 요청을 위해 풀을 새로 만들고 이번 건은 현재 프로세스에서
+            with self._lock:
+                self._pool = None
+            log.warning("⚠️ [대체 PDF] 프로세스 풀 중단 → 현재 프로세스에서 렌더링")
+            return renderer(data)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
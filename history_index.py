@@ -0,0 +1,126 @@
+"""발행목록 검색용 문자 n-gram 역색인
+
+/estimate-history는 예전에 조회마다 모든 행의 회사명/견적번호/담당자에 정규식 정규화(norm_text)를
+다시 돌려 부분일치를 검사했다. 여기서는 행이 들어올 때 한 번만 정규화하고,
+정규화 문자열의 2-gram·3-gram → 행 번호 목록(postings, 오름차순 = 오래된 순) 색인을 만든다.
+
+조회는 검색어의 n-gram 중 가장 짧은 postings 목록을 최신 행부터 훑으면서
+나머지 n-gram이 모두 들어있는지(부분일치)를 미리 정규화해 둔 문자열로 확인하고,
+limit건을 채우면 바로 멈춘다. 1글자 검색어는 n-gram이 없으므로 정규화된 문자열을 최신순으로 스캔.
+"""
+import bisect
+import re
+import threading
+from collections import defaultdict
+
+from search_text import norm_text
+
+_FILE_ID = re.compile(r"/d/([a-zA-Z0-9_-]+)")
+
+
+def ngrams(s):
+    """2-gram + 3-gram 집합"""
+    grams = set()
+    for n in (2, 3):
+        for i in range(len(s) - n + 1):
+            grams.add(s[i:i + n])
+    return grams
+
+
+def _query_grams(q):
+    """검색어는 가능한 한 선택성이 높은 3-gram 사용 (2글자면 2-gram)"""
+    n = 3 if len(q) >= 3 else 2
+    return {q[i:i + n] for i in range(len(q) - n + 1)}
+
+
+def _add_posting(postings, row_number):
+    # 행은 대부분 오름차순으로 들어오므로 append, 늦게 도착한 행만 중간 삽입
+    if not postings or postings[-1] < row_number:
+        postings.append(row_number)
+    else:
+        i = bisect.bisect_left(postings, row_number)
+        if i == len(postings) or postings[i] != row_number:
+            postings.insert(i, row_number)
+
+
+class HistoryIndex:
+    """SheetMirror 리스너로 붙여 쓰는 색인 (add / rebuild), 조회는 search"""
+
+    def __init__(self, header_rows=1):
+        self.header_rows = header_rows
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._docs = {}                          # 행 번호 -> (정규화 번호, 정규화 담당자, 정규화 회사, 응답 item)
+            self._rows = []                          # 색인된 행 번호 (오름차순)
+            self._text_postings = defaultdict(list)  # 회사명(D)+견적번호(B) n-gram
+            self._manager_postings = defaultdict(list)  # 담당자(C) n-gram
+
+    def rebuild(self, rows):
+        """rows: [(행 번호, 행)] 로 새 색인을 따로 만든 뒤 잠금 한 번에 교체 (전체 재동기화용)
+
+        reset() 후 add()를 반복하면 재구성하는 동안 search가 빈/일부 결과를 돌려줌 → 그동안은 이전 색인으로 응답
+        """
+        fresh = HistoryIndex(self.header_rows)
+        for row_number, row in rows:
+            fresh.add(row_number, row)
+        with self._lock:
+            self._docs, self._rows = fresh._docs, fresh._rows
+            self._text_postings, self._manager_postings = fresh._text_postings, fresh._manager_postings
+
+    def add(self, row_number, row):
+        """행 추가/교체. 교체 시 이전 postings는 남지만 search의 부분일치 확인에서 걸러짐"""
+        if row_number <= self.header_rows:
+            return
+        r = list(row) + [""] * max(0, 25 - len(row))
+        date_s, number, manager, company = r[0], r[1], r[2], r[3]
+        if not number and not company:
+            return
+        m = _FILE_ID.search(r[22] or "")  # W열(견적파일 엑셀 링크)에서 파일 ID 추출
+        item = {
+            "date": date_s,
+            "number": number,
+            "manager": manager,
+            "company": company,
+            "total": r[19],          # T열: 최종견적(VAT포함)
+            "file_id": m.group(1) if m else "",
+            "deal_id": r[24],        # Y열: Pipedrive 거래 ID
+        }
+        nn, mn, cn = norm_text(number), norm_text(manager), norm_text(company)
+        with self._lock:
+            if row_number not in self._docs:
+                _add_posting(self._rows, row_number)
+            self._docs[row_number] = (nn, mn, cn, item)
+            for gram in ngrams(cn) | ngrams(nn):
+                _add_posting(self._text_postings[gram], row_number)
+            for gram in ngrams(mn):
+                _add_posting(self._manager_postings[gram], row_number)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def search(self, pn, qn, limit):
+        """정규화된 담당자(pn)·검색어(qn)로 최신순 최대 limit건 (빈 값은 필터 없음)"""
+        with self._lock:
+            candidates = self._rows
+            for q, postings in ((qn, self._text_postings), (pn, self._manager_postings)):
+                if len(q) < 2:
+                    continue
+                lists = [postings.get(g, ()) for g in _query_grams(q)]
+                shortest = min(lists, key=len)
+                if len(shortest) < len(candidates):
+                    candidates = shortest
+
+            items = []
+            for row_number in reversed(candidates):
+                nn, mn, cn, item = self._docs[row_number]
+                if pn and pn not in mn:
+                    continue
+                if qn and qn not in cn and qn not in nn:
+                    continue
+                items.append(item)
+                if len(items) >= limit:
+                    break
+            return items
@@ -0,0 +1,146 @@
+"""발행목록(데이터 수집 시트) 로컬 미러
+
+/estimate-history가 입력할 때마다 ws.get_all_values()로 시트 전체를 내려받던 것을,
+메모리에 들고 있는 행 목록으로 대신 응답한다.
+
+- 첫 조회 때 한 번 전체를 읽고, 이후에는 마지막으로 읽은 행 다음부터(새로 append된 행만) 가져옴
+- 오래되면(sync_interval) 요청은 현재 스냅샷으로 바로 응답하고 동기화는 백그라운드에서 진행
+- /collect-data가 append한 행은 응답의 updatedRange로 행 번호를 알아 즉시 반영
+- 시트를 직접 수정/삭제한 경우를 위해 full_resync_interval마다 전체를 다시 읽음
+- 백그라운드 동기화(예열 포함)는 Google 호출 background 우선순위, 요청이 기다리는 첫 동기화는 요청 우선순위
+"""
+import logging
+import re
+import threading
+import time
+
+from config import HISTORY_SYNC_SEC, HISTORY_FULL_RESYNC_SEC
+from rate_limit import background_priority
+
+log = logging.getLogger(__name__)
+
+_ROW_IN_RANGE = re.compile(r"![A-Z]+(\d+)")
+
+
+class SheetMirror:
+    """fetch_rows(start_row) -> start_row행부터 끝까지의 행 목록 (시트 1행 = row 1)"""
+
+    def __init__(self, fetch_rows, sync_interval=HISTORY_SYNC_SEC, full_resync_interval=HISTORY_FULL_RESYNC_SEC):
+        self.fetch_rows = fetch_rows
+        self.sync_interval = sync_interval
+        self.full_resync_interval = full_resync_interval
+        self._rows = []            # index = 행 번호 - 1, None = 아직 모르는 행
+        self._synced_upto = 0      # 시트에서 빈틈 없이 읽어온 마지막 행 번호
+        self._last_sync = 0.0
+        self._last_full_sync = 0.0
+        self._lock = threading.Lock()        # _rows 보호
+        self._sync_lock = threading.Lock()   # 동기화는 한 번에 하나만
+        self._listeners = []
+
+    def add_listener(self, on_row, on_rebuild=None):
+        """행이 추가/교체되면 on_row(row_number, row) 호출 (검색 색인 갱신용)
+
+        전체 재동기화 때는 on_rebuild([(row_number, row), ...])를 한 번 (없으면 행마다 on_row)
+        """
+        self._listeners.append((on_row, on_rebuild))
+
+    # --- 동기화 ---
+
+    def sync(self, full=False):
+        """새로 추가된 행만 가져오기 (full=True면 전체 다시 읽기). 가져온 행 수 반환"""
+        with self._sync_lock:
+            start = 1 if full else self._synced_upto + 1
+            rows = self.fetch_rows(start)
+            now = time.time()
+            with self._lock:
+                if full:
+                    # 새 목록을 만든 뒤 교체 → 조회 중인 요청은 이전 스냅샷을 끝까지 읽음 (색인도 on_rebuild로 통째 교체)
+                    new_rows = [list(row) for row in rows]
+                    self._rows = new_rows
+                    numbered = [(i + 1, row) for i, row in enumerate(new_rows)]
+                    for on_row, on_rebuild in self._listeners:
+                        if on_rebuild:
+                            on_rebuild(numbered)
+                        else:
+                            for row_number, row in numbered:
+                                on_row(row_number, row)
+                    self._synced_upto = len(rows)
+                    self._last_full_sync = now
+                else:
+                    for offset, row in enumerate(rows):
+                        self._set_row(start + offset, list(row))
+                    self._synced_upto = start - 1 + len(rows)
+                self._last_sync = now
+            return len(rows)
+
+    def ensure_fresh(self):
+        """첫 조회면 동기화 후 반환, 오래됐으면 백그라운드 동기화만 시작하고 바로 반환"""
+        if self._last_sync == 0:
+            with self._sync_lock:  # 시작 시 예열(warm) 중이면 끝날 때까지 대기
+                warmed = self._last_sync != 0
+            if not warmed:
+                self.sync(full=True)
+            return
+        now = time.time()
+        full = now - self._last_full_sync > self.full_resync_interval
+        if (full or now - self._last_sync > self.sync_interval) and not self._sync_lock.locked():
+            threading.Thread(target=self._background_sync, args=(full,), name="history-sync", daemon=True).start()
+
+    def warm(self):
+        """서버 시작 시 전체 동기화를 백그라운드로 미리 실행"""
+        threading.Thread(target=self._background_sync, args=(True,), name="history-warm", daemon=True).start()
+
+    def _background_sync(self, full):
+        try:
+            with background_priority():
+                self.sync(full=full)
+        except Exception as e:
+            log.warning(f"⚠️ [발행목록 미러] 동기화 실패: {e}")
+
+    # --- 즉시 반영 ---
+
+    def apply_append(self, append_response, row):
+        """append_row 응답의 updatedRange(예: 'Sheet1'!A123:Y123)로 행 번호를 찾아 바로 반영"""
+        return self.apply_append_rows(append_response, [row])
+
+    def apply_append_rows(self, append_response, rows):
+        """append_rows(여러 행) 응답 — updatedRange의 시작 행부터 차례로 반영"""
+        try:
+            updated_range = append_response["updates"]["updatedRange"]
+            first_row = int(_ROW_IN_RANGE.search(updated_range).group(1))
+        except Exception:
+            return False  # 행 번호를 모르면 다음 동기화에서 반영됨
+        with self._lock:
+            for offset, row in enumerate(rows):
+                self._set_row(first_row + offset, [("" if v is None else str(v)) for v in row])
+        return True
+
+    def _set_row(self, row_number, row):
+        if len(self._rows) < row_number:
+            self._rows.extend([None] * (row_number - len(self._rows)))
+        self._rows[row_number - 1] = row
+        self._notify(row_number, row)
+
+    def _notify(self, row_number, row):
+        for on_row, _ in self._listeners:
+            on_row(row_number, row)
+
+    # --- 조회 ---
+
+    def iter_newest_first(self, skip_header=True):
+        """(행 번호, 행) 을 최신(아래쪽)부터
+
+        목록을 복사하지 않고 호출 시점의 길이까지만 순회 (전체 재동기화는 새 목록으로 교체하므로 안전)
+        """
+        rows = self._rows
+        stop = 1 if skip_header else 0
+        for i in range(len(rows) - 1, stop - 1, -1):
+            if rows[i] is not None:
+                yield i + 1, rows[i]
+
+    def stats(self):
+        return {
+            "rows": sum(1 for r in self._rows if r is not None),
+            "synced_upto": self._synced_upto,
+            "last_sync_age_sec": round(time.time() - self._last_sync, 1) if self._last_sync else None,
+        }
@@ -0,0 +1,121 @@
+"""공용 HTTP 연결 풀 (requests 세션용 어댑터: 호스트별 풀 크기·기본 타임아웃·풀 통계)
+
+main.py의 HTTP = requests.Session()은 스레드풀 핸들러(search_deals, load_estimate)와 async 핸들러가 함께 썼고,
+호스트당 기본 10개 풀이라 동시 검색 팬아웃이 몰리면 넘친 연결은 매번 새로 열고 닫았다.
+타임아웃을 빼먹은 호출(gspread 전체 포함)은 응답이 없으면 끝없이 기다렸다.
+
+- pooled(session, name): 세션의 http/https에 PooledAdapter를 붙여 반환 (requests.Session, google AuthorizedSession 모두)
+- 호스트별 풀 크기 HTTP_POOL_MAXSIZE (기본: 블로킹·파이프라인·검색 스레드 수 합 = 워커당 동시 호출 상한)
+- 풀이 다 쓰이면 HTTP_POOL_TIMEOUT_SEC까지 빈 연결을 기다리고, 넘으면 ConnectionError (끝없이 대기하지 않음)
+- timeout을 주지 않은 호출은 (HTTP_CONNECT_TIMEOUT_SEC, HTTP_READ_TIMEOUT_SEC) 적용
+- pool_stats(): 풀(name)·호스트별 사용 중/유휴 연결 수, 대기 횟수·시간, 풀 대기 시간 초과, 새로 연 연결 수
+- HTTP/2는 쓰지 않음: requests/urllib3와 gspread·google-auth 전송 계층이 HTTP/1.1만 지원 → keep-alive 재사용으로 대신
+"""
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import EmptyPoolError
+
+from config import (
+    HTTP_POOL_CONNECTIONS, HTTP_POOL_MAXSIZE, HTTP_POOL_TIMEOUT_SEC, HTTP_CONNECT_TIMEOUT_SEC, HTTP_READ_TIMEOUT_SEC,
+)
+
+_ADAPTERS = {}  # name -> PooledAdapter
+
+
+class _PoolMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hosts = defaultdict(lambda: {"in_use": 0, "waits": 0, "wait_ms": 0.0, "pool_timeouts": 0, "opened": 0})
+
+
+def _metered(base, metrics, pool_timeout):
+    """urllib3 연결 풀에 사용 중 연결 수·대기 집계를 붙인 하위 클래스"""
+
+    class MeteredPool(base):
+        def _get_conn(self, timeout=None):
+            key = f"{self.scheme}://{self.host}:{self.port}"
+            must_wait = self.pool is not None and self.pool.empty()
+            started = time.perf_counter()
+            try:
+                conn = super()._get_conn(timeout=pool_timeout if timeout is None else timeout)
+            except EmptyPoolError:
+                with metrics.lock:
+                    metrics.hosts[key]["pool_timeouts"] += 1
+                raise
+            with metrics.lock:
+                s = metrics.hosts[key]
+                s["in_use"] += 1
+                if must_wait:
+                    s["waits"] += 1
+                    s["wait_ms"] += (time.perf_counter() - started) * 1000
+            return conn
+
+        def _put_conn(self, conn):
+            with metrics.lock:
+                s = metrics.hosts[f"{self.scheme}://{self.host}:{self.port}"]
+                s["in_use"] = max(s["in_use"] - 1, 0)
+            super()._put_conn(conn)
+
+        def _new_conn(self):
+            with metrics.lock:
+                metrics.hosts[f"{self.scheme}://{self.host}:{self.port}"]["opened"] += 1
+            return super()._new_conn()
+
+    MeteredPool.__name__ = f"Metered{base.__name__}"
+    return MeteredPool
+
+
+class PooledAdapter(HTTPAdapter):
+    def __init__(self, pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                 pool_timeout=HTTP_POOL_TIMEOUT_SEC, timeout=(HTTP_CONNECT_TIMEOUT_SEC, HTTP_READ_TIMEOUT_SEC), **kwargs):
+        self.metrics = _PoolMetrics()
+        self.pool_timeout = pool_timeout
+        self.default_timeout = timeout
+        # pool_block=True: 풀 크기를 넘는 연결을 만들었다 버리지 않고 빈 연결을 기다림 (최대 pool_timeout)
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _metered(HTTPConnectionPool, self.metrics, self.pool_timeout),
+            "https": _metered(HTTPSConnectionPool, self.metrics, self.pool_timeout),
+        }
+
+    def send(self, request, timeout=None, **kwargs):
+        try:
+            return super().send(request, timeout=self.default_timeout if timeout is None else timeout, **kwargs)
+        except EmptyPoolError as e:
+            raise requests.exceptions.ConnectionError(
+                f"HTTP 연결 풀 대기 시간 초과 ({self.pool_timeout}초, 풀 크기 {self._pool_maxsize})", request=request) from e
+
+    def stats(self):
+        idle = {}
+        for key in self.poolmanager.pools.keys():
+            pool = self.poolmanager.pools.get(key)
+            if pool is None or pool.pool is None:
+                continue
+            idle[f"{pool.scheme}://{pool.host}:{pool.port}"] = sum(1 for c in list(pool.pool.queue) if c is not None)
+        with self.metrics.lock:
+            return {
+                host: {**{k: (round(v, 1) if isinstance(v, float) else v) for k, v in s.items()},
+                       "idle": idle.get(host, 0), "maxsize": self._pool_maxsize}
+                for host, s in sorted(self.metrics.hosts.items())
+            }
+
+
+def pooled(session, name, **kwargs):
+    """session에 PooledAdapter를 붙여 반환 (같은 name이면 통계가 새 어댑터로 바뀜)"""
+    adapter = PooledAdapter(**kwargs)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    _ADAPTERS[name] = adapter
+    return session
+
+
+def pool_stats():
+    return {name: adapter.stats() for name, adapter in _ADAPTERS.items()}
@@ -0,0 +1,151 @@
+"""/collect-data 백그라운드 작업 큐
+
+요청 payload를 SQLite(jobs 테이블)에 저장하고 job id를 즉시 반환한 뒤,
+워커 스레드 풀이 파이프라인을 실행하면서 단계별 진행 상황을 기록한다.
+상태가 DB에 있으므로 다른 gunicorn 워커로 들어온 /jobs/{id} 조회도 같은 결과를 본다.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+import state_db
+from app_logging import bind_request_id, reset_request_id
+from config import JOB_WORKERS, JOB_RETENTION_SEC, JOB_STALE_SEC
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    state TEXT NOT NULL,             -- queued / running / success / error
+    payload TEXT NOT NULL,
+    stages TEXT NOT NULL DEFAULT '[]',
+    result TEXT,
+    owner_pid INTEGER,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+FINISHED_STATES = ("success", "error")
+
+
+class JobQueue:
+    """runner(payload, report=...)를 백그라운드에서 실행하는 영속 작업 큐
+
+    runner는 단계가 끝날 때마다 report(stage_name, **info)를 호출하고,
+    최종적으로 {"status": "success" | "error", ...} 형태의 dict를 반환해야 한다.
+    """
+
+    def __init__(self, kind, runner, workers=JOB_WORKERS, db_path=None):
+        self.kind = kind
+        self.runner = runner
+        self.db_path = db_path
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"job-{kind}")
+        self._schema_ready = False
+
+    def _conn(self):
+        conn = state_db.get_conn(self.db_path)
+        if not self._schema_ready:
+            conn.execute(_SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def submit(self, payload):
+        """payload 저장 후 실행 예약, job id 반환"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        self._conn().execute(
+            "INSERT INTO jobs (id, kind, state, payload, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+            (job_id, self.kind, json.dumps(payload, ensure_ascii=False), now, now),
+        )
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id):
+        """작업 상태 조회 (없으면 None)"""
+        row = self._conn().execute("SELECT * FROM jobs WHERE id = ? AND kind = ?", (job_id, self.kind)).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row["id"],
+            "state": row["state"],
+            "stages": json.loads(row["stages"] or "[]"),
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+        }
+
+    def recover(self):
+        """서버 시작 시: 오래된 완료 작업 정리 + 중단된 작업 재실행 예약
+
+        running 상태로 JOB_STALE_SEC 이상 갱신이 없는 작업은 워커가 죽은 것으로 보고 재실행.
+        여러 워커가 동시에 복구해도 _run()의 원자적 선점으로 한 번만 실행된다.
+        """
+        now = time.time()
+        self._conn()
+        with state_db.transaction(self.db_path) as conn:
+            conn.execute(
+                "DELETE FROM jobs WHERE kind = ? AND state IN ('success', 'error') AND updated_at < ?",
+                (self.kind, now - JOB_RETENTION_SEC),
+            )
+            conn.execute(
+                "UPDATE jobs SET state = 'queued', updated_at = ? WHERE kind = ? AND state = 'running' AND updated_at < ?",
+                (now, self.kind, now - JOB_STALE_SEC),
+            )
+            pending = [r["id"] for r in conn.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND state = 'queued' ORDER BY created_at", (self.kind,)
+            )]
+        for job_id in pending:
+            self._executor.submit(self._run, job_id)
+        return len(pending)
+
+    def _run(self, job_id):
+        token = bind_request_id(f"job-{job_id[:8]}")  # 이 작업의 로그를 한 ID로 묶음
+        metric_tokens = metrics.begin_request(f"job:{self.kind}")  # 단계 span의 endpoint 라벨
+        try:
+            self._execute(job_id)
+        finally:
+            metrics.end_request(metric_tokens)
+            reset_request_id(token)
+
+    def _execute(self, job_id):
+        conn = self._conn()
+        claimed = conn.execute(
+            "UPDATE jobs SET state = 'running', owner_pid = ?, updated_at = ? WHERE id = ? AND state = 'queued'",
+            (os.getpid(), time.time(), job_id),
+        ).rowcount
+        if not claimed:
+            return  # 다른 워커가 이미 실행 중이거나 완료
+        payload = json.loads(conn.execute("SELECT payload FROM jobs WHERE id = ?", (job_id,)).fetchone()["payload"])
+        started = time.perf_counter()
+
+        def report(stage, **info):
+            self._record_stage(job_id, stage, round((time.perf_counter() - started) * 1000), info)
+
+        try:
+            result = self.runner(payload, report=report)
+        except Exception as e:
+            log.exception(f"[JOB] {self.kind}/{job_id} 실행 오류: {type(e).__name__}: {e}")
+            result = {"status": "error", "message": f"작업 실행 실패: {e}"}
+        state = "success" if (result or {}).get("status") == "success" else "error"
+        conn.execute(
+            "UPDATE jobs SET state = ?, result = ?, updated_at = ? WHERE id = ?",
+            (state, json.dumps(result, ensure_ascii=False, default=str), time.time(), job_id),
+        )
+        log.info(f"[JOB] {self.kind}/{job_id} 완료: {state} ({(time.perf_counter() - started):.1f}s)")
+
+    def _record_stage(self, job_id, stage, elapsed_ms, info):
+        with state_db.transaction(self.db_path) as conn:
+            row = conn.execute("SELECT stages FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            stages = json.loads(row["stages"] or "[]") if row else []
+            stages.append({"name": stage, "elapsed_ms": elapsed_ms, **info})
+            conn.execute(
+                "UPDATE jobs SET stages = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(stages, ensure_ascii=False, default=str), time.time(), job_id),
+            )
@@ -0,0 +1,278 @@
+"""CELL_MAP 기반 로컬 견적서 PDF 렌더러 (Google export 없이)
+
+/collect-data에서 가장 느리고 자주 실패하는 구간은 Google 시트 PDF export다.
+여기서는 견적서 템플릿의 격자(A~G열, 행 높이, 병합)를 그대로 옮겨 두고,
+config.CELL_MAP이 가리키는 셀 위치에 요청 값을 그려 같은 배치의 A4 PDF를 만든다.
+
+- 머리글(견적일자/번호), 공급자·수신자 블록, 제품 10행 격자(A16:G25),
+  공급가액/부가세/합계, 견적유효기간·제품교육·납기일·기타
+- 상세정보처럼 긴 값은 셀 너비에 맞춰 줄바꿈하고 해당 행 높이를 늘림 (시트의 WRAP과 같은 효과)
+- invariant=True면 생성 시각/문서 ID가 고정된 바이트 → 기준 PDF와 비교하는 회귀 테스트용
+"""
+import io
+import logging
+import re
+from datetime import datetime
+
+from config import CELL_MAP
+
+log = logging.getLogger(__name__)
+
+SUPPLIER_NAME = "(주)바이텍테크놀로지"
+
+# 템플릿 열 너비 (pt) — A4 폭 595pt에서 좌우 여백 0.5in(36pt)씩 뺀 523pt (export fitw=true와 같은 비율)
+COL_WIDTHS = {"A": 45, "B": 110, "C": 150, "D": 35, "E": 65, "F": 70, "G": 48}
+COLS = "ABCDEFG"
+ROW_HEIGHT = 18
+ROW_HEIGHTS = {1: 14, 2: 14, 3: 14, 4: 10, 7: 10, 9: 10, 14: 10, 29: 10, 31: 10}
+LAST_ROW = 34
+MARGIN = 36
+
+# 병합 셀 (왼쪽 위 → 오른쪽 아래)
+MERGES = {
+    "A1": "G3", "A8": "G8", "F5": "G5", "F6": "G6",
+    "A10": "C10", "D10": "G10",
+    "B11": "C11", "B12": "C12", "B13": "C13", "E11": "G11", "E12": "G12", "E13": "G13",
+    "E26": "E26", "F26": "G26", "F27": "G27", "F28": "G28",
+    "B30": "G30", "B32": "G32", "B33": "G33", "B34": "G34",
+}
+
+# 템플릿 고정 문구 (셀 → (문구, 스타일))
+LABELS = {
+    "A1": ("견  적  서", "title"),
+    "E5": ("견적일자", "label"), "E6": ("견적번호", "label"),
+    "A8": ("아래와 같이 견적합니다.", "note"),
+    "A10": (f"공급자  {SUPPLIER_NAME}", "head"),
+    "A11": ("담당자", "label"), "A12": ("이메일", "label"), "A13": ("연락처", "label"),
+    "D11": ("담당자", "label"), "D12": ("이메일", "label"), "D13": ("연락처", "label"),
+    "A15": ("구분", "head"), "B15": ("제품명", "head"), "C15": ("상세정보", "head"), "D15": ("수량", "head"),
+    "E15": ("단가(원)", "head"), "F15": ("합계(원)", "head"), "G15": ("비고", "head"),
+    "E26": ("공급가액", "label"), "E27": ("부가세(10%)", "label"), "E28": ("합계(VAT포함)", "head"),
+    "A30": ("견적유효기간", "label"), "A32": ("제품교육", "label"), "A33": ("납기일", "label"), "A34": ("기타", "label"),
+}
+
+# 테두리를 그리는 영역 (왼쪽 위, 오른쪽 아래)
+BOXES = [("E5", "G6"), ("A10", "C13"), ("D10", "G13"), ("A15", "G25"), ("E26", "G28"),
+         ("A30", "G30"), ("A32", "G34")]
+
+# 시트 값 쓰기(/estimate)와 같은 필드 목록 — 위치는 CELL_MAP에서
+FIELDS = ["estimate_date", "estimate_number", "supplier_person", "supplier_email", "supplier_phone",
+          "receiver_company", "receiver_person", "receiver_email", "receiver_phone",
+          "quote_validity", "delivery_date", "product_training", "extra_note"]
+PRODUCT_FIELDS = ["type", "name", "detail", "qty", "price", "total", "note"]
+NUMERIC_FIELDS = {"qty", "price", "total"}
+MAX_PRODUCTS = 10
+
+STYLES = {
+    # 이름: (굵게, 크기, 가로 정렬)
+    "title": (True, 22, "center"),
+    "head": (True, 9, "center"),
+    "label": (False, 9, "center"),
+    "note": (False, 8, "left"),
+    "value": (False, 9, "left"),
+    "number": (False, 9, "right"),
+    "total": (True, 10, "right"),
+}
+
+_ADDR = re.compile(r"^([A-Z]+)(\d+)$")
+_fonts = None
+
+
+def _has_values(product):
+    return any(product.get(f) for f in PRODUCT_FIELDS)
+
+
+def fits(data):
+    """이 렌더러로 그릴 수 있는 요청인지 (값이 있는 제품 행이 모두 템플릿 격자 10행 안에 있는지)"""
+    return not any(_has_values(p) for p in data.get("products", [])[MAX_PRODUCTS:])
+
+
+def _register_fonts():
+    """한글 CID 폰트 등록 (프로세스당 1회) — 본문 HYGothic, 제목 HYSMyeongJo"""
+    global _fonts
+    if _fonts is None:
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.cidfonts import UnicodeCIDFont
+        try:
+            pdfmetrics.registerFont(UnicodeCIDFont("HYGothic-Medium"))
+            pdfmetrics.registerFont(UnicodeCIDFont("HYSMyeongJo-Medium"))
+            _fonts = {"regular": "HYGothic-Medium", "bold": "HYGothic-Medium", "title": "HYSMyeongJo-Medium"}
+        except Exception as e:
+            log.warning(f"한글 폰트 등록 실패: {e}")
+            _fonts = {"regular": "Helvetica", "bold": "Helvetica-Bold", "title": "Helvetica-Bold"}
+    return _fonts
+
+
+def _split(addr):
+    col, row = _ADDR.match(addr).groups()
+    return col, int(row)
+
+
+def _format_number(value):
+    if value in (None, ""):
+        return ""
+    try:
+        number = float(str(value).replace(",", ""))
+    except ValueError:
+        return str(value)
+    return f"{int(number):,}" if number == int(number) else f"{number:,.2f}"
+
+
+def _clean_detail(value):
+    """/estimate의 상세정보 처리와 같게: <br> → 줄바꿈, 빈 줄 제거"""
+    value = str(value or "").replace("<br>", "\n").replace("<br/>", "\n").replace("<br />", "\n")
+    return "\n".join(line.strip() for line in value.split("\n") if line.strip())
+
+
+def cell_values(data):
+    """요청 값 → {셀 주소: (문자열, 스타일)} (CELL_MAP 기준) + 합계 셀"""
+    cells = {}
+    for key in FIELDS:
+        value = data.get(key, "")
+        if key == "estimate_date" and not value:
+            value = datetime.now().strftime("%Y-%m-%d")
+        if key in CELL_MAP and value not in (None, ""):
+            cells[CELL_MAP[key]] = (str(value), "value")
+
+    products = data.get("products", [])
+    if not fits(data):
+        # 잘라서 그리면 제품 행과 합계가 빠진 견적서가 나감 → 호출 쪽이 Google export로
+        raise ValueError(f"제품 행이 템플릿 격자({MAX_PRODUCTS}행)를 넘음: {len(products)}개")
+    for i, product in enumerate(products[:MAX_PRODUCTS]):
+        for field in PRODUCT_FIELDS:
+            value = product.get(field, "")
+            if value in (None, ""):
+                continue
+            if field == "detail":
+                value = _clean_detail(value)
+            cell_key = f"products[{i}][{field}]"
+            if cell_key in CELL_MAP:
+                if field in NUMERIC_FIELDS:
+                    cells[CELL_MAP[cell_key]] = (_format_number(value), "number")
+                else:
+                    cells[CELL_MAP[cell_key]] = (str(value), "value")
+
+    total_sum = sum(p.get("total", 0) for p in products if p.get("total"))  # 전체 제품 기준
+    vat = round(total_sum * 0.1)
+    cells["F26"] = (f"{total_sum:,}", "number")
+    cells["F27"] = (f"{vat:,}", "number")
+    cells["F28"] = (f"{total_sum + vat:,}", "total")
+    return cells
+
+
+class _Layout:
+    """열 x좌표 / 행 y좌표 (PDF 좌표: 아래쪽이 0)"""
+
+    def __init__(self, page_height, row_heights):
+        self.x = {}
+        x = MARGIN
+        for col in COLS:
+            self.x[col] = x
+            x += COL_WIDTHS[col]
+        self.right = x
+        self.top = {}
+        y = page_height - MARGIN
+        for row in range(1, LAST_ROW + 2):
+            self.top[row] = y
+            y -= row_heights.get(row, ROW_HEIGHT)
+
+    def rect(self, addr, end=None):
+        """셀(또는 병합 범위)의 (x, 아래 y, 너비, 높이)"""
+        col, row = _split(addr)
+        end_col, end_row = _split(end or MERGES.get(addr, addr))
+        x0 = self.x[col]
+        x1 = self.x[end_col] + COL_WIDTHS[end_col]
+        y_top = self.top[row]
+        y_bottom = self.top[end_row + 1]
+        return x0, y_bottom, x1 - x0, y_top - y_bottom
+
+
+def render_estimate_local(data, invariant=False):
+    """견적 데이터(dict) → PDF bytes"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.utils import simpleSplit
+    from reportlab.pdfgen import canvas
+
+    fonts = _register_fonts()
+    cells = cell_values(data)
+
+    def font_for(style):
+        bold, size, align = STYLES[style]
+        name = fonts["title"] if style == "title" else fonts["bold" if bold else "regular"]
+        return name, size, align
+
+    def lines_for(addr, text, style):
+        name, size, _ = font_for(style)
+        end = MERGES.get(addr, addr)
+        width = sum(COL_WIDTHS[c] for c in COLS[COLS.index(_split(addr)[0]):COLS.index(_split(end)[0]) + 1])
+        lines = []
+        for part in text.split("\n"):
+            lines += simpleSplit(part, name, size, width - 6) or [""]
+        return lines
+
+    # 줄바꿈된 값에 맞춰 행 높이 늘리기 (병합되지 않은 셀만)
+    row_heights = dict(ROW_HEIGHTS)
+    for addr, (text, style) in cells.items():
+        if addr in MERGES and MERGES[addr] != addr:
+            continue
+        n = len(lines_for(addr, text, style))
+        if n > 1:
+            row = _split(addr)[1]
+            needed = n * (STYLES[style][1] + 2) + 6
+            row_heights[row] = max(row_heights.get(row, ROW_HEIGHT), needed)
+
+    page_width, page_height = A4
+    layout = _Layout(page_height, row_heights)
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4, invariant=1 if invariant else 0)
+    c.setTitle(f"견적서 {data.get('estimate_number', '')}".strip())
+    c.setAuthor(SUPPLIER_NAME)
+
+    # 격자: 표 영역은 셀마다 테두리, 머리글 행 배경
+    c.setLineWidth(0.5)
+    c.setFillGray(0.9)
+    x, y, w, h = layout.rect("A15", "G15")
+    c.rect(x, y, w, h, stroke=0, fill=1)
+    x, y, w, h = layout.rect("E28", "G28")
+    c.rect(x, y, w, h, stroke=0, fill=1)
+    c.setFillGray(0)
+    for start, end in BOXES:
+        c0, r0 = _split(start)
+        c1, r1 = _split(end)
+        for row in range(r0, r1 + 1):
+            for col in COLS[COLS.index(c0):COLS.index(c1) + 1]:
+                addr = f"{col}{row}"
+                if any(_covered_by(addr, m) for m in MERGES if m != addr):
+                    continue
+                cx, cy, cw, ch = layout.rect(addr)
+                c.rect(cx, cy, cw, ch, stroke=1, fill=0)
+
+    # 글자: 고정 문구 → 요청 값
+    for addr, (text, style) in list(LABELS.items()) + list(cells.items()):
+        name, size, align = font_for(style)
+        x, y, w, h = layout.rect(addr)
+        lines = lines_for(addr, text, style)
+        leading = size + 2
+        text_top = y + h / 2 + (len(lines) * leading) / 2 - size
+        c.setFont(name, size)
+        for i, line in enumerate(lines):
+            ty = text_top - i * leading + 1
+            if align == "center":
+                c.drawCentredString(x + w / 2, ty, line)
+            elif align == "right":
+                c.drawRightString(x + w - 3, ty, line)
+            else:
+                c.drawString(x + 3, ty, line)
+
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+
+def _covered_by(addr, merge_start):
+    """addr가 merge_start에서 시작하는 병합 범위 안쪽(왼쪽 위 제외)인지"""
+    col, row = _split(addr)
+    c0, r0 = _split(merge_start)
+    c1, r1 = _split(MERGES[merge_start])
+    return (r0 <= row <= r1 and COLS.index(c0) <= COLS.index(col) <= COLS.index(c1)
+            and (col, row) != (c0, r0))
@@ -1,76 +1,136 @@
 import os
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from starlette.routing import Match
+from fastapi.responses import FileResponse, Response
 import gspread
 from config import (
     CREDS_PATH, CELL_MAP, API_HOST, API_PORT,
-    DATA_COLLECTION_SHEET_ID, DATA_COLLECTION_COLUMNS,
-    get_google_credentials, get_google_drive_folder_id
+    DATA_COLLECTION_SHEET_ID, DATA_COLLECTION_COLUMNS, BLOCKING_POOL_SIZE, PIPELINE_POOL_SIZE,
+    ESTIMATE_SHEET_GID, ESTIMATE_SEQ_PER_PERSON, PDF_EXPORT_TIMEOUT, SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL_SEC,
+    SEARCH_POOL_SIZE, SEARCH_FANOUT_CONCURRENCY, SEARCH_DEADLINE_SEC, PIPEDRIVE_SEARCH_MODE, PDF_ENGINE,
+    get_google_drive_folder_id
 )
 # 참고: get_pipedrive_config는 이 파일 하단에 정의된 버전을 사용 (config.py 버전과 중복이었음)
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaIoBaseUpload, MediaIoBaseDownload, build_http
+from google_auth_httplib2 import AuthorizedHttp
 from google.oauth2.credentials import Credentials
 from google.oauth2 import service_account
+from google.auth.transport.requests import AuthorizedSession
 import requests
 import json
 from datetime import datetime, timedelta
 import re
+import shutil
 import time
-from google.auth.transport.requests import Request as GoogleRequest
+import asyncio
+import functools
+import threading
+import uuid
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from app_logging import setup_logging, shutdown_logging, new_request_id, bind_request_id, reset_request_id
+from jobs import JobQueue, FINISHED_STATES
+from pipeline import Stage, run_stages, fan_out
+from sheets_batch import send_estimate_batch
+from template_pool import TemplatePool
+import estimate_seq
+from history_mirror import SheetMirror
+from pdf_artifact import PdfArtifact, scratch_dir
+from pdf_cache import PdfCache
+from fallback_pdf import FallbackRenderer
+from local_pdf import render_estimate_local, fits as local_pdf_fits
+from history_index import HistoryIndex
+from search_text import norm_text
+from ttl_cache import TTLCache
+from pipedrive_mirror import PipedriveMirror
+from sheet_handles import SheetHandleCache
+from append_buffer import AppendBuffer
+from rate_limit import GoogleScheduler, ScheduledHttp, background, response_status, scheduled_http_client
+from google_auth import GoogleAuth, ClockSkewProbe
+from token_manager import TokenManager
+from pipedrive_client import PipedriveClient
+from pipedrive_outbox import PipedriveOutbox
+from http_client import pooled, pool_stats
+import metrics
+
+setup_logging()  # 레벨·형식은 LOG_LEVEL / LOG_FORMAT
+log = logging.getLogger(__name__)
 
 app = FastAPI()
 
 # === Google client 전역 캐시 (요청마다 새로 만드지 않음) ===
-_GOOGLE_CREDS = None
 _GSPREAD_CLIENT = None
 _DRIVE_SERVICE = None
-
-# requests 연결 재사용 (keep-alive 활용)
-HTTP = requests.Session()
+_GOOGLE_CLIENTS_LOCK = threading.Lock()
+# 모든 Sheets/Drive 호출이 거치는 속도 제한 스케줄러 (토큰 버킷, 429/503 백오프, 요청 처리 호출 우선)
+GOOGLE_SCHEDULER = GoogleScheduler()
+# 스프레드시트/워크시트 핸들 캐시 (같은 파일을 다시 열 때 메타데이터 조회 생략)
+SHEET_HANDLES = SheetHandleCache()
+
+# 서비스 계정 정보는 서버 시작 시 한 번 파싱·검증, 시계 오차는 백그라운드에서 측정 (/health)
+GOOGLE_AUTH = GoogleAuth()
+CLOCK_PROBE = ClockSkewProbe()
+# 액세스 토큰은 만료 전 백그라운드 갱신, 동시 갱신은 하나로 합침 (get_credentials는 아래 정의)
+TOKEN_MANAGER = TokenManager(lambda: get_credentials())
+
+# requests 연결 재사용 (keep-alive 활용) — 호스트별 풀 크기·기본 타임아웃·풀 통계는 http_client.py
+HTTP = pooled(requests.Session(), "default")
+
+# 모든 Pipedrive 호출 — 속도 제한 헤더 기반 페이싱, 기본 타임아웃, 거래 캐시 (get_pipedrive_config는 아래 정의)
+PIPEDRIVE = PipedriveClient(HTTP, lambda: get_pipedrive_config())
+
+# 동기 gspread / googleapiclient / requests 호출 전용 스레드 풀.
+# async 핸들러에서 직접 호출하면 이벤트 루프가 멈춰 같은 워커의 /ping, /health까지
+# 10~30초씩 대기하게 됨 → 블로킹 구간은 모두 이 풀로 넘긴다 (크기: BLOCKING_POOL_SIZE)
+BLOCKING_EXECUTOR = ThreadPoolExecutor(max_workers=BLOCKING_POOL_SIZE, thread_name_prefix="blocking")
+
+# /collect-data 단계 그래프의 개별 단계 실행용 풀 (단계를 기다리는 조정 스레드와 분리해야 교착 없음)
+PIPELINE_EXECUTOR = ThreadPoolExecutor(max_workers=PIPELINE_POOL_SIZE, thread_name_prefix="stage")
+
+# /search-deals의 Pipedrive 검색 호출 병렬 실행용 풀 (요청당 동시 호출 수는 SEARCH_FANOUT_CONCURRENCY로 제한)
+SEARCH_EXECUTOR = ThreadPoolExecutor(max_workers=SEARCH_POOL_SIZE, thread_name_prefix="search")
+
+async def run_blocking(func, *args, **kwargs):
+    """동기 함수를 BLOCKING_EXECUTOR에서 실행하고 결과를 await"""
+    loop = asyncio.get_running_loop()
+    # 요청 ID(contextvar)가 풀 스레드의 로그에도 붙도록 현재 컨텍스트째 넘김
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(BLOCKING_EXECUTOR, functools.partial(ctx.run, func, *args, **kwargs))
 
 def get_google_clients():
     """
     creds / gspread / drive service 를 전역 캐시로 재사용.
-    만료 시에만 refresh.
+    토큰은 TOKEN_MANAGER가 만료 전에 백그라운드에서 갱신 (자격증명 객체 하나를 제자리 갱신 → 클라이언트 재생성 없음)
     """
-    global _GOOGLE_CREDS, _GSPREAD_CLIENT, _DRIVE_SERVICE
-
-    # 첫 번째 호출 시 또는 creds가 None이면 생성
-    if _GOOGLE_CREDS is None:
-        _GOOGLE_CREDS = get_credentials()
-        if not _GOOGLE_CREDS:
-            raise RuntimeError("Google credentials 로드 실패")
-        print("✅ [캐시] Google credentials 초기 생성 완료")
+    global _GSPREAD_CLIENT, _DRIVE_SERVICE
 
-    # 만료됐거나 토큰이 없으면 refresh
-    try:
-        if getattr(_GOOGLE_CREDS, "expired", False) or not getattr(_GOOGLE_CREDS, "token", None):
-            print("[캐시] creds 만료 감지 → refresh 시도...")
-            _GOOGLE_CREDS.refresh(GoogleRequest())
-            print("✅ [캐시] creds refresh 완료")
-    except Exception as e:
-        print(f"⚠️ [캐시] creds.refresh 실패: {e}")
+    creds = TOKEN_MANAGER.credentials()
 
-    # gspread 클라이언트 캐시
-    if _GSPREAD_CLIENT is None:
-        _GSPREAD_CLIENT = gspread.authorize(_GOOGLE_CREDS)
-        print("✅ [캐시] gspread client 초기 생성 완료")
+    if _GSPREAD_CLIENT is None or _DRIVE_SERVICE is None:
+        with _GOOGLE_CLIENTS_LOCK:
+            # gspread 클라이언트 캐시
+            if _GSPREAD_CLIENT is None:
+                _GSPREAD_CLIENT = gspread.authorize(creds, http_client=scheduled_http_client(GOOGLE_SCHEDULER),
+                                                    session=pooled(AuthorizedSession(creds), "sheets"))
+                log.info("✅ [캐시] gspread client 초기 생성 완료")
 
-    # drive service 캐시
-    if _DRIVE_SERVICE is None:
-        _DRIVE_SERVICE = build("drive", "v3", credentials=_GOOGLE_CREDS, cache_discovery=False)
-        print("✅ [캐시] drive service 초기 생성 완료")
+            # drive service 캐시
+            if _DRIVE_SERVICE is None:
+                http = ScheduledHttp(AuthorizedHttp(creds, http=build_http()), GOOGLE_SCHEDULER)
+                _DRIVE_SERVICE = build("drive", "v3", http=http, cache_discovery=False)
+                log.info("✅ [캐시] drive service 초기 생성 완료")
 
-    return _GOOGLE_CREDS, _GSPREAD_CLIENT, _DRIVE_SERVICE
+    return creds, _GSPREAD_CLIENT, _DRIVE_SERVICE
 
 # 서버 시작 시 시간대 정보 출력
 @app.on_event("startup")
 async def startup_event():
     import os
     import json
-    print("=== 서버 시작 이벤트 시작 ===")
+    log.info("=== 서버 시작 이벤트 시작 ===")
     
     try:
         # 시간대 환경변수 설정 (UTC로 강제)
@@ -89,49 +149,118 @@ async def startup_event():
         time_diff = current_time - utc_time
         time_diff_seconds = abs(time_diff.total_seconds())
         
-        print(f"=== 서버 시작 시간대 정보 ===")
-        print(f"현재 시간: {current_time}")
-        print(f"UTC 시간: {utc_time}")
-        print(f"시간대 환경변수 (TZ): {timezone_info}")
-        print(f"시간 차이 (초): {time_diff_seconds:.2f}초")
-        print(f"시간 차이 (분): {time_diff_seconds/60:.2f}분")
-        print(f"================================")
+        log.info(f"=== 서버 시작 시간대 정보 ===")
+        log.info(f"현재 시간: {current_time}")
+        log.info(f"UTC 시간: {utc_time}")
+        log.info(f"시간대 환경변수 (TZ): {timezone_info}")
+        log.info(f"시간 차이 (초): {time_diff_seconds:.2f}초")
+        log.info(f"시간 차이 (분): {time_diff_seconds/60:.2f}분")
+        log.info(f"================================")
         
         # 환경 변수 확인
-        print("=== 환경 변수 확인 ===")
-        print(f"PORT: {os.environ.get('PORT', 'Not set')}")
-        print(f"GOOGLE_CREDENTIALS 존재: {'GOOGLE_CREDENTIALS' in os.environ}")
-        print(f"PIPEDRIVE_API_TOKEN 존재: {'PIPEDRIVE_API_TOKEN' in os.environ}")
-        print("================================")
-        
-        # Google 자격증명을 creds.json 파일로 저장 (gspread용)
-        print("=== Google 자격증명 파일 생성 ===")
-        google_creds = os.getenv("GOOGLE_CREDENTIALS")
+        log.info("=== 환경 변수 확인 ===")
+        log.info(f"PORT: {os.environ.get('PORT', 'Not set')}")
+        log.info(f"GOOGLE_CREDENTIALS 존재: {'GOOGLE_CREDENTIALS' in os.environ}")
+        log.info(f"PIPEDRIVE_API_TOKEN 존재: {'PIPEDRIVE_API_TOKEN' in os.environ}")
+        log.info("================================")
+        
+        # Google 자격증명 파싱·검증 (네트워크 없음 — 토큰은 첫 사용 시 한 번만 발급)
+        google_creds = GOOGLE_AUTH.load()
         if google_creds:
             try:
-                # JSON 파싱하여 유효성 확인
-                creds_data = json.loads(google_creds)
-                
-                # creds.json 파일로 저장
-                with open("creds.json", "w", encoding="utf-8") as f:
-                    json.dump(creds_data, f, indent=2, ensure_ascii=False)
-                
-                print("✅ creds.json 파일 생성 완료")
-                print(f"파일 크기: {os.path.getsize('creds.json')} bytes")
-                
-            except json.JSONDecodeError as e:
-                print(f"❌ JSON 파싱 오류: {e}")
+                # creds.json 파일로 저장 (로컬 스크립트 test_gspread.py용)
+                with open(CREDS_PATH, "w", encoding="utf-8") as f:
+                    json.dump(GOOGLE_AUTH.info, f, indent=2, ensure_ascii=False)
             except Exception as e:
-                print(f"❌ creds.json 파일 생성 오류: {e}")
-        else:
-            print("❌ GOOGLE_CREDENTIALS 환경 변수가 설정되지 않음")
+                log.error(f"❌ creds.json 파일 생성 오류: {e}")
+
+        # 서버 시계 오차 측정은 백그라운드에서 (시작·요청 경로는 NTP를 기다리지 않음)
+        CLOCK_PROBE.start()
+
+        # 첫 토큰 발급과 이후 만료 전 갱신도 백그라운드에서 (첫 요청이 토큰 발급을 기다리지 않도록)
+        if google_creds:
+            TOKEN_MANAGER.start()
+
+        # 견적서 템플릿 풀 보충 스레드 시작 + 발행목록 미러 예열 (자격증명이 있을 때만)
+        if google_creds:
+            TEMPLATE_POOL.start()
+            HISTORY_MIRROR.warm()  # 발행목록 미러 예열 (첫 /estimate-history가 전체 다운로드를 기다리지 않도록)
+            COLLECT_APPENDS.start()  # 데이터 수집 행 모아서 전송 (이전 프로세스가 남긴 저널 행 포함)
+
+        # Pipedrive 반영 outbox 드레인 (이전 프로세스가 남긴 작업 포함)
+        if os.environ.get("PIPEDRIVE_API_TOKEN"):
+            PD_OUTBOX.start()
+
+        # 대체 PDF 렌더링 프로세스 미리 띄우기 (Google export 실패 시 바로 렌더링)
+        FALLBACK_RENDERER.warm()
+
+        # Pipedrive 거래/조직 미러 동기화 (/search-deals 로컬 응답용)
+        if os.environ.get("PIPEDRIVE_API_TOKEN") and PIPEDRIVE_SEARCH_MODE != "live":
+            PD_MIRROR.start()
+
+        # 이전 프로세스가 끝내지 못한 /collect-data 백그라운드 작업 재실행
+        try:
+            resumed = await run_blocking(COLLECT_JOBS.recover)
+            if resumed:
+                log.info(f"[JOB] 미완료 작업 {resumed}건 재실행 예약")
+        except Exception as e:
+            log.warning(f"⚠️ 백그라운드 작업 복구 실패: {e}")
         
-        print("=== 서버 시작 이벤트 완료 ===")
+        log.info("=== 서버 시작 이벤트 완료 ===")
         
     except Exception as e:
-        print(f"❌ 서버 시작 중 오류: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"❌ 서버 시작 중 오류: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """서버 종료 시: 저널에 남은 데이터 수집 행 전송, Pipedrive outbox 드레인 중지, 대체 PDF 렌더링 프로세스 정리"""
+    log.info("=== 서버 종료 이벤트 ===")
+    PD_OUTBOX.stop()  # 남은 작업은 DB에 보관 → 다음 시작 시 반영
+    try:
+        left = await run_blocking(COLLECT_APPENDS.stop)
+        if left:
+            log.warning(f"⚠️ [append 버퍼] 전송하지 못한 {left}행은 저널에 보관 (다음 시작 시 전송)")
+    except Exception as e:
+        log.warning(f"⚠️ append 버퍼 종료 처리 실패: {e}")
+    FALLBACK_RENDERER.shutdown()
+    shutdown_logging()  # 큐에 남은 로그 출력
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """요청마다 상관 ID 부여 (X-Request-ID 헤더가 오면 그대로 사용) → 모든 로그 줄과 응답 헤더에 포함"""
+    request_id = request.headers.get("x-request-id") or new_request_id()
+    token = bind_request_id(request_id[:64])
+    try:
+        response = await call_next(request)
+    finally:
+        reset_request_id(token)
+    response.headers["X-Request-ID"] = request_id[:64]
+    return response
+
+def _route_path(scope):
+    """요청 경로 → 라우트 템플릿 (/jobs/{job_id} 등 — 메트릭 라벨 수가 경로 값만큼 늘지 않도록)"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """요청 처리 시간을 REQUEST_SECONDS에 기록하고, 요청 중 기록된 단계 span을 Server-Timing 헤더로 반환"""
+    endpoint = _route_path(request.scope)
+    tokens = metrics.begin_request(endpoint)
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        spans = metrics.end_request(tokens)
+        metrics.REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method, status=status)
+    response.headers["Server-Timing"] = metrics.server_timing(spans, elapsed)
+    return response
 
 app.add_middleware(
     CORSMiddleware,
@@ -150,6 +279,12 @@ app.add_middleware(
 # 인터넷에 공개되던 심각한 취약점. /static은 어디서도 사용되지 않음 (전체 검색 확인).
 # 페이지 서빙은 아래 FileResponse 라우트들이 담당.
 
+# 견적번호용 담당자 ID 매핑 (A, B, C, D, E, F) - 이미지 기준
+PERSON_ID_MAP = {
+    "이훈수": "A", "차재원": "B", "하철용": "C",
+    "노재익": "D", "전준영": "E", "장진호": "F"
+}
+
 # Google Drive API 설정
 TEMPLATE_SHEET_ID = os.environ.get("TEMPLATE_SHEET_ID", "1Rf7dGonf0HgAfZ-XS3cW1Hp3V-NiOTWbt8m_qRtyzBY")
 ESTIMATE_FOLDER_ID = os.environ.get("ESTIMATE_FOLDER_ID", "1WNknyHABe-co_ypAM0uGM_Z9z_62STeS")
@@ -157,51 +292,36 @@ ESTIMATE_FOLDER_ID = os.environ.get("ESTIMATE_FOLDER_ID", "1WNknyHABe-co_ypAM0uG
 @app.get("/health")
 async def health_check():
     """헬스 체크 엔드포인트"""
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "google_credentials": GOOGLE_AUTH.stats(),
+        "google_token": TOKEN_MANAGER.stats(),
+        "clock_skew": CLOCK_PROBE.stats(),
+    }
 
 @app.get("/ping")
 async def ping():
     """핑 엔드포인트"""
     return {"message": "pong", "timestamp": datetime.now().isoformat()}
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """요청·단계별 지연 시간 히스토그램 (Prometheus 텍스트 형식, 워커 프로세스별 값)"""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 def get_credentials():
-    """Google Service Account 자격증명 가져오기"""
-    try:
-        print("자격증명 생성 중...")
-        credentials = get_google_credentials()
-        
-        if credentials:
-            print("✅ 환경변수에서 자격증명 로드 성공")
-            print(f"- 타입: {type(credentials)}")
-            
-            # 토큰 만료 확인 및 새로고침
-            try:
-                if not credentials.valid:
-                    print("토큰이 유효하지 않음, 새로고침 시도...")
-                    import google.auth.transport.requests
-                    credentials.refresh(google.auth.transport.requests.Request())
-                    print("✅ 토큰 새로고침 성공")
-                else:
-                    print("✅ 토큰이 유효함")
-            except Exception as refresh_error:
-                print(f"⚠️ 토큰 새로고침 실패: {refresh_error}")
-                # 새로고침 실패해도 계속 진행
-            
-            return credentials
-        else:
-            print("❌ 자격증명이 None입니다")
-            return None
-            
-    except Exception as e:
-        print(f"❌ 자격증명 생성 실패: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+    """Google Service Account 자격증명 가져오기 (시작 시 검증해 둔 정보로 생성, 토큰은 get_google_clients에서 발급)"""
+    credentials = GOOGLE_AUTH.credentials()
+    if not credentials:
+        log.error(f"❌ 자격증명이 None입니다: {GOOGLE_AUTH.error}")
+    return credentials
 
+@metrics.timed("template_copy", failed=lambda result: result.get("status") != "success")
 def copy_estimate_template():
     """견적서 템플릿을 복사하여 새 파일 생성"""
     try:
-        print("=== 견적서 템플릿 복사 시작 ===")
+        log.info("=== 견적서 템플릿 복사 시작 ===")
 
         creds, gc, drive_service = get_google_clients()
         service = drive_service
@@ -209,6 +329,18 @@ def copy_estimate_template():
         # 파일명 생성
         now = datetime.now()
         new_filename = f"견적서_DLP_{now.strftime('%y%m%d_%H%M%S')}"
+
+        # 미리 복사해 둔 풀에서 먼저 배포 (파일명은 첫 /estimate batchUpdate에서 변경됨)
+        pool_copy = TEMPLATE_POOL.acquire(new_filename)
+        if pool_copy:
+            log.info(f"견적서 템플릿 풀에서 배포: {new_filename} (ID: {pool_copy['file_id']})")
+            return {
+                "status": "success",
+                "file_id": pool_copy["file_id"],
+                "filename": new_filename,
+                "web_view_link": pool_copy["web_view_link"],
+                "message": "견적서 템플릿이 성공적으로 복사되었습니다."
+            }
         
         # 복사 메타데이터
         copy_metadata = {
@@ -216,9 +348,9 @@ def copy_estimate_template():
             'parents': [ESTIMATE_FOLDER_ID]
         }
         
-        print(f"템플릿 파일 ID: {TEMPLATE_SHEET_ID}")
-        print(f"대상 폴더 ID: {ESTIMATE_FOLDER_ID}")
-        print("파일 복사 시도 중...")
+        log.info(f"템플릿 파일 ID: {TEMPLATE_SHEET_ID}")
+        log.info(f"대상 폴더 ID: {ESTIMATE_FOLDER_ID}")
+        log.info("파일 복사 시도 중...")
         
         # 스프레드시트 복사 (더 강력한 오류 처리)
         try:
@@ -232,8 +364,8 @@ def copy_estimate_template():
             new_file_id = copied_file['id']
             web_view_link = copied_file.get('webViewLink', '')
             
-            print(f"견적서 템플릿 복사 완료: {new_filename} (ID: {new_file_id})")
-            print(f"웹 뷰 링크: {web_view_link}")
+            log.info(f"견적서 템플릿 복사 완료: {new_filename} (ID: {new_file_id})")
+            log.info(f"웹 뷰 링크: {web_view_link}")
             
             return {
                 "status": "success",
@@ -244,19 +376,15 @@ def copy_estimate_template():
             }
             
         except Exception as copy_error:
-            print(f"파일 복사 실패: {copy_error}")
+            log.warning(f"파일 복사 실패: {copy_error}")
             
             # 더 자세한 오류 정보 제공
             error_msg = str(copy_error)
             if "invalid_grant" in error_msg or "Invalid JWT" in error_msg:
-                print("JWT 서명 오류 감지 - 자격증명 재생성 및 재시도")
+                log.warning("JWT 서명 오류 감지 - 토큰 재발급 후 재시도")
                 try:
-                    # 캐시를 초기화하고 재생성
-                    print("캐시 초기화 후 재시도...")
-                    global _GOOGLE_CREDS, _GSPREAD_CLIENT, _DRIVE_SERVICE
-                    _GOOGLE_CREDS = None
-                    _GSPREAD_CLIENT = None
-                    _DRIVE_SERVICE = None
+                    # 토큰만 새로 발급 (동시에 실패한 요청들은 한 번의 재발급을 함께 사용, 클라이언트는 그대로)
+                    TOKEN_MANAGER.refresh(force=True)
                     creds, gc, drive_service = get_google_clients()
                     service = drive_service
                     if creds:
@@ -270,7 +398,7 @@ def copy_estimate_template():
                         new_file_id = copied_file['id']
                         web_view_link = copied_file.get('webViewLink', '')
                         
-                        print(f"재시도 성공: {new_filename} (ID: {new_file_id})")
+                        log.info(f"재시도 성공: {new_filename} (ID: {new_file_id})")
                         
                         return {
                             "status": "success",
@@ -280,7 +408,7 @@ def copy_estimate_template():
                             "message": "견적서 템플릿이 성공적으로 복사되었습니다."
                         }
                 except Exception as retry_error:
-                    print(f"재시도도 실패: {retry_error}")
+                    log.error(f"재시도도 실패: {retry_error}")
                     return {
                         "status": "error",
                         "message": f"Google 인증 오류입니다. Service Account 키를 확인해주세요. 오류: {str(copy_error)}"
@@ -302,214 +430,227 @@ def copy_estimate_template():
                 }
         
     except Exception as e:
-        print(f"견적서 템플릿 복사 중 오류: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"견적서 템플릿 복사 중 오류: {str(e)}")
         return {
             "status": "error",
             "message": f"견적서 템플릿 복사 중 오류가 발생했습니다: {str(e)}"
         }
 
-@app.post("/estimate")
-async def fill_estimate(request: Request):
-    try:
-        data = await request.json()
-
-        # 견적번호 미리보기용 확인 호출 — 실제 생성 없이 오늘 발행 카운트만 반환
-        # (이전에는 이 호출이 템플릿 복사 + 발행 카운터 증가까지 실행되는 버그가 있었음)
-        if data.get("check_only"):
-            today = datetime.now().strftime("%Y-%m-%d")
-            cnt = 0
-            try:
-                if os.path.exists("pdf_count.json"):
-                    with open("pdf_count.json", "r", encoding="utf-8") as f:
-                        cnt = json.load(f).get(today, 0)
-            except Exception as e:
-                print(f"⚠️ check_only 카운트 읽기 실패 (0으로 처리): {e}")
-            return {"status": "success", "check_only": True, "pdf_count_today": cnt}
-
-        print(f"=== /estimate 엔드포인트 호출됨 ===")
-        print(f"받은 데이터: {data}")
-        print(f"estimate_date 존재: {'estimate_date' in data}")
+def _fill_estimate_sync(data):
+    """/estimate 본 처리 (템플릿 복사 + 시트 값 쓰기). BLOCKING_EXECUTOR에서 실행됨"""
+    log.info(f"=== /estimate 엔드포인트 호출됨 ===")
+    # payload·CELL_MAP 덤프는 DEBUG일 때만 (log.debug는 %s 인자로 — INFO에서는 문자열을 만들지 않음)
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("받은 데이터: %s", data)
+        log.debug("estimate_date 존재: %s", 'estimate_date' in data)
         if 'estimate_date' in data:
-            print(f"estimate_date 값: {data.get('estimate_date')}")
-        
+            log.debug("estimate_date 값: %s", data.get('estimate_date'))
+
         # CELL_MAP 디버깅
-        print(f"CELL_MAP 키 개수: {len(CELL_MAP)}")
-        print(f"CELL_MAP 키 목록: {list(CELL_MAP.keys())}")
-        print(f"'estimate_date' in CELL_MAP: {'estimate_date' in CELL_MAP}")
-        print(f"'estimate_number' in CELL_MAP: {'estimate_number' in CELL_MAP}")
-        
-        file_id = data.get("fileId")
-        
-        # fileId가 없거나 템플릿 변수인 경우 새로운 템플릿 생성
-        if not file_id or file_id == "{{24.id}}" or "{{" in str(file_id) or "}}" in str(file_id):
-            print("fileId가 없거나 템플릿 변수입니다. 새로운 템플릿을 생성합니다.")
-            template_result = copy_estimate_template()
-            
-            if template_result["status"] == "success":
-                file_id = template_result["file_id"]
-                print(f"새로운 템플릿 생성 완료: {file_id}")
-            else:
-                return {"status": "error", "msg": f"템플릿 생성 실패: {template_result['message']}"}
-        
-        if not file_id:
-            return {"status": "error", "msg": "fileId 없음"}
+        log.debug("CELL_MAP 키 개수: %d", len(CELL_MAP))
+        log.debug("CELL_MAP 키 목록: %s", list(CELL_MAP.keys()))
+        log.debug("'estimate_date' in CELL_MAP: %s", 'estimate_date' in CELL_MAP)
+        log.debug("'estimate_number' in CELL_MAP: %s", 'estimate_number' in CELL_MAP)
+    
+    file_id = data.get("fileId")
+    
+    # fileId가 없거나 템플릿 변수인 경우 새로운 템플릿 생성
+    if not file_id or file_id == "{{24.id}}" or "{{" in str(file_id) or "}}" in str(file_id):
+        log.info("fileId가 없거나 템플릿 변수입니다. 새로운 템플릿을 생성합니다.")
+        template_result = copy_estimate_template()
+        
+        if template_result["status"] == "success":
+            file_id = template_result["file_id"]
+            log.info(f"새로운 템플릿 생성 완료: {file_id}")
+        else:
+            return {"status": "error", "msg": f"템플릿 생성 실패: {template_result['message']}"}
+    
+    if not file_id:
+        return {"status": "error", "msg": "fileId 없음"}
 
-        creds, gc, drive_service = get_google_clients()
+    creds, gc, drive_service = get_google_clients()
 
-        sh = gc.open_by_key(file_id)
-        ws = sh.sheet1
+    # 1. 파일명 변경 (아래 셀 쓰기와 같은 batchUpdate에 포함)
+    # 템플릿 풀에서 받은 복사본은 견적번호가 없어도 배포 시 정한 이름으로 변경
+    estimate_number = data.get("estimate_number", "").strip()
+    new_title = estimate_number or TEMPLATE_POOL.take_pending_title(file_id)
 
-        # 1. 파일명 변경
-        estimate_number = data.get("estimate_number", "").strip()
-        if estimate_number:
-            try:
-                sh.update_title(estimate_number)
-            except Exception as e:
-                print("파일명 변경 실패:", e)
-
-        updates = []
-
-        # 일반 필드 (estimate_date는 사용자 입력, estimate_number는 자동 생성)
-        for key in ["supplier_person", "supplier_email", "supplier_phone",
-                    "receiver_company", "receiver_person", "receiver_email", "receiver_phone", "quote_validity", "delivery_date", "product_training", "extra_note"]:
-            if key in data:
-                if key in CELL_MAP:
-                    print(f"DEBUG: {key} 처리 중 - 값: '{data[key]}', CELL_MAP 위치: '{CELL_MAP.get(key, 'NOT_FOUND')}'")
-                    updates.append({
-                        "range": CELL_MAP[key],
-                        "values": [[data[key]]]
-                    })
-                else:
-                    print(f"❌ CELL_MAP에 '{key}' 키가 없습니다. 사용 가능한 키: {list(CELL_MAP.keys())}")
-            else:
-                print(f"DEBUG: {key}가 데이터에 없습니다.")
-        
-        # estimate_date 처리 (사용자 입력값)
-        if "estimate_date" in data and data.get("estimate_date"):
-            if "estimate_date" in CELL_MAP:
+    updates = []
+
+    # 일반 필드 (estimate_date는 사용자 입력, estimate_number는 자동 생성)
+    for key in ["supplier_person", "supplier_email", "supplier_phone",
+                "receiver_company", "receiver_person", "receiver_email", "receiver_phone", "quote_validity", "delivery_date", "product_training", "extra_note"]:
+        if key in data:
+            if key in CELL_MAP:
+                log.debug("%s 처리 중 - 값: '%s', CELL_MAP 위치: '%s'", key, data[key], CELL_MAP[key])
                 updates.append({
-                    "range": CELL_MAP["estimate_date"],
-                    "values": [[data["estimate_date"]]]
+                    "range": CELL_MAP[key],
+                    "values": [[data[key]]]
                 })
             else:
-                print(f"❌ CELL_MAP에 'estimate_date' 키가 없습니다. 사용 가능한 키: {list(CELL_MAP.keys())}")
+                log.error(f"❌ CELL_MAP에 '{key}' 키가 없습니다. 사용 가능한 키: {list(CELL_MAP.keys())}")
         else:
-            # estimate_date가 없으면 현재 날짜로 설정
-            from datetime import datetime
-            current_date = datetime.now().strftime("%Y-%m-%d")
-            if "estimate_date" in CELL_MAP:
-                updates.append({
-                    "range": CELL_MAP["estimate_date"],
-                    "values": [[current_date]]
-                })
-                print(f"estimate_date가 없어서 현재 날짜로 설정: {current_date}")
-            else:
-                print(f"❌ CELL_MAP에 'estimate_date' 키가 없습니다. 사용 가능한 키: {list(CELL_MAP.keys())}")
+            log.debug("%s가 데이터에 없습니다.", key)
+    
+    # estimate_date 처리 (사용자 입력값)
+    if "estimate_date" in data and data.get("estimate_date"):
+        if "estimate_date" in CELL_MAP:
+            updates.append({
+                "range": CELL_MAP["estimate_date"],
+                "values": [[data["estimate_date"]]]
+            })
+        else:
+            log.error(f"❌ CELL_MAP에 'estimate_date' 키가 없습니다. 사용 가능한 키: {list(CELL_MAP.keys())}")
+    else:
+        # estimate_date가 없으면 현재 날짜로 설정
+        from datetime import datetime
+        current_date = datetime.now().strftime("%Y-%m-%d")
+        if "estimate_date" in CELL_MAP:
+            updates.append({
+                "range": CELL_MAP["estimate_date"],
+                "values": [[current_date]]
+            })
+            log.info(f"estimate_date가 없어서 현재 날짜로 설정: {current_date}")
+        else:
+            log.error(f"❌ CELL_MAP에 'estimate_date' 키가 없습니다. 사용 가능한 키: {list(CELL_MAP.keys())}")
+    
+    # estimate_number 처리 (사용자 입력값 우선, 없으면 자동 생성)
+    estimate_number = data.get("estimate_number", "").strip()
+    log.debug("받은 estimate_number 데이터: '%s'", estimate_number)
+    log.debug("estimate_number 타입: %s", type(estimate_number))
+    log.debug("estimate_number 길이: %d", len(estimate_number))
+    
+    if estimate_number:
+        # 사용자가 입력한 견적번호 사용
+        if "estimate_number" in CELL_MAP:
+            updates.append({
+                "range": CELL_MAP["estimate_number"],
+                "values": [[estimate_number]]
+            })
+            log.info(f"사용자 입력 견적번호 사용: {estimate_number}")
+        else:
+            log.error(f"❌ CELL_MAP에 'estimate_number' 키가 없습니다. 사용 가능한 키: {list(CELL_MAP.keys())}")
+    else:
+        # 견적번호가 없으면 자동 생성
+        log.debug("estimate_number가 비어있어서 자동 생성합니다.")
+        from datetime import datetime
+        current_date_short = datetime.now().strftime("%y%m%d")
+        supplier_person = data.get("supplier_person", "UNKNOWN")
         
-        # estimate_number 처리 (사용자 입력값 우선, 없으면 자동 생성)
-        estimate_number = data.get("estimate_number", "").strip()
-        print(f"DEBUG: 받은 estimate_number 데이터: '{estimate_number}'")
-        print(f"DEBUG: estimate_number 타입: {type(estimate_number)}")
-        print(f"DEBUG: estimate_number 길이: {len(estimate_number) if estimate_number else 0}")
+        person_id = PERSON_ID_MAP.get(supplier_person, "B")  # 기본값 B
         
-        if estimate_number:
-            # 사용자가 입력한 견적번호 사용
-            if "estimate_number" in CELL_MAP:
-                updates.append({
-                    "range": CELL_MAP["estimate_number"],
-                    "values": [[estimate_number]]
-                })
-                print(f"사용자 입력 견적번호 사용: {estimate_number}")
-            else:
-                print(f"❌ CELL_MAP에 'estimate_number' 키가 없습니다. 사용 가능한 키: {list(CELL_MAP.keys())}")
+        # 오늘 발행 횟수 (실제 PDF 생성 횟수 카운팅)
+        today_count = get_today_pdf_count(person_id)
+        
+        auto_estimate_number = f"DLP{current_date_short}-{person_id}-{today_count}"
+        if "estimate_number" in CELL_MAP:
+            updates.append({
+                "range": CELL_MAP["estimate_number"],
+                "values": [[auto_estimate_number]]
+            })
+            log.info(f"estimate_number 자동 생성: {auto_estimate_number}")
         else:
-            # 견적번호가 없으면 자동 생성
-            print(f"DEBUG: estimate_number가 비어있어서 자동 생성합니다.")
-            from datetime import datetime
-            current_date_short = datetime.now().strftime("%y%m%d")
-            supplier_person = data.get("supplier_person", "UNKNOWN")
-            
-            # 담당자 ID 매핑 (A, B, C, D, E, F) - 이미지 기준
-            person_id_map = {
-                "이훈수": "A", "차재원": "B", "하철용": "C", 
-                "노재익": "D", "전준영": "E", "장진호": "F"
-            }
-            person_id = person_id_map.get(supplier_person, "B")  # 기본값 B
+            log.error(f"❌ CELL_MAP에 'estimate_number' 키가 없습니다. 사용 가능한 키: {list(CELL_MAP.keys())}")
+
+    # 제품 정보
+    products = data.get("products", [])
+    for i in range(10):
+        product = products[i] if i < len(products) else {}
+        for field in ["type", "name", "detail", "qty", "price", "total", "note"]:
+            cell_key = f"products[{i}][{field}]"
+            value = product.get(field, "")
             
-            # 오늘 발행 횟수 (실제 PDF 생성 횟수 카운팅)
-            today_count = get_today_pdf_count()
+            # 제품상세정보(detail) 필드의 경우 줄바꿈 처리
+            if field == "detail" and value:
+                # HTML의 <br> 태그를 줄바꿈으로 변환
+                value = value.replace('<br>', '\n').replace('<br/>', '\n').replace('<br />', '\n')
+                # 연속된 줄바꿈을 하나로 정리
+                value = '\n'.join(line.strip() for line in value.split('\n') if line.strip())
+                # 제품상세정보 앞뒤로 공백 한 줄씩 추가
+                value = f'\n{value}\n'
             
-            auto_estimate_number = f"DLP{current_date_short}-{person_id}-{today_count}"
-            if "estimate_number" in CELL_MAP:
+            if cell_key in CELL_MAP:
                 updates.append({
-                    "range": CELL_MAP["estimate_number"],
-                    "values": [[auto_estimate_number]]
+                    "range": CELL_MAP[cell_key],
+                    "values": [[value]]
                 })
-                print(f"estimate_number 자동 생성: {auto_estimate_number}")
             else:
-                print(f"❌ CELL_MAP에 'estimate_number' 키가 없습니다. 사용 가능한 키: {list(CELL_MAP.keys())}")
-
-        # 제품 정보
-        products = data.get("products", [])
-        for i in range(10):
-            product = products[i] if i < len(products) else {}
-            for field in ["type", "name", "detail", "qty", "price", "total", "note"]:
-                cell_key = f"products[{i}][{field}]"
-                value = product.get(field, "")
-                
-                # 제품상세정보(detail) 필드의 경우 줄바꿈 처리
-                if field == "detail" and value:
-                    # HTML의 <br> 태그를 줄바꿈으로 변환
-                    value = value.replace('<br>', '\n').replace('<br/>', '\n').replace('<br />', '\n')
-                    # 연속된 줄바꿈을 하나로 정리
-                    value = '\n'.join(line.strip() for line in value.split('\n') if line.strip())
-                    # 제품상세정보 앞뒤로 공백 한 줄씩 추가
-                    value = f'\n{value}\n'
-                
-                if cell_key in CELL_MAP:
-                    updates.append({
-                        "range": CELL_MAP[cell_key],
-                        "values": [[value]]
-                    })
-                else:
-                    print(f"❌ CELL_MAP에 '{cell_key}' 키가 없습니다.")
-
-        print(f"DEBUG: 총 {len(updates)}개의 셀 업데이트 예정")
+                log.error(f"❌ CELL_MAP에 '{cell_key}' 키가 없습니다.")
+
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("총 %d개의 셀 업데이트 예정", len(updates))
         for i, update in enumerate(updates):
-            print(f"DEBUG: 업데이트 {i+1}: {update['range']} = {update['values']}")
-        
-        ws.batch_update(updates)
-        
-        # 제품상세정보 셀들에 텍스트 줄바꿈 포맷 적용 (개별 10회 호출 → 배치 1회로 속도 개선)
-        try:
-            detail_cells = [CELL_MAP[f"products[{i}][detail]"] for i in range(10)]
-            ws.batch_format([
-                {"range": cell, "format": {"wrapStrategy": "WRAP"}}
-                for cell in detail_cells
-            ])
-            print(f"✅ 제품상세정보 셀 줄바꿈 포맷 일괄 적용 완료: {detail_cells}")
-        except Exception as e:
-            print(f"⚠️ 셀 포맷 적용 중 오류 (무시됨): {e}")
-        
-        # 페이지 나누기 설정 제거됨 - 자동 너비 맞춤으로 변경
-        print("✅ 페이지 나누기 설정 생략 - 자동 페이지 조정 사용")
-        
-        # B47 셀 합치기 해제 (명판/인감 영역)
-        try:
-            # B47 셀의 합치기 해제
-            ws.unmerge('B47')
-            print("✅ B47 셀 합치기 해제 완료")
-        except Exception as e:
-            print(f"⚠️ B47 셀 합치기 해제 중 오류 (무시됨): {e}")
-        
-        return {"status": "success"}
+            log.debug("업데이트 %d: %s = %s", i + 1, update['range'], update['values'])
+    
+    # 파일명 변경 + 셀 값 쓰기 + 제품상세정보 줄바꿈 포맷 + B47 합치기 해제(명판/인감 영역)를
+    # spreadsheets.batchUpdate 1회로 전송 (open_by_key 메타데이터 조회 없이 — 왕복 5회 → 1회)
+    # 페이지 나누기 설정은 제거됨 - 자동 너비 맞춤 사용
+    detail_cells = [CELL_MAP[f"products[{i}][detail]"] for i in range(10)]
+    # 줄바꿈 포맷·합치기 해제도 같은 batchUpdate에 포함 → format 단계는 따로 없음 (batch_update에 포함)
+    with metrics.span("batch_update"):
+        send_estimate_batch(
+            gc, file_id, ESTIMATE_SHEET_GID, updates,
+            title=new_title or None,
+            wrap_cells=detail_cells,
+            unmerge_cells=["B47"],
+        )
+    SHEET_HANDLES.invalidate(file_id)  # 파일명이 바뀌었으므로 캐시된 핸들 제거
+    log.info(f"✅ 견적서 시트 일괄 업데이트 완료 (셀 {len(updates)}개, 줄바꿈 {len(detail_cells)}개, B47 합치기 해제)")
+    
+    return {"status": "success"}
+
+@background
+def _pool_copy_template(name):
+    """템플릿 풀 보충용 Drive 복사 → (file_id, web_view_link)"""
+    _, _, drive_service = get_google_clients()
+    copied = drive_service.files().copy(
+        fileId=TEMPLATE_SHEET_ID,
+        body={'name': name, 'parents': [ESTIMATE_FOLDER_ID]},
+        supportsAllDrives=True,
+        fields='id,webViewLink'
+    ).execute()
+    return copied['id'], copied.get('webViewLink', '')
+
+@background
+def _pool_template_version():
+    """템플릿 원본의 Drive version (내용이 바뀔 때마다 증가) — 풀 복사본 갱신 기준"""
+    _, _, drive_service = get_google_clients()
+    meta = drive_service.files().get(
+        fileId=TEMPLATE_SHEET_ID, fields='version,modifiedTime', supportsAllDrives=True
+    ).execute()
+    return meta.get('version') or meta.get('modifiedTime')
+
+@background
+def _pool_delete_copy(file_id):
+    _, _, drive_service = get_google_clients()
+    drive_service.files().delete(fileId=file_id, supportsAllDrives=True).execute()
+
+# 미리 복사해 둔 견적서 템플릿 풀 (TEMPLATE_POOL_HIGH=0이면 비활성 → 매번 Drive 복사)
+TEMPLATE_POOL = TemplatePool(_pool_copy_template, _pool_template_version, _pool_delete_copy)
+
+@app.post("/estimate")
+async def fill_estimate(request: Request):
+    try:
+        data = await request.json()
+
+        # 견적번호 미리보기용 확인 호출 — 실제 생성 없이 오늘 발행 카운트만 반환
+        # (이전에는 이 호출이 템플릿 복사 + 발행 카운터 증가까지 실행되는 버그가 있었음)
+        # (담당자별 일련번호 모드에서는 supplier_person을 함께 보내면 해당 담당자 카운트)
+        if data.get("check_only"):
+            today = datetime.now().strftime("%Y-%m-%d")
+            cnt = 0
+            try:
+                person_id = PERSON_ID_MAP.get(data.get("supplier_person", ""), "")
+                cnt = estimate_seq.current_count(today, _estimate_seq_scope(person_id))
+            except Exception as e:
+                log.warning(f"⚠️ check_only 카운트 읽기 실패 (0으로 처리): {e}")
+            return {"status": "success", "check_only": True, "pdf_count_today": cnt}
+
+        # 템플릿 복사·시트 쓰기는 모두 동기 Google API 호출 → 전용 풀에서 실행
+        return await run_blocking(_fill_estimate_sync, data)
         
     except Exception as e:
-        print(f"❌ fill_estimate 함수에서 오류 발생: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"❌ fill_estimate 함수에서 오류 발생: {e}")
         return {"status": "error", "message": f"견적서 생성 중 오류가 발생했습니다: {str(e)}"}
 
 @app.get("/test-cell-map")
@@ -558,110 +699,133 @@ async def pdf_sharing():
 @app.post("/create-estimate-template")
 async def create_estimate_template():
     """견적서 템플릿 스프레드시트를 복사하여 새 파일 생성"""
-    print("=== 견적서 템플릿 생성 API 호출됨 ===")
-    result = copy_estimate_template()
-    print("=== 견적서 템플릿 생성 결과:", result, "===")
+    log.info("=== 견적서 템플릿 생성 API 호출됨 ===")
+    result = await run_blocking(copy_estimate_template)
+    log.info(f"=== 견적서 템플릿 생성 결과: {result} ===")
     return result
 
-@app.post("/collect-data")
-async def collect_data(request: Request):
-    """데이터 수집용 스프레드시트에 데이터 추가, PDF 업로드, Pipedrive 거래 생성"""
-    print("=== /collect-data 엔드포인트 호출됨 ===")
-    try:
-        data = await request.json()
-        print(f"받은 데이터: {data}")
-        
-        # Google Sheets 연결 (캐시 재사용)
-        creds, gc, drive_service = get_google_clients()
+@app.get("/template-pool")
+def template_pool_status():
+    """템플릿 풀 상태 (대기/배포 개수, 템플릿 버전)"""
+    return {"status": "success", "pool": TEMPLATE_POOL.status()}
+
+@app.get("/pipedrive-outbox")
+def pipedrive_outbox_status():
+    """Pipedrive 반영 outbox 상태 (대기/완료/중단 작업 수, 중단된 작업 목록)"""
+    return {"status": "success", "outbox": PD_OUTBOX.stats()}
+
+@app.post("/pipedrive-outbox/{task_id}/retry")
+def pipedrive_outbox_retry(task_id: int):
+    """중단(dead)된 Pipedrive 반영 작업을 다시 시도"""
+    if not PD_OUTBOX.requeue(task_id):
+        return {"status": "error", "message": "작업을 찾을 수 없거나 이미 완료되었습니다."}
+    return {"status": "success", "task": PD_OUTBOX.get(task_id)}
+
+@app.get("/cache-stats")
+def cache_stats():
+    """메모리 캐시 적중/실패 통계 (워커 프로세스 단위)"""
+    return {
+        "status": "success",
+        "caches": {
+            "search_deals": DEAL_SEARCH_CACHE.stats(),
+            "pdf": PDF_CACHE.stats(),
+            "sheet_handles": SHEET_HANDLES.stats(),
+        },
+        "collect_appends": COLLECT_APPENDS.stats(),
+        "google_rate": GOOGLE_SCHEDULER.stats(),
+        "pipedrive_mirror": PD_MIRROR.stats(),
+        "pipedrive": PIPEDRIVE.stats(),
+        "http_pools": pool_stats(),
+    }
 
-        sh = gc.open_by_key(DATA_COLLECTION_SHEET_ID)
-        ws = sh.sheet1
-        
-        # 견적서 링크 생성
-        estimate_link = f"https://docs.google.com/spreadsheets/d/{data.get('fileId', '')}/edit"
-        
-        # 제품 데이터 추출 (최대 10개)
-        products = data.get("products", [])
-        product_names = []
-        for i in range(10):  # 최대 10개 제품
-            if i < len(products) and products[i].get("name"):
-                product_names.append(products[i].get("name"))
-            else:
-                product_names.append("")  # 빈 제품은 빈 문자열
-        
-        # 최종견적 계산 (VAT 포함)
-        total_sum = sum(product.get("total", 0) for product in products if product.get("total"))
-        vat = round(total_sum * 0.1)
-        final_total = total_sum + vat
-        
-        # PDF 파일 생성 및 업로드
-        pdf_link = ""
-        pdf_id = ""
-        file_id = data.get("fileId", "")
-        print(f"DEBUG: file_id = {file_id}")
-        
-        try:
-            # PDF 파일명 생성
-            receiver_company = data.get("receiver_company", "")
-            estimate_number = data.get("estimate_number", "")
-            
-            def clean_filename(s):
-                import re
-                return re.sub(r'[^\w\s-]', '', s).strip()
-            
-            clean_company_name = clean_filename(receiver_company)
-            pdf_filename = f"애니트론견적서_{clean_company_name}_{estimate_number}.pdf"
-            
-            # PDF 생성 (Google Sheet export)
-            print(f"DEBUG: PDF 생성 시도 - file_id: '{file_id}', pdf_filename: '{pdf_filename}'")
-            
-            if file_id and export_sheet_to_pdf(file_id, pdf_filename, creds):
-                # Google Drive 업로드
-                pdf_id, pdf_link = upload_pdf_to_drive(pdf_filename, get_google_drive_folder_id(), pdf_filename, creds)
-                print(f"DEBUG: Google Drive 업로드 성공 - {pdf_id}, {pdf_link}")
-                # ⚠️ 임시 파일 삭제는 Pipedrive 업로드 후로 이동 (아래)
-            else:
-                print("DEBUG: PDF export 실패 또는 file_id 없음")
-                # Fallback: 테스트 PDF 생성 시도
-                print("DEBUG: 테스트 PDF 생성 시도")
-                if create_test_pdf(pdf_filename, data):
-                    # Google Drive 업로드
-                    pdf_id, pdf_link = upload_pdf_to_drive(pdf_filename, get_google_drive_folder_id(), pdf_filename, creds)
-                    print(f"DEBUG: 테스트 PDF Google Drive 업로드 성공 - {pdf_id}, {pdf_link}")
-                    # ⚠️ 임시 파일 삭제는 Pipedrive 업로드 후로 이동 (아래)
-                else:
-                    return {
-                        "status": "error",
-                        "message": "Google Sheets PDF export 실패: 시트 권한 또는 설정 확인 필요"
-                    }
-        except Exception as e:
-            print(f"DEBUG: Google Drive PDF 생성 실패 - {str(e)}")
-            return {
-                "status": "error",
-                "message": f"PDF 생성 중 오류 발생: {str(e)}"
-            }
-        
-        # Pipedrive 거래 처리
-        # - 반드시 기존 거래를 선택해야만 진행 가능 (신규 자동 생성 차단)
-        selected_deal_id = data.get("pipedrive_deal_id")
-        if not selected_deal_id:
-            print("Pipedrive 거래 미선택 - 처리 거부")
-            return {
-                "status": "error",
-                "message": "파이프드라이브 거래를 선택해 주세요. 본인 파이프라인에 거래를 먼저 생성하신 후 진행해 주세요."
-            }
-        pipedrive_deal_id = update_pipedrive_deal_estimate(
-            selected_deal_id, data.get("estimate_number", ""), pdf_filename, estimate_link, pdf_link
-        )
+def _noop_report(stage, **info):
+    pass
 
-        # ✅ Pipedrive 업로드 완료 후에 임시 파일 삭제
-        try:
-            if pdf_filename and os.path.exists(pdf_filename):
-                os.remove(pdf_filename)
-                print(f"DEBUG: 임시 파일 정리 완료 - {pdf_filename}")
-        except Exception as e:
-            print(f"DEBUG: 임시 파일 정리 실패 - {str(e)}")
-        
+def _collect_data_sync(data, report=_noop_report):
+    """/collect-data 본 처리. BLOCKING_EXECUTOR 또는 백그라운드 작업 큐에서 실행됨
+
+    서로 독립적인 단계는 의존성 그래프(pipeline.run_stages)로 병렬 실행:
+
+        export ─── drive_upload ─┬─ append_row  (로컬 저널에 기록 → COLLECT_APPENDS가 모아서 전송)
+                                 └─ pipedrive   (로컬 outbox에 기록 → PD_OUTBOX가 견적번호·PDF 첨부·노트 반영)
+
+    Pipedrive 호출은 요청 안에서 하지 않음 → 응답 시간은 Pipedrive 상태와 무관, 실패는 outbox가 재시도
+
+    report(stage, **info): 단계 완료 시 호출 (백그라운드 작업의 진행 상황 기록용)
+    """
+    # Pipedrive 거래 처리
+    # - 반드시 기존 거래를 선택해야만 진행 가능 (신규 자동 생성 차단)
+    # - PDF 생성/업로드 전에 확인해서 불필요한 export를 막음
+    selected_deal_id = data.get("pipedrive_deal_id")
+    if not selected_deal_id:
+        log.info("Pipedrive 거래 미선택 - 처리 거부")
+        return {
+            "status": "error",
+            "message": "파이프드라이브 거래를 선택해 주세요. 본인 파이프라인에 거래를 먼저 생성하신 후 진행해 주세요."
+        }
+
+    # Google Sheets 연결 (캐시 재사용)
+    creds, gc, drive_service = get_google_clients()
+    
+    # 견적서 링크 생성
+    estimate_link = f"https://docs.google.com/spreadsheets/d/{data.get('fileId', '')}/edit"
+    
+    # 제품 데이터 추출 (최대 10개)
+    products = data.get("products", [])
+    product_names = []
+    for i in range(10):  # 최대 10개 제품
+        if i < len(products) and products[i].get("name"):
+            product_names.append(products[i].get("name"))
+        else:
+            product_names.append("")  # 빈 제품은 빈 문자열
+    
+    # 최종견적 계산 (VAT 포함)
+    total_sum = sum(product.get("total", 0) for product in products if product.get("total"))
+    vat = round(total_sum * 0.1)
+    final_total = total_sum + vat
+    
+    file_id = data.get("fileId", "")
+    estimate_number = data.get("estimate_number", "")
+    log.debug("file_id = %s", file_id)
+
+    # PDF 파일명 생성
+    def clean_filename(s):
+        return re.sub(r'[^\w\s-]', '', s).strip()
+
+    clean_company_name = clean_filename(data.get("receiver_company", ""))
+    # Drive/Pipedrive에 보이는 파일명 (로컬 파일명으로는 쓰지 않음 — PDF는 요청별 버퍼 pdf에만 존재)
+    pdf_filename = f"애니트론견적서_{clean_company_name}_{estimate_number}.pdf"
+
+    def stage_export(results):
+        # PDF 생성 (local 엔진이면 CELL_MAP 배치로 직접 → Google Sheet export → 실패 시 reportlab 테스트 PDF)
+        log.debug("PDF 생성 시도 - file_id: '%s', pdf_filename: '%s'", file_id, pdf_filename)
+        if pdf_engine_for(data) == "local":
+            if create_local_pdf(pdf, data):
+                pdf.freeze()
+                return "local"
+            pdf.reset()
+        if file_id and export_sheet_to_pdf(file_id, pdf, creds):
+            pdf.freeze()  # 이후 업로드 단계들이 동시에 읽음
+            return "google"
+        log.debug("PDF export 실패 또는 file_id 없음 → 테스트 PDF 생성 시도")
+        pdf.reset()
+        if create_test_pdf(pdf, data):
+            pdf.freeze()
+            return "fallback"
+        raise RuntimeError("Google Sheets PDF export 실패: 시트 권한 또는 설정 확인 필요")
+
+    def stage_drive_upload(results):
+        pdf_id, pdf_link = upload_pdf_to_drive(pdf, get_google_drive_folder_id(), pdf_filename, creds)
+        log.debug("Google Drive 업로드 결과 - %s, %s", pdf_id, pdf_link)
+        return pdf_id or "", pdf_link or ""
+
+    def stage_pipedrive(results):
+        pdf_id, pdf_link = results["drive_upload"]
+        return enqueue_pipedrive_updates(selected_deal_id, estimate_number, estimate_link,
+                                         pdf, pdf_filename, pdf_id, pdf_link)
+
+    def stage_append_row(results):
+        _, pdf_link = results["drive_upload"]
         # 한 행에 모든 데이터 배치 (새로운 컬럼 매핑)
         # 첫 번째 제품의 대분류 정보 추출
         major_category = ""
@@ -695,43 +859,128 @@ async def collect_data(request: Request):
             pdf_link,                           # X: 견적파일(PDF) (V → X로 변경)
             selected_deal_id                    # Y: Pipedrive 거래 ID — 사용자 선택값을 그대로 기록 (PD API 업데이트 실패와 무관)
         ]
-        ws.append_row(row_data)
-        
-        success_message = f"견적 데이터 및 PDF가 성공적으로 추가되었습니다."
-        if pipedrive_deal_id:
-            success_message += f"\nPipedrive 거래가 성공적으로 업데이트되었습니다. (거래 ID: {pipedrive_deal_id})"
-            success_message += f"\nPDF 파일이 Pipedrive 거래에 첨부되었습니다."
-        else:
-            success_message += f"\n⚠️ Pipedrive 견적번호 기록에 실패했습니다 (거래 ID {selected_deal_id}는 시트에 저장됨)."
-        
+        # 저널에 커밋되면 반환 (Google 전송은 COLLECT_APPENDS 플러시 스레드가 다른 요청의 행과 묶어서)
+        return COLLECT_APPENDS.enqueue(row_data)
+
+    def on_stage_done(name, status, ms):
+        if status != "skipped":
+            metrics.record(name, ms / 1000, "ok" if status == "ok" else "error")
+        report(name, status=status, duration_ms=ms)
+
+    stages = [
+        Stage("export", stage_export),
+        Stage("drive_upload", stage_drive_upload, deps=["export"]),
+        Stage("pipedrive", stage_pipedrive, deps=["drive_upload"]),
+        Stage("append_row", stage_append_row, deps=["drive_upload"]),
+    ]
+    # PDF는 요청 전용 버퍼(큰 경우 요청 전용 임시 폴더)에서 export → Drive·Pipedrive 업로드까지 공유,
+    # 단계가 모두 끝나면 폴더째 삭제 (같은 회사·번호 동시 요청도 파일 충돌 없음)
+    with scratch_dir() as scratch:
+        pdf = PdfArtifact(scratch)
+        run = run_stages(stages, PIPELINE_EXECUTOR, on_stage_done=on_stage_done)
+
+    timing = run.summary()
+    log.info(f"[collect-data] 총 {timing['total_ms']}ms, 임계 경로 {timing['critical_path']} "
+             f"= {timing['critical_path_ms']}ms", extra={"fields": {"timing": timing}})
+
+    if "export" in run.errors:
         return {
-            "status": "success",
-            "message": success_message,
-            "pdf_link": pdf_link,
-            "pdf_id": pdf_id,
-            "pipedrive_deal_id": pipedrive_deal_id
+            "status": "error",
+            "message": f"PDF 생성 중 오류 발생: {run.errors['export']}",
+            "timing": timing,
         }
+    # 시트 기록/Drive 업로드 실패는 기존처럼 요청 전체 실패로 처리 (핸들러의 except에서 응답 생성)
+    # outbox 기록 실패도 마찬가지 (기록되지 않은 Pipedrive 반영은 재시도할 수 없음)
+    for name in ("drive_upload", "append_row", "pipedrive"):
+        if name in run.errors:
+            raise run.errors[name]
+
+    pdf_id, pdf_link = run.results["drive_upload"]
+    
+    success_message = f"견적 데이터 및 PDF가 성공적으로 추가되었습니다."
+    success_message += f"\nPipedrive 거래(ID: {selected_deal_id})에 견적번호·PDF·노트 반영이 예약되었습니다."
+    
+    return {
+        "status": "success",
+        "message": success_message,
+        "pdf_link": pdf_link,
+        "pdf_id": pdf_id,
+        "pipedrive_deal_id": selected_deal_id,
+        "pipedrive_tasks": run.results["pipedrive"],
+        "timing": timing,
+    }
+
+# /collect-data 백그라운드 실행 큐 (mode=async) — payload는 로컬 DB에 저장, 단계별 진행 기록
+COLLECT_JOBS = JobQueue("collect-data", _collect_data_sync)
+
+@app.post("/collect-data")
+async def collect_data(request: Request, mode: str = ""):
+    """데이터 수집용 스프레드시트에 데이터 추가, PDF 업로드, Pipedrive 거래 생성
+
+    mode=async (또는 payload의 "async": true): 작업만 접수하고 job id를 즉시 반환.
+    진행 상황은 /jobs/{job_id}, 최종 결과는 /jobs/{job_id}/result 로 조회.
+    """
+    log.info("=== /collect-data 엔드포인트 호출됨 ===")
+    try:
+        data = await request.json()
+        log.debug("받은 데이터: %s", data)
+
+        if mode == "async" or data.pop("async", False):
+            job_id = await run_blocking(COLLECT_JOBS.submit, data)
+            log.info(f"[JOB] collect-data 접수: {job_id}")
+            return {
+                "status": "queued",
+                "job_id": job_id,
+                "status_url": f"/jobs/{job_id}",
+                "result_url": f"/jobs/{job_id}/result",
+            }
+        
+        # PDF export / Drive 업로드 / Pipedrive / append_row 모두 동기 호출 → 전용 풀에서 실행
+        return await run_blocking(_collect_data_sync, data)
     except Exception as e:
-        print(f"데이터 수집 오류: {e}")
-        import traceback
-        print(f"상세 오류: {traceback.format_exc()}")
+        log.exception(f"데이터 수집 오류: {e}")
         return {"status": "error", "message": f"데이터 수집 실패: {str(e)}"}
 
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    """백그라운드 작업 상태 + 완료된 단계 목록"""
+    job = COLLECT_JOBS.get(job_id)
+    if job is None:
+        return {"status": "error", "message": "작업을 찾을 수 없습니다."}
+    return {
+        "status": "success",
+        "job_id": job_id,
+        "state": job["state"],
+        "stages": job["stages"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    """백그라운드 작업 결과 — 완료 전이면 state만 반환 (기존 동기 /collect-data 응답과 같은 형식)"""
+    job = COLLECT_JOBS.get(job_id)
+    if job is None:
+        return {"status": "error", "message": "작업을 찾을 수 없습니다."}
+    if job["state"] not in FINISHED_STATES:
+        return {"status": "pending", "job_id": job_id, "state": job["state"]}
+    return job["result"]
+
 @app.get("/test-drive-copy")
-async def test_copy():
+def test_copy():
     """Google Drive 파일 복사 테스트 엔드포인트"""
     try:
-        print("=== Google Drive 파일 복사 테스트 시작 ===")
+        log.info("=== Google Drive 파일 복사 테스트 시작 ===")
 
         creds, gc, service = get_google_clients()
         
         # 테스트할 파일 ID (현재 설정된 템플릿 파일)
         test_file_id = TEMPLATE_SHEET_ID
-        print(f"테스트 파일 ID: {test_file_id}")
+        log.info(f"테스트 파일 ID: {test_file_id}")
         
         # 복사될 폴더 ID
         target_folder_id = ESTIMATE_FOLDER_ID
-        print(f"대상 폴더 ID: {target_folder_id}")
+        log.info(f"대상 폴더 ID: {target_folder_id}")
         
         # 파일 존재 여부 및 권한 확인
         try:
@@ -739,10 +988,10 @@ async def test_copy():
                 fileId=test_file_id,
                 fields='id,name,parents,owners,permissions'
             ).execute()
-            print(f"✅ 소스 파일 존재 확인: {file_info.get('name', 'Unknown')}")
+            log.info(f"✅ 소스 파일 존재 확인: {file_info.get('name', 'Unknown')}")
             
         except Exception as e:
-            print(f"❌ 소스 파일 접근 실패: {e}")
+            log.error(f"❌ 소스 파일 접근 실패: {e}")
             return {"error": f"소스 파일 접근 실패: {str(e)}"}
         
         # 폴더 존재 여부 및 권한 확인
@@ -751,10 +1000,10 @@ async def test_copy():
                 fileId=target_folder_id,
                 fields='id,name,owners,permissions'
             ).execute()
-            print(f"✅ 대상 폴더 존재 확인: {folder_info.get('name', 'Unknown')}")
+            log.info(f"✅ 대상 폴더 존재 확인: {folder_info.get('name', 'Unknown')}")
             
         except Exception as e:
-            print(f"❌ 대상 폴더 접근 실패: {e}")
+            log.error(f"❌ 대상 폴더 접근 실패: {e}")
             return {"error": f"대상 폴더 접근 실패: {str(e)}"}
         
         return {
@@ -765,9 +1014,7 @@ async def test_copy():
         }
         
     except Exception as e:
-        print(f"❌ 파일 복사 테스트 실패: {e}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"❌ 파일 복사 테스트 실패: {e}")
         return {
             "status": "error",
             "message": f"파일 복사 테스트 실패: {str(e)}",
@@ -776,14 +1023,14 @@ async def test_copy():
         }
 
 @app.get("/setup-drive-permissions")
-async def setup_permissions():
+def setup_permissions():
     """Google Drive 권한 설정 엔드포인트"""
     return setup_drive_permissions()
 
 def setup_drive_permissions():
     """Google Drive 파일 및 폴더에 Service Account 권한 설정"""
     try:
-        print("=== Google Drive 권한 설정 시작 ===")
+        log.info("=== Google Drive 권한 설정 시작 ===")
 
         creds, gc, service = get_google_clients()
         service_account_email = getattr(creds, 'service_account_email', '')
@@ -791,7 +1038,7 @@ def setup_drive_permissions():
         if not service_account_email:
             return {"status": "error", "message": "Service Account 이메일을 가져올 수 없습니다."}
         
-        print(f"Service Account 이메일: {service_account_email}")
+        log.info(f"Service Account 이메일: {service_account_email}")
         
         # 템플릿 파일에 권한 추가
         try:
@@ -806,12 +1053,12 @@ def setup_drive_permissions():
                 body=template_permission,
                 fields='id'
             ).execute()
-            print(f"✅ 템플릿 파일 권한 설정 완료")
+            log.info(f"✅ 템플릿 파일 권한 설정 완료")
         except Exception as e:
             if "already exists" in str(e).lower():
-                print(f"⚠️ 템플릿 파일 권한이 이미 존재합니다: {e}")
+                log.warning(f"⚠️ 템플릿 파일 권한이 이미 존재합니다: {e}")
             else:
-                print(f"❌ 템플릿 파일 권한 설정 실패: {e}")
+                log.error(f"❌ 템플릿 파일 권한 설정 실패: {e}")
         
         # 대상 폴더에 권한 추가
         try:
@@ -826,101 +1073,140 @@ def setup_drive_permissions():
                 body=folder_permission,
                 fields='id'
             ).execute()
-            print(f"✅ 대상 폴더 권한 설정 완료")
+            log.info(f"✅ 대상 폴더 권한 설정 완료")
         except Exception as e:
             if "already exists" in str(e).lower():
-                print(f"⚠️ 대상 폴더 권한이 이미 존재합니다: {e}")
+                log.warning(f"⚠️ 대상 폴더 권한이 이미 존재합니다: {e}")
             else:
-                print(f"❌ 대상 폴더 권한 설정 실패: {e}")
+                log.error(f"❌ 대상 폴더 권한 설정 실패: {e}")
         
         return {"status": "success", "message": "권한 설정이 완료되었습니다."}
         
     except Exception as e:
-        print(f"권한 설정 중 오류: {e}")
+        log.error(f"권한 설정 중 오류: {e}")
         return {"status": "error", "message": f"권한 설정 실패: {str(e)}"}
 
-def export_sheet_to_pdf(sheet_id, pdf_filename, creds, gid=0):
-    """Google Sheets를 PDF로 export (페이지 나누기 강화)"""
+def export_sheet_to_pdf(sheet_id, pdf_out, creds, gid=0):
+    """Google Sheets를 PDF로 export (페이지 나누기 강화)
+
+    pdf_out: 쓰기 가능한 파일 객체 (보통 PdfArtifact) — 응답을 통째로 메모리에 올리지 않고 청크 단위로 기록
+    시트 리비전이 이전 export와 같으면 PDF_CACHE 보관본을 대신 사용 (메타데이터 조회 1회)
+    """
     try:
-        print(f"DEBUG: export_sheet_to_pdf 함수 시작")
-        print(f"DEBUG: sheet_id: {sheet_id}")
-        print(f"DEBUG: pdf_filename: {pdf_filename}")
-        print(f"DEBUG: gid: {gid}")
+        log.debug("export_sheet_to_pdf 함수 시작")
+        log.debug("sheet_id: %s", sheet_id)
+        log.debug("gid: %s", gid)
 
-        # PDF 생성 전 토큰 갱신 보장
+        # PDF 생성 전 토큰 유효성 보장 (보통은 백그라운드 갱신으로 이미 유효 → 즉시 반환)
         try:
-            if getattr(creds, "expired", False) or not getattr(creds, "token", None):
-                print("[PDF] 토큰 만료 감지 → refresh")
-                creds.refresh(GoogleRequest())
-                print("✅ [PDF] 토큰 갱신 완료")
+            creds = TOKEN_MANAGER.credentials()
         except Exception as e:
-            print(f"⚠️ [PDF] 토큰 갱신 실패: {e}")
+            log.warning(f"⚠️ [PDF] 토큰 갱신 실패: {e}")
 
         # PDF 생성 전 페이지 나누기 설정 제거됨 - 자동 조정 사용
-        print("✅ PDF 생성 시 자동 페이지 조정 사용")
+        log.info("✅ PDF 생성 시 자동 페이지 조정 사용")
         
         # URL 방식으로 PDF 생성 (페이지 설정 포함)
         try:
-            print(f"DEBUG: URL 방식 PDF 생성 시도 (너비 맞춤으로 변경)")
+            log.debug("URL 방식 PDF 생성 시도 (너비 맞춤으로 변경)")
             
             # 너비 맞춤 설정으로 변경된 URL 방식 사용
-            export_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?" + \
-                        f"format=pdf&portrait=true&size=A4&" + \
-                        f"fitw=true&fith=false&" + \
-                        f"top_margin=0.5&bottom_margin=0.5&" + \
-                        f"left_margin=0.5&right_margin=0.5&" + \
-                        f"horizontal_alignment=CENTER&" + \
-                        f"vertical_alignment=TOP&" + \
-                        f"printtitle=false&sheetnames=false&" + \
-                        f"pagenum=UNDEFINED&gridlines=false&" + \
-                        f"gid={gid}"
-            
-            print(f"DEBUG: PDF 생성 URL: {export_url}")
+            export_params = "format=pdf&portrait=true&size=A4&" + \
+                        "fitw=true&fith=false&" + \
+                        "top_margin=0.5&bottom_margin=0.5&" + \
+                        "left_margin=0.5&right_margin=0.5&" + \
+                        "horizontal_alignment=CENTER&" + \
+                        "vertical_alignment=TOP&" + \
+                        "printtitle=false&sheetnames=false&" + \
+                        f"pagenum=UNDEFINED&gridlines=false&gid={gid}"
+            export_url = f"https://docs.google.com/spreadsheets/d/{sheet_id}/export?{export_params}"
+
+            # 같은 리비전을 이미 export했으면 보관본 사용
+            revision = _sheet_revision(sheet_id)
+            cache_key = PDF_CACHE.key(sheet_id, revision, export_params) if revision else None
+            cached = PDF_CACHE.open(cache_key) if cache_key else None
+            if cached:
+                with cached:
+                    shutil.copyfileobj(cached, pdf_out, 64 * 1024)
+                log.info(f"✅ [PDF] 캐시 사용 (리비전 {revision}) — export 생략")
+                return True
+
+            log.debug("PDF 생성 URL: %s", export_url)
             
             # OAuth 토큰으로 요청 (HTTP Session 재사용)
             headers = {'Authorization': f'Bearer {creds.token}'}
 
-            response = HTTP.get(export_url, headers=headers)
-
-            if response.status_code == 200:
-                with open(pdf_filename, 'wb') as f:
-                    f.write(response.content)
-                print(f"DEBUG: URL 방식 PDF 생성 성공: {pdf_filename}")
-                return True
-            else:
-                print(f"DEBUG: URL 방식 PDF 생성 실패: {response.status_code}")
-
-                # 백업: Google Drive API 방식 (캐시된 drive_service 재사용)
-                print(f"DEBUG: 백업 방법으로 Google Drive API 시도")
-                _, _, cached_drive_service = get_google_clients()
-                request = cached_drive_service.files().export_media(
-                    fileId=sheet_id,
-                    mimeType='application/pdf'
-                )
-
-                with open(pdf_filename, 'wb') as f:
-                    f.write(request.execute())
+            with GOOGLE_SCHEDULER.run("drive", lambda: HTTP.get(export_url, headers=headers, stream=True,
+                                                                 timeout=(10, PDF_EXPORT_TIMEOUT)),
+                                      status_of=response_status) as response, \
+                    PDF_CACHE.writer(cache_key) as cache_file:
+                if response.status_code == 200:
+                    size = 0
+                    for chunk in response.iter_content(chunk_size=64 * 1024):
+                        pdf_out.write(chunk)
+                        if cache_file:
+                            cache_file.write(chunk)
+                        size += len(chunk)
+                    if cache_file:
+                        cache_file.commit()
+                    log.debug("URL 방식 PDF 생성 성공: %s bytes", size)
+                    return True
+                log.debug("URL 방식 PDF 생성 실패: %s", response.status_code)
+
+            # 백업: Google Drive API 방식 (캐시된 drive_service 재사용, 청크 단위로 받아 기록)
+            log.debug("백업 방법으로 Google Drive API 시도")
+            _, _, cached_drive_service = get_google_clients()
+            request = cached_drive_service.files().export_media(
+                fileId=sheet_id,
+                mimeType='application/pdf'
+            )
+            downloader = MediaIoBaseDownload(pdf_out, request, chunksize=1024 * 1024)
+            done = False
+            while not done:
+                _, done = downloader.next_chunk()
+
+            log.debug("백업 방법 PDF 생성 성공")
+            return True
 
-                print(f"DEBUG: 백업 방법 PDF 생성 성공: {pdf_filename}")
-                return True
-            
         except Exception as api_e:
-            print(f"DEBUG: PDF 생성 실패: {api_e}")
+            log.debug("PDF 생성 실패: %s", api_e)
             return False
             
     except Exception as e:
-        print(f"DEBUG: PDF export 예외 발생: {str(e)}")
+        log.debug("PDF export 예외 발생: %s", e)
         return False
 
-def upload_pdf_to_drive(pdf_path, folder_id, file_name, creds):
-    """PDF 파일을 Google Drive에 업로드"""
+# 내보낸 PDF 디스크 캐시 (시트 ID + 리비전 + export 파라미터)
+PDF_CACHE = PdfCache()
+
+def _sheet_revision(sheet_id):
+    """Drive 메타데이터의 리비전 식별자 (조회 실패 시 None → 캐시 사용 안 함)"""
+    if not PDF_CACHE.enabled:
+        return None
+    try:
+        _, _, drive_service = get_google_clients()
+        meta = drive_service.files().get(
+            fileId=sheet_id, fields="version,modifiedTime,headRevisionId", supportsAllDrives=True
+        ).execute()
+        # Google 스프레드시트는 headRevisionId가 없어 version/modifiedTime으로 판별
+        return "|".join(str(meta.get(k) or "") for k in ("version", "modifiedTime", "headRevisionId"))
+    except Exception as e:
+        log.warning(f"⚠️ [PDF] 리비전 조회 실패 (캐시 사용 안 함): {e}")
+        return None
+
+def upload_pdf_to_drive(pdf, folder_id, file_name, creds):
+    """PDF(PdfArtifact)를 Google Drive에 업로드
+
+    메모리 버퍼면 multipart 요청 1회, 디스크로 넘어간 큰 PDF면 resumable 업로드로 청크씩 읽어 전송
+    """
     try:
         _, _, drive_service = get_google_clients()
         file_metadata = {
             'name': file_name,
             'parents': [folder_id]
         }
-        media = MediaFileUpload(pdf_path, mimetype='application/pdf')
+        media = MediaIoBaseUpload(pdf.open(), mimetype='application/pdf',
+                                  chunksize=4 * 1024 * 1024, resumable=not pdf.in_memory)
         file = drive_service.files().create(
             body=file_metadata,
             media_body=media,
@@ -929,146 +1215,43 @@ def upload_pdf_to_drive(pdf_path, folder_id, file_name, creds):
         ).execute()
         return file.get('id'), file.get('webViewLink')
     except Exception as e:
-        print(f"PDF 업로드 실패: {e}")
+        log.error(f"PDF 업로드 실패: {e}")
         return None, None
 
+# reportlab 대체 PDF 렌더러 (폰트/스타일은 프로세스당 1회, 렌더링은 별도 프로세스 풀)
+FALLBACK_RENDERER = FallbackRenderer()
+
+def pdf_engine_for(data):
+    """요청의 PDF 생성 방식 (payload pdf_engine > PDF_ENGINE)
+
+    auto와 local 모두 제품이 템플릿 격자(10행)에 들어갈 때만 local — 넘치면 google (잘라서 그리지 않음)
+    """
+    engine = str(data.get("pdf_engine") or PDF_ENGINE).lower()
+    if engine in ("auto", "local"):
+        return "local" if local_pdf_fits(data) else "google"
+    return "google"
+
+def create_local_pdf(out, data):
+    """CELL_MAP 배치 그대로 로컬에서 견적서 PDF 생성 (Google export 없이). 실패하면 None → Google export로"""
+    try:
+        out.write(FALLBACK_RENDERER.render(data, renderer=render_estimate_local))
+        return out
+    except Exception as e:
+        log.warning(f"⚠️ 로컬 PDF 생성 오류 → Google export로: {str(e)}")
+        return None
+
 def create_test_pdf(filename, data):
-    """테스트용 PDF 파일을 생성합니다."""
+    """테스트용 PDF 파일을 생성합니다. (filename: 파일 경로 또는 PdfArtifact 같은 쓰기 가능한 파일 객체)"""
     try:
-        from reportlab.pdfgen import canvas
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib.units import cm
-        from reportlab.lib import colors
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.enums import TA_CENTER, TA_LEFT
-        from reportlab.pdfbase import pdfmetrics
-        from reportlab.pdfbase.cidfonts import UnicodeCIDFont
-        
-        # 한글 폰트 등록
-        try:
-            pdfmetrics.registerFont(UnicodeCIDFont('STSong-Light'))
-            korean_font = 'STSong-Light'
-            print("한글 폰트 등록 성공: STSong-Light")
-        except Exception as e:
-            print(f"한글 폰트 등록 실패: {e}")
-            korean_font = 'Helvetica'
-        
-        doc = SimpleDocTemplate(filename, pagesize=A4)
-        story = []
-        styles = getSampleStyleSheet()
-        
-        # 제목 스타일
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontName=korean_font,
-            fontSize=18,
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#21808c')
-        )
-        
-        # 제목 추가
-        title = Paragraph(f"견적서 - {data.get('estimate_number', '')}", title_style)
-        story.append(title)
-        story.append(Spacer(1, 20))
-        
-        # 기본 정보 테이블
-        basic_info = [
-            ['견적일자', data.get('estimate_date', '')],
-            ['견적번호', data.get('estimate_number', '')],
-            ['공급자', '(주)바이텍테크놀로지'],
-            ['담당자', data.get('supplier_person', '')],
-            ['수신자 회사', data.get('receiver_company', '')],
-            ['수신자 담당자', data.get('receiver_person', '')],
-            ['납기일', data.get('delivery_date', '')],
-            ['제품교육', data.get('product_training', '')]
-        ]
-        
-        basic_table = Table(basic_info, colWidths=[3*cm, 12*cm])
-        basic_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f0f0')),
-            ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#21808c')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, -1), korean_font),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ]))
-        story.append(basic_table)
-        story.append(Spacer(1, 20))
-        
-        # 제품 정보 테이블
-        products = data.get('products', [])
-        if products:
-            product_data = [['구분', '제품명', '상세정보', '수량', '단가(원)', '합계(원)']]
-            
-            for product in products:
-                if product.get('name'):  # 제품명이 있는 경우만 추가
-                    product_type = product.get('type', '')
-                    if not product_type:
-                        name = product.get('name', '')
-                        if '라벨' in name or '프린터' in name:
-                            product_type = '프린터'
-                        elif '패키징' in name:
-                            product_type = '장비'
-                        else:
-                            product_type = '기타'
-                    
-                    product_data.append([
-                        product_type,
-                        product.get('name', ''),
-                        product.get('detail', ''),
-                        str(product.get('qty', '1')),
-                        f"{product.get('price', 0):,}",
-                        f"{product.get('total', 0):,}"
-                    ])
-            
-            if len(product_data) > 1:  # 헤더 외에 데이터가 있는 경우
-                product_table = Table(product_data, colWidths=[2*cm, 3*cm, 4*cm, 1.5*cm, 2.5*cm, 2*cm])
-                product_table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#21808c')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, -1), korean_font),
-                    ('FONTSIZE', (0, 0), (-1, -1), 9),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('ALIGN', (2, 1), (2, -1), 'LEFT'),  # 상세정보는 왼쪽 정렬
-                ]))
-                story.append(product_table)
-                story.append(Spacer(1, 20))
-        
-        # 합계 계산
-        total_sum = sum(product.get("total", 0) for product in products if product.get("total"))
-        vat = round(total_sum * 0.1)
-        final_total = total_sum + vat
-        
-        # 합계 테이블
-        summary_data = [
-            ['공급가액', f"{total_sum:,}원"],
-            ['부가세 (10%)', f"{vat:,}원"],
-            ['총액', f"{final_total:,}원"]
-        ]
-        
-        summary_table = Table(summary_data, colWidths=[4*cm, 4*cm])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#21808c')),
-            ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, -1), korean_font),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ]))
-        story.append(summary_table)
-        
-        # PDF 생성
-        doc.build(story)
+        pdf_bytes = FALLBACK_RENDERER.render(data)
+        if hasattr(filename, "write"):
+            filename.write(pdf_bytes)
+        else:
+            with open(filename, "wb") as f:
+                f.write(pdf_bytes)
         return filename
     except Exception as e:
-        print(f"테스트 PDF 생성 오류: {str(e)}")
+        log.error(f"테스트 PDF 생성 오류: {str(e)}")
         return None
 
 def get_pipedrive_config():
@@ -1102,149 +1285,239 @@ def _pd_custom_field_value(data_obj, key):
         return v.get("value") or ""
     return v or ""
 
-def _norm_text(s):
-    """검색 비교용 정규화: 공백/특수문자 제거 + 소문자 (한글/영문/숫자만 유지)
-    예: '(주)경신 이엔피' → '주경신이엔피' — '경신이' 검색어도 매칭됨"""
-    return re.sub(r'[^0-9a-zA-Z가-힣]', '', str(s or '')).lower()
+# /search-deals 응답 캐시 — 키: 정규화 검색어, 값: {"deals": [...], "complete": bool}
+# complete = 어떤 API 결과도 limit에 걸려 잘리지 않음 → 더 긴 검색어는 이 결과를 로컬 필터링해 응답 가능
+DEAL_SEARCH_CACHE = TTLCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL_SEC)
+
+
+def _deal_matches(deal, qn):
+    return qn in norm_text(deal.get("title")) or qn in norm_text(deal.get("org_name"))
+
+
+def _search_deals_from_prefix(qn):
+    """캐시된 더 짧은 검색어(접두어)의 완전한 결과가 있으면 로컬 필터링으로 응답 (없으면 None)"""
+    for k in range(len(qn) - 1, 1, -1):
+        cached = DEAL_SEARCH_CACHE.peek(qn[:k])
+        if cached and cached["complete"]:
+            deals = [d for d in cached["deals"] if _deal_matches(d, qn)]
+            DEAL_SEARCH_CACHE.incr("prefix_hits")
+            DEAL_SEARCH_CACHE.set(qn, {"deals": deals, "complete": True})
+            return deals
+    return None
+
+
+def invalidate_deal_search_cache(deal_id):
+    """거래가 수정되면 그 거래가 들어있는 검색 결과 캐시 제거"""
+    deal_id = str(deal_id)
+    DEAL_SEARCH_CACHE.invalidate(lambda _, v: any(str(d["id"]) == deal_id for d in v["deals"]))
+
+
+def _pd_mirror_get_json(path, params):
+    return PIPEDRIVE.get_json("v2", path, params, timeout=30)
+
+# Pipedrive 거래/조직 로컬 미러 — PIPEDRIVE_SEARCH_MODE가 mirror/auto면 /search-deals를 메모리에서 응답
+PD_MIRROR = PipedriveMirror(_pd_mirror_get_json)
 
 
 @app.get("/search-deals")
-def search_deals(q: str = "", debug: int = 0):
+def search_deals(q: str = "", debug: int = 0, mode: str = ""):
     """거래 제목 + 조직명으로 Pipedrive 거래 검색 (공백/특수문자 무시 매칭)
 
     개선 사항:
     1. 검색어 그대로 + 공백 제거 버전 이중 검색 (Pipedrive는 공백 경계를 넘는 매칭 불가)
     2. 조직명 검색 병행 → 거래 제목에 회사명이 없어도 검색됨
     3. 필터를 엄격한 부분문자열 → 정규화 후 비교로 완화
+    4. 입력 중 연속 호출 대비 캐시: 같은 검색어는 캐시 응답, 더 긴 검색어는 접두어 결과를 필터링
+    5. mode(기본 PIPEDRIVE_SEARCH_MODE): live=항상 API, mirror=로컬 미러(목록을 받기 전에만 API),
+       auto=미러가 PIPEDRIVE_MIRROR_STALE_SEC 이내로 최신이면 미러, 아니면 API
     """
     q = (q or "").strip()
     if len(q) < 2:
         return {"deals": []}
-    TIMEOUT = 10
     try:
-        pipedrive_settings = get_pipedrive_config()
-        base_url = f"https://{pipedrive_settings['domain']}/api/v2"
-        token = pipedrive_settings["api_token"]
-        qn = _norm_text(q)
-
-        # 검색어 변형: 입력 그대로 + 공백 제거 버전
-        terms = [q]
-        q_nospace = q.replace(" ", "")
-        if q_nospace != q and len(q_nospace) >= 2:
-            terms.append(q_nospace)
-
-        # 1) 거래 제목 검색 (변형 검색어별로 호출, id로 중복 제거)
-        raw_deals = {}  # deal_id -> deal dict
-        for term in terms:
-            try:
-                res = HTTP.get(f"{base_url}/deals/search", params={
-                    "term": term, "fields": "title", "limit": 30, "api_token": token
-                }, timeout=TIMEOUT)
-                for deal in _pd_extract_search_items(res.json()):
-                    if deal.get("id"):
-                        raw_deals.setdefault(deal["id"], dict(deal))
-            except Exception as e:
-                print(f"[WARN] deals/search '{term}' 오류: {e}", flush=True)
+        if debug:
+            return _search_deals_live(q, debug=True)
+        qn = norm_text(q)
+        mode = (mode or PIPEDRIVE_SEARCH_MODE).lower()
+        if (mode == "mirror" and PD_MIRROR.is_ready()) or (mode == "auto" and PD_MIRROR.is_fresh()):
+            return {"deals": PD_MIRROR.search(qn)}
+        cached = DEAL_SEARCH_CACHE.get(qn)
+        if cached is not None:
+            return {"deals": cached["deals"]}
+        deals = _search_deals_from_prefix(qn)
+        if deals is not None:
+            return {"deals": deals}
+        result = _search_deals_live(q)
+        DEAL_SEARCH_CACHE.set(qn, result)
+        return {"deals": result["deals"]}
+    except Exception as e:
+        log.error(f"Pipedrive 거래 검색 오류: {e}")
+        return {"deals": []}
 
-        # 2) 조직명 검색 → 해당 조직의 거래 수집 (제목에 회사명 없는 거래 대비)
-        org_names = {}  # org_id -> name
-        for term in terms:
-            try:
-                org_res = HTTP.get(f"{base_url}/organizations/search", params={
-                    "term": term, "fields": "name", "limit": 10, "api_token": token
-                }, timeout=TIMEOUT)
-                for org in _pd_extract_search_items(org_res.json()):
-                    oname = org.get("name", "") or ""
-                    if org.get("id") and qn in _norm_text(oname):
-                        org_names[org["id"]] = oname
-            except Exception as e:
-                print(f"[WARN] organizations/search '{term}' 오류: {e}", flush=True)
 
-        # v1 /organizations/{id}/deals는 v2에서 폐지 → /deals?org_id= 로 대체
-        # v2 status 필터는 open/won/lost/deleted만 허용 (v1의 all_not_deleted 값 사용 불가) → 생략
-        org_deal_add_times = {}  # deal_id -> add_time (조직 거래 조회 시 함께 확보)
-        for org_id in list(org_names.keys())[:5]:  # 과도한 API 호출 방지
-            try:
-                od_res = HTTP.get(
-                    f"{base_url}/deals",
-                    params={"api_token": token, "limit": 100, "org_id": org_id},
-                    timeout=TIMEOUT
-                )
-                od_data = od_res.json()
-                if od_data.get("success") and od_data.get("data"):
-                    for d in od_data["data"]:
-                        org_deal_add_times[d["id"]] = (d.get("add_time") or "")[:10]
-                        if d["id"] not in raw_deals:
-                            raw_deals[d["id"]] = {
-                                "id": d["id"],
-                                "title": d.get("title", "") or "",
-                                "organization": {"id": org_id, "name": org_names[org_id]},
-                                "value": d.get("value") or 0,
-                                "currency": d.get("currency", "KRW"),
-                                "status": d.get("status", ""),
-                            }
-            except Exception as e:
-                print(f"[WARN] org/{org_id} deals fetch 오류: {e}", flush=True)
+def _search_deals_live(q, debug=False):
+    """Pipedrive 검색 API 호출 → {"deals": [...], "complete": bool} (debug면 필터 전 원본)
 
-        # 디버그 모드: 필터링 없이 수집된 원본 반환
-        if debug:
-            return {"total": len(raw_deals), "raw_items": list(raw_deals.values())}
-
-        # 3) 필터: 정규화 후 제목 또는 조직명에 검색어 포함되면 통과
-        deals = []
-        org_id_to_indices = {}  # add_time 미확보 거래의 org_id -> 인덱스
-        for deal in raw_deals.values():
-            title = deal.get("title", "") or ""
-            org_info = deal.get("organization") or {}
-            org_name = org_info.get("name", "") or ""
-            org_id = org_info.get("id")
-
-            if qn not in _norm_text(title) and qn not in _norm_text(org_name):
-                continue
+    호출을 두 번의 병렬 라운드로 묶는다 (요청당 최대 SEARCH_FANOUT_CONCURRENCY개 동시, 전체 SEARCH_DEADLINE_SEC 안에서):
+    1) 검색어 변형별 거래 제목 검색 + 조직명 검색
+    2) 관련 조직의 거래 목록 (/deals?org_id=) — 조직명이 일치한 조직의 거래 수집과
+       add_time 보충에 같은 응답을 함께 사용 (조직당 1회만 조회)
+    마감까지 끝나지 않은 호출은 빼고 나머지로 응답 (complete=False → 접두어 캐시 재사용 안 함)
+    """
+    TIMEOUT = 10
+    deadline = time.monotonic() + SEARCH_DEADLINE_SEC
+    qn = norm_text(q)
+
+    def get_json(path, params):
+        timeout = max(0.5, min(TIMEOUT, deadline - time.monotonic()))
+        return PIPEDRIVE.get_json("v2", path, params, timeout=timeout)
+
+    def run_round(calls):
+        with metrics.span("search_fanout") as s:
+            results, errors, unfinished = fan_out(calls, SEARCH_EXECUTOR, SEARCH_FANOUT_CONCURRENCY, deadline)
+            if errors or unfinished:
+                s.outcome = "partial"
+        for key, e in errors.items():
+            log.warning(f"{key[0]} '{key[1]}' 오류: {e}")
+        if unfinished:
+            log.warning(f"거래 검색 마감({SEARCH_DEADLINE_SEC}s) 초과 — 부분 결과로 응답: {unfinished}")
+        return results, not errors and not unfinished
+
+    # 검색어 변형: 입력 그대로 + 공백 제거 버전
+    terms = [q]
+    q_nospace = q.replace(" ", "")
+    if q_nospace != q and len(q_nospace) >= 2:
+        terms.append(q_nospace)
+
+    # 1) 거래 제목 검색 + 조직명 검색 (제목에 회사명 없는 거래 대비) — 동시에
+    calls = {}
+    for term in terms:
+        calls[("deals/search", term)] = functools.partial(
+            get_json, "/deals/search", {"term": term, "fields": "title", "limit": 30})
+        calls[("organizations/search", term)] = functools.partial(
+            get_json, "/organizations/search", {"term": term, "fields": "name", "limit": 10})
+    results, complete = run_round(calls)
+
+    raw_deals = {}  # deal_id -> deal dict (검색어 순서대로 병합, id로 중복 제거)
+    for term in terms:
+        if ("deals/search", term) in results:
+            items = _pd_extract_search_items(results[("deals/search", term)])
+            complete = complete and len(items) < 30
+            for deal in items:
+                if deal.get("id"):
+                    raw_deals.setdefault(deal["id"], dict(deal))
+
+    org_names = {}  # org_id -> name
+    for term in terms:
+        if ("organizations/search", term) in results:
+            orgs = _pd_extract_search_items(results[("organizations/search", term)])
+            complete = complete and len(orgs) < 10
+            for org in orgs:
+                oname = org.get("name", "") or ""
+                if org.get("id") and qn in norm_text(oname):
+                    org_names[org["id"]] = oname
+
+    # 2) 조직별 거래 목록 — 일치 조직(거래 수집) + 제목 검색 거래의 조직(add_time 보충, 검색 API는 add_time 미포함)
+    # v1 /organizations/{id}/deals는 v2에서 폐지 → /deals?org_id= 로 대체
+    # v2 status 필터는 open/won/lost/deleted만 허용 (v1의 all_not_deleted 값 사용 불가) → 생략
+    complete = complete and len(org_names) <= 5
+    collect_orgs = list(org_names.keys())[:5]  # 과도한 API 호출 방지
+    add_time_orgs = []
+    for deal in raw_deals.values():
+        org_id = (deal.get("organization") or {}).get("id")
+        if org_id and org_id not in collect_orgs and org_id not in add_time_orgs and _raw_deal_matches(deal, qn):
+            add_time_orgs.append(org_id)
+    listings, listings_ok = run_round({
+        ("deals?org_id", org_id): functools.partial(get_json, "/deals", {"limit": 100, "org_id": org_id})
+        for org_id in collect_orgs + add_time_orgs[:5]
+    })
+    complete = complete and listings_ok
+
+    org_deal_add_times = {}  # deal_id -> add_time
+    for od_data in listings.values():
+        if not (od_data.get("success") and od_data.get("data")):
+            continue
+        for d in od_data["data"]:
+            org_deal_add_times[d["id"]] = (d.get("add_time") or "")[:10]
+    for org_id in collect_orgs:
+        od_data = listings.get(("deals?org_id", org_id)) or {}
+        complete = complete and len(od_data.get("data") or []) < 100
+        if not (od_data.get("success") and od_data.get("data")):
+            continue
+        for d in od_data["data"]:
+            if d["id"] not in raw_deals:
+                raw_deals[d["id"]] = {
+                    "id": d["id"],
+                    "title": d.get("title", "") or "",
+                    "organization": {"id": org_id, "name": org_names[org_id]},
+                    "value": d.get("value") or 0,
+                    "currency": d.get("currency", "KRW"),
+                    "status": d.get("status", ""),
+                }
 
-            value = deal.get("value") or 0
-            value_fmt = f"{int(value):,}" if value else "-"
-
-            idx = len(deals)
-            deals.append({
-                "id": deal["id"],
-                "title": title,
-                "org_name": org_name,
-                "value": value_fmt,
-                "currency": deal.get("currency", "KRW"),
-                "add_time": org_deal_add_times.get(deal["id"], ""),
-                "status": deal.get("status", ""),
-            })
-            if org_id and not deals[idx]["add_time"]:
-                org_id_to_indices.setdefault(org_id, []).append(idx)
+    # 디버그 모드: 필터링 없이 수집된 원본 반환
+    if debug:
+        return {"total": len(raw_deals), "raw_items": list(raw_deals.values())}
+
+    # 3) 필터: 정규화 후 제목 또는 조직명에 검색어 포함되면 통과
+    deals = []
+    for deal in raw_deals.values():
+        if not _raw_deal_matches(deal, qn):
+            continue
+        value = deal.get("value") or 0
+        deals.append({
+            "id": deal["id"],
+            "title": deal.get("title", "") or "",
+            "org_name": (deal.get("organization") or {}).get("name", "") or "",
+            "value": f"{int(value):,}" if value else "-",
+            "currency": deal.get("currency", "KRW"),
+            "add_time": org_deal_add_times.get(deal["id"], ""),
+            "status": deal.get("status", ""),
+        })
+
+    # 최신 생성순 정렬
+    deals.sort(key=lambda d: d.get("add_time") or "", reverse=True)
+    return {"deals": deals, "complete": complete}
+
+
+def _raw_deal_matches(deal, qn):
+    """검색 API 원본 거래(dict)의 제목 또는 조직명에 정규화 검색어 포함 여부"""
+    org_name = (deal.get("organization") or {}).get("name", "")
+    return qn in norm_text(deal.get("title")) or qn in norm_text(org_name)
+
+
+@metrics.timed("history_fetch")
+def _fetch_history_rows(start_row):
+    """데이터 수집 시트의 start_row행부터 끝까지 (A~Y열) — 스프레드시트 열기 없이 values.get 1회
+
+    우선순위는 호출한 쪽 기준: 첫 /estimate-history의 동기화는 요청 처리, 미러의 백그라운드 동기화는 background
+    """
+    _, gc, _ = get_google_clients()
+    res = gc.http_client.values_get(DATA_COLLECTION_SHEET_ID, f"A{start_row}:Y")
+    return res.get("values", [])
 
-        # 4) add_time 미확보 거래만 조직별 조회로 보충 (검색 API는 add_time 미포함)
-        if org_id_to_indices:
-            deal_add_times = {}
-            for org_id in list(org_id_to_indices.keys())[:5]:
-                try:
-                    org_res = HTTP.get(
-                        f"{base_url}/deals",
-                        params={"api_token": token, "limit": 100, "org_id": org_id},
-                        timeout=TIMEOUT
-                    )
-                    org_data = org_res.json()
-                    if org_data.get("success") and org_data.get("data"):
-                        for d in org_data["data"]:
-                            deal_add_times[d["id"]] = (d.get("add_time") or "")[:10]
-                except Exception as e:
-                    print(f"[WARN] org/{org_id} deals fetch error: {e}", flush=True)
-
-            for deal_dict in deals:
-                if not deal_dict["add_time"]:
-                    deal_dict["add_time"] = deal_add_times.get(deal_dict["id"], "")
-
-        # 최신 생성순 정렬
-        deals.sort(key=lambda d: d.get("add_time") or "", reverse=True)
-        return {"deals": deals}
-    except Exception as e:
-        print(f"Pipedrive 거래 검색 오류: {e}")
-        return {"deals": []}
+# 발행목록 로컬 미러 — /estimate-history는 메모리에서 응답, /collect-data append는 즉시 반영
+HISTORY_MIRROR = SheetMirror(_fetch_history_rows)
+# 회사명/견적번호/담당자 n-gram 색인 — 미러에 행이 들어올 때마다 갱신, 전체 재동기화 시 새로 만들어 교체
+HISTORY_INDEX = HistoryIndex()
+HISTORY_MIRROR.add_listener(HISTORY_INDEX.add, HISTORY_INDEX.rebuild)
+
+
+@background
+def _append_collected_rows(rows):
+    """데이터 수집 시트에 여러 행을 values.append 1회로 추가 (write-behind 버퍼의 플러시에서 호출)"""
+    _, gc, _ = get_google_clients()
+    try:
+        ws = SHEET_HANDLES.worksheet(gc, DATA_COLLECTION_SHEET_ID)
+        with metrics.span("append_flush"):
+            return ws.append_rows(rows)
+    except Exception:
+        SHEET_HANDLES.invalidate(DATA_COLLECTION_SHEET_ID)  # 시트 이름 변경 등 → 다음에 다시 열기
+        raise
+
+# /collect-data 행은 로컬 저널에 기록 후 바로 응답, 모아서 한 번에 append (전송되면 발행목록 미러에 바로 반영)
+COLLECT_APPENDS = AppendBuffer(DATA_COLLECTION_SHEET_ID, _append_collected_rows,
+                               on_flushed=HISTORY_MIRROR.apply_append_rows)
 
 
 @app.get("/estimate-history")
@@ -1256,45 +1529,21 @@ def estimate_history(person: str = "", q: str = "", limit: int = 20):
     - 최신 발행순(시트 아래쪽부터)으로 최대 limit건 반환
     """
     try:
-        creds, gc, drive_service = get_google_clients()
-        sh = gc.open_by_key(DATA_COLLECTION_SHEET_ID)
-        ws = sh.sheet1
-        rows = ws.get_all_values()
+        # 시트 전체를 매번 내려받지 않고 로컬 미러에서 응답 (새 행만 백그라운드로 동기화)
+        HISTORY_MIRROR.ensure_fresh()
 
-        pn = _norm_text(person)
-        qn = _norm_text(q)
+        pn = norm_text(person)
+        qn = norm_text(q)
         try:
             limit = max(1, min(int(limit), 50))
         except Exception:
             limit = 20
 
-        items = []
-        # 최신 행이 아래쪽에 append되므로 뒤에서부터 탐색 (0행은 헤더)
-        for i in range(len(rows) - 1, 0, -1):
-            r = list(rows[i]) + [""] * max(0, 25 - len(rows[i]))
-            date_s, number, manager, company = r[0], r[1], r[2], r[3]
-            if not number and not company:
-                continue
-            if pn and pn not in _norm_text(manager):
-                continue
-            if qn and qn not in _norm_text(company) and qn not in _norm_text(number):
-                continue
-            # W열(견적파일 엑셀 링크)에서 파일 ID 추출
-            m = re.search(r"/d/([a-zA-Z0-9_-]+)", r[22] or "")
-            items.append({
-                "date": date_s,
-                "number": number,
-                "manager": manager,
-                "company": company,
-                "total": r[19],          # T열: 최종견적(VAT포함)
-                "file_id": m.group(1) if m else "",
-                "deal_id": r[24],        # Y열: Pipedrive 거래 ID
-            })
-            if len(items) >= limit:
-                break
+        # 행마다 정규화/부분일치를 반복하지 않고 n-gram 색인으로 후보만 최신순 확인 (limit건에서 중단)
+        items = HISTORY_INDEX.search(pn, qn, limit)
         return {"status": "success", "items": items}
     except Exception as e:
-        print(f"[ERROR] estimate-history 오류: {e}")
+        log.error(f"estimate-history 오류: {e}")
         return {"status": "error", "message": str(e), "items": []}
 
 
@@ -1315,8 +1564,7 @@ def load_estimate(file_id: str = ""):
         return {"status": "error", "message": "file_id가 필요합니다."}
     try:
         creds, gc, drive_service = get_google_clients()
-        sh = gc.open_by_key(file_id)
-        ws = sh.sheet1
+        ws = SHEET_HANDLES.worksheet(gc, file_id)
 
         # CELL_MAP 기준 읽기 대상 (한 번의 batch_get으로 조회)
         ranges = ["F5", "F6", "B11", "B12", "B13", "D10", "E11", "E12", "E13",
@@ -1364,144 +1612,160 @@ def load_estimate(file_id: str = ""):
         }
         return {"status": "success", "data": data}
     except Exception as e:
-        print(f"[ERROR] load-estimate 오류: {e}")
+        log.error(f"load-estimate 오류: {e}")
+        SHEET_HANDLES.invalidate(file_id)
         return {"status": "error", "message": f"견적서를 불러오지 못했습니다: {e}"}
 
 
-def update_pipedrive_deal_estimate(deal_id, estimate_number, pdf_filename, estimate_link, pdf_link):
-    """기존 Pipedrive 거래에 견적번호 추가 및 PDF 첨부
+def update_pipedrive_quote_number(deal_id, payloads, attempts=0):
+    """PD_OUTBOX "quote" 처리: 거래 견적번호 커스텀 필드에 견적번호들을 누적 (v2 GET 한 번 → PATCH 한 번)
 
-    Deals는 API v2 사용. Notes/Files는 v2 엔드포인트가 아직 없어(2026-07 기준,
-    Pipedrive 공식 답변 "Notes는 당분간 v1 계속 사용 권장") v1을 그대로 유지.
+    같은 거래에 쌓인 견적번호는 한 번에 기록. 이미 들어 있는 번호는 건너뜀 → 재시도·중복 접수에도 한 번만.
+    거래 조회/수정 실패는 예외 (outbox가 백오프 후 재시도). 기록된 필드 값 반환.
     """
-    TIMEOUT = 15  # 초
-    try:
-        pipedrive_settings = get_pipedrive_config()
-        base_url_v2 = f"https://{pipedrive_settings['domain']}/api/v2"
-        base_url_v1 = f"https://{pipedrive_settings['domain']}/api/v1"
-        token = pipedrive_settings["api_token"]
-
-        # 기존 견적번호 가져오기 (누적 저장)
-        deal_res = HTTP.get(f"{base_url_v2}/deals/{deal_id}?api_token={token}", timeout=TIMEOUT)
-        existing = ""
-        if deal_res.status_code == 200:
-            existing = _pd_custom_field_value(deal_res.json().get("data"), PIPEDRIVE_QUOTE_NUM_FIELD_KEY)
-        else:
-            print(f"[WARN] 거래 조회 실패 - deal_id: {deal_id}, status: {deal_res.status_code}, body: {deal_res.text[:200]}")
-
-        # 견적번호 누적 (기존값 있으면 쉼표로 구분)
-        new_value = f"{existing}, {estimate_number}".strip(", ") if existing else estimate_number
-
-        # 커스텀 필드 업데이트 (v2: PUT→PATCH, custom_fields 중첩 구조)
-        # 주의: 텍스트형 커스텀필드의 정확한 쓰기 body 구조는 실제 토큰으로 라이브 테스트 필요
-        update_res = HTTP.patch(
-            f"{base_url_v2}/deals/{deal_id}?api_token={token}",
-            json={"custom_fields": {PIPEDRIVE_QUOTE_NUM_FIELD_KEY: {"value": new_value}}},
-            timeout=TIMEOUT
+    numbers = [p["estimate_number"] for p in payloads if p.get("estimate_number")]
+    if attempts:
+        PIPEDRIVE.invalidate_deal(deal_id)  # 재시도는 캐시 말고 현재 값 기준으로
+
+    # 기존 견적번호 가져오기 (누적 저장) — 조회에 실패하면 기존 값을 덮어쓰지 않도록 중단
+    with metrics.span("pd_get") as s:
+        deal = PIPEDRIVE.get_deal(deal_id)
+        if deal is None:
+            s.outcome = "error"
+    if deal is None:
+        raise RuntimeError(f"거래 조회 실패 - deal_id: {deal_id}")
+    existing = _pd_custom_field_value(deal, PIPEDRIVE_QUOTE_NUM_FIELD_KEY)
+    recorded = [n.strip() for n in str(existing).split(",") if n.strip()]
+    new_numbers = [n for n in dict.fromkeys(numbers) if n not in recorded]
+    if not new_numbers:
+        return existing
+
+    # 견적번호 누적 (기존값 있으면 쉼표로 구분)
+    new_value = ", ".join(recorded + new_numbers)
+
+    # 커스텀 필드 업데이트 (v2: PUT→PATCH, custom_fields 중첩 구조)
+    # 주의: 텍스트형 커스텀필드의 정확한 쓰기 body 구조는 실제 토큰으로 라이브 테스트 필요
+    with metrics.span("pd_patch") as s:
+        update_res = PIPEDRIVE.patch_deal(
+            deal_id, {"custom_fields": {PIPEDRIVE_QUOTE_NUM_FIELD_KEY: {"value": new_value}}}
         )
-        print(f"Pipedrive 거래 업데이트 결과: {update_res.status_code} - {update_res.text[:200]}")
         if update_res.status_code not in (200, 201):
-            print(f"[ERROR] 커스텀 필드 업데이트 실패 - deal_id: {deal_id}, status: {update_res.status_code}")
-            return None
-
-        # PDF 첨부 (Files API v1 유지)
-        if pdf_filename and os.path.exists(pdf_filename):
-            upload_file_to_pipedrive_deal(deal_id, pdf_filename, pdf_filename)
-
-        # 노트 추가 (Notes API v1 유지)
-        note_content = f"견적번호: {estimate_number}\n엑셀견적서: {estimate_link}\nPDF견적서: {pdf_link}"
-        HTTP.post(
-            f"{base_url_v1}/notes?api_token={token}",
-            json={"content": note_content, "deal_id": deal_id},
-            timeout=TIMEOUT
-        )
-        print(f"Pipedrive 기존 거래 업데이트 완료 - deal_id: {deal_id}, 견적번호: {new_value}")
-        return deal_id
-    except Exception as e:
-        print(f"[ERROR] Pipedrive 거래 업데이트 예외 - deal_id: {deal_id}, 오류: {type(e).__name__}: {e}")
-        return None
+            s.outcome = "error"
+    if update_res.status_code not in (200, 201):
+        raise RuntimeError(f"커스텀 필드 업데이트 실패 - deal_id: {deal_id}, status: {update_res.status_code}, "
+                           f"body: {update_res.text[:200]}")
+    log.info(f"Pipedrive 견적번호 기록 완료 - deal_id: {deal_id}, 견적번호: {new_value}")
+    invalidate_deal_search_cache(deal_id)
+    return new_value
+
+
+def _pd_note_content(estimate_number, estimate_link, pdf_link):
+    return f"견적번호: {estimate_number}\n엑셀견적서: {estimate_link}\nPDF견적서: {pdf_link}"
+
+
+def add_pipedrive_deal_note(deal_id, payloads, attempts=0):
+    """PD_OUTBOX "note" 처리: 거래에 견적번호/견적서 링크 노트 추가 (Notes API v1 유지). 노트 id 반환, 실패는 예외
+
+    Notes/Files는 v2 엔드포인트가 아직 없어(2026-07 기준, Pipedrive 공식 답변
+    "Notes는 당분간 v1 계속 사용 권장") v1을 그대로 사용.
+    재시도일 때는 같은 내용의 노트가 이미 있는지 먼저 확인 (보냈지만 응답을 못 받은 경우).
+    """
+    payload = payloads[0]
+    note_content = _pd_note_content(payload["estimate_number"], payload["estimate_link"], payload["pdf_link"])
+    if attempts:
+        res = PIPEDRIVE.request("GET", "v1", "/notes", params={"deal_id": deal_id, "limit": 100,
+                                                               "sort": "add_time DESC"})
+        if res.status_code == 200:
+            for note in res.json().get("data") or []:
+                if note.get("content") == note_content:
+                    return note.get("id")
+    with metrics.span("pd_note") as s:
+        res = PIPEDRIVE.request("POST", "v1", "/notes", json={"content": note_content, "deal_id": deal_id})
+        if res.status_code not in (200, 201):
+            s.outcome = "error"
+    if res.status_code not in (200, 201):
+        raise RuntimeError(f"Pipedrive 노트 추가 실패 - deal_id: {deal_id}, status: {res.status_code}")
+    return (res.json().get("data") or {}).get("id")
 
 
 # 참고: create_pipedrive_deal / create_pipedrive_organization / create_pipedrive_person /
 # get_pipedrive_user_id / get_pipedrive_stage_id 함수는 2026-05-13 "거래 선택 필수화" 이후
 # 미사용 코드가 되어 제거됨. 필요 시 git 히스토리(커밋 54b1e3b 이전) 참조.
+# update_pipedrive_deal_estimate(GET→PATCH→파일→노트 직렬 처리)는 /collect-data 단계 병렬화로
+# update_pipedrive_quote_number / upload_file_to_pipedrive_deal / add_pipedrive_deal_note 로 분리됐고,
+# 지금은 모두 PD_OUTBOX(pipedrive_outbox.py)가 요청 밖에서 실행함.
 
-def upload_file_to_pipedrive_deal(deal_id, file_path, file_name):
-    """Pipedrive 거래에 파일을 업로드합니다."""
-    file_handle = None
-    try:
-        if not deal_id or not file_path:
-            print("거래 ID 또는 파일 경로가 없습니다.")
-            return None
-            
-        pipedrive_settings = get_pipedrive_config()
-        url = f"https://{pipedrive_settings['domain']}/api/v1/files?api_token={pipedrive_settings['api_token']}"
-        
-        # 파일 업로드 데이터
-        file_handle = open(file_path, 'rb')
-        files = {
-            'file': (file_name, file_handle, 'application/pdf')
-        }
-        
-        data = {
-            'deal_id': deal_id
-        }
-        
-        print(f"Pipedrive 파일 업로드 정보:")
-        print(f"URL: {url}")
-        print(f"Deal ID: {deal_id}")
-        print(f"File: {file_name}")
-        
-        response = HTTP.post(url, files=files, data=data)
+def upload_file_to_pipedrive_deal(deal_id, payloads, attempts=0):
+    """PD_OUTBOX "file" 처리: outbox에 보관한 PDF를 Pipedrive 거래에 업로드. 파일 id 반환, 실패는 예외
 
-        print(f"File Upload Response Status: {response.status_code}")
-        print(f"File Upload Response Text: {response.text}")
-        
-        if response.status_code == 201:
-            result = response.json()
-            file_id = result.get("data", {}).get("id")
-            print(f"Pipedrive 파일 업로드 성공: {file_id}")
-            return file_id
-        else:
-            print(f"Pipedrive 파일 업로드 실패: {response.status_code} - {response.text}")
-            return None
-            
-    except Exception as e:
-        print(f"Pipedrive 파일 업로드 오류: {str(e)}")
-        return None
+    multipart 본문을 보관 파일에서 바로 스트리밍 (본문 전체를 메모리에 올리지 않음).
+    재시도일 때는 같은 이름의 파일이 이미 첨부됐는지 먼저 확인.
+    """
+    payload = payloads[0]
+    file_name = payload["file_name"]
+    if attempts:
+        res = PIPEDRIVE.request("GET", "v1", f"/deals/{deal_id}/files", params={"limit": 100})
+        if res.status_code == 200:
+            for f in res.json().get("data") or []:
+                if f.get("name") == file_name:
+                    return f.get("id")
+
+    # 파일 업로드 데이터 (file + deal_id 필드)
+    body, content_type = PdfArtifact.from_path(payload["path"]).multipart_body(
+        "file", file_name, fields={"deal_id": deal_id})
+    try:
+        log.info(f"Pipedrive 파일 업로드 - Deal ID: {deal_id}, File: {file_name}")
+        # 업로드 타임아웃은 PIPEDRIVE_UPLOAD_TIMEOUT_SEC (예전에는 타임아웃 없음)
+        with metrics.span("pd_file") as s:
+            response = PIPEDRIVE.upload("/files", body, content_type)
+            if response.status_code != 201:
+                s.outcome = "error"
     finally:
-        if file_handle:
-            file_handle.close()
+        body.close()
+    if response.status_code != 201:
+        raise RuntimeError(f"Pipedrive 파일 업로드 실패: {response.status_code} - {response.text[:200]}")
+    file_id = (response.json().get("data") or {}).get("id")
+    log.info(f"Pipedrive 파일 업로드 성공: {file_id}")
+    return file_id
 
-def get_today_pdf_count():
-    """오늘 PDF 생성 횟수를 가져오고 +1 증가시킵니다."""
-    try:
-        from datetime import datetime
-        today = datetime.now().strftime("%Y-%m-%d")
-        
-        # pdf_count.json 파일 읽기
-        if os.path.exists("pdf_count.json"):
-            with open("pdf_count.json", "r", encoding="utf-8") as f:
-                count_data = json.load(f)
-        else:
-            count_data = {}
-        
-        # 오늘 카운트 가져오기 (없으면 0)
-        today_count = count_data.get(today, 0)
-        
-        # 카운트 +1 증가
-        count_data[today] = today_count + 1
-        
-        # 파일에 저장
-        with open("pdf_count.json", "w", encoding="utf-8") as f:
-            json.dump(count_data, f, ensure_ascii=False, indent=2)
-        
-        print(f"오늘 PDF 생성 횟수: {today_count + 1}")
-        return today_count + 1
-        
-    except Exception as e:
-        print(f"PDF 카운트 처리 오류: {e}")
-        return 1  # 오류 시 기본값 1
+
+# Pipedrive 반영(견적번호·PDF 첨부·노트)은 로컬 outbox에 기록 → 백그라운드에서 거래별로 묶어 재시도
+PD_OUTBOX = PipedriveOutbox({
+    "quote": update_pipedrive_quote_number,
+    "file": upload_file_to_pipedrive_deal,
+    "note": add_pipedrive_deal_note,
+})
+
+
+def enqueue_pipedrive_updates(deal_id, estimate_number, estimate_link, pdf, pdf_filename, pdf_id, pdf_link):
+    """견적번호 누적·PDF 첨부·노트를 PD_OUTBOX에 한 번에 기록. 작업 id 목록 반환 (Pipedrive 호출 없음)
+
+    같은 견적번호는 거래 필드에 한 번만, 파일·노트는 Drive 업로드(pdf_id)마다 한 번만.
+    파일·노트는 거래의 견적번호 기록(quote)이 성공한 뒤에 서로 병렬로 실행됨 (PD_OUTBOX prerequisite_kinds / parallel)
+    """
+    upload_key = pdf_id or uuid.uuid4().hex
+    tasks = [("quote", f"quote:{deal_id}:{estimate_number}", {"estimate_number": estimate_number})]
+    if pdf is not None:
+        path = PD_OUTBOX.spool(pdf.open())
+        tasks.append(("file", f"file:{deal_id}:{upload_key}", {"path": path, "file_name": pdf_filename}))
+    tasks.append(("note", f"note:{deal_id}:{upload_key}", {
+        "estimate_number": estimate_number, "estimate_link": estimate_link, "pdf_link": pdf_link,
+    }))
+    return PD_OUTBOX.enqueue(deal_id, tasks)
+
+def _estimate_seq_scope(person_id):
+    """일련번호 카운터 범위: 담당자별 모드면 담당자 ID, 아니면 하루 공용("")"""
+    return person_id if (ESTIMATE_SEQ_PER_PERSON and person_id) else ""
+
+def get_today_pdf_count(person_id=""):
+    """오늘 견적번호 일련번호를 원자적으로 발급 (워커 간 중복 없음, estimate_seq 참고)
+
+    발급 실패(SQLite busy 등)는 예외 그대로 → /estimate가 오류로 응답. 기본값(1)으로 대신하면 번호가 겹침
+    """
+    today = datetime.now().strftime("%Y-%m-%d")
+    count = estimate_seq.next_number(today, _estimate_seq_scope(person_id))
+    log.info(f"오늘 PDF 생성 횟수: {count}")
+    return count
 
 @app.get("/test")
 async def test_endpoint():
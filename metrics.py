@@ -0,0 +1,170 @@
+"""지연 시간 계측 (단계별 span → Prometheus 히스토그램 + Server-Timing 헤더)
+
+느린 /collect-data가 Sheets export 때문인지, Drive 업로드·Pipedrive·append_row 때문인지
+응답의 timing 필드(요청 하나)와 로그 말고는 알 수 없었다.
+
+- span(stage): with 블록 소요 시간을 STAGE_SECONDS{endpoint, stage, outcome}에 기록
+  (예외가 나면 outcome="error", 반환값으로 실패를 알리는 곳은 s.outcome을 직접 설정)
+- timed(stage, failed=None): 함수 전체를 span으로 감싸는 데코레이터
+- endpoint 라벨은 begin_request()가 설정한 값 (HTTP 미들웨어: 라우트 경로), 요청 밖은 "background".
+  contextvar라서 run_blocking / pipeline 스레드로 복사됨
+- 요청 중에 기록된 span은 요청별 목록에도 쌓여 server_timing()으로 Server-Timing 헤더가 됨
+- render(): /metrics 용 Prometheus 텍스트 형식 (prometheus_client 의존성 없이 히스토그램만)
+- 값은 워커 프로세스별 (gunicorn 워커마다 따로 집계)
+"""
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 초 단위 — Google/Pipedrive 호출은 수십 ms ~ 수십 초
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_REGISTRY = []
+
+_endpoint = contextvars.ContextVar("metrics_endpoint", default="background")
+_spans = contextvars.ContextVar("metrics_spans", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_le(bound):
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._lock = threading.Lock()
+        self._series = {}  # label 값 튜플 -> [버킷별 개수..., 합계]
+        _REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-1] += value
+
+    def samples(self, **labels):
+        """{"count", "sum", "buckets": {le: 누적 개수}} (테스트·/cache-stats 확인용)"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = list(self._series.get(key) or [0] * len(self.buckets) + [0.0])
+        cumulative, buckets = 0, {}
+        for bound, n in zip(self.buckets, series):
+            cumulative += n
+            buckets[_format_le(bound)] = cumulative
+        return {"count": cumulative, "sum": series[-1], "buckets": buckets}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            labels = ",".join(f'{n}="{_escape(v)}"' for n, v in zip(self.labelnames, key))
+            prefix = labels + "," if labels else ""
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{prefix}le="{_format_le(bound)}"}} {cumulative}')
+            lines.append(f"{self.name}_sum{{{labels}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{labels}}} {cumulative}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "auto_estimate_request_seconds", "HTTP 요청 처리 시간 (초)", ("endpoint", "method", "status"))
+STAGE_SECONDS = Histogram(
+    "auto_estimate_stage_seconds", "단계별 소요 시간 (초)", ("endpoint", "stage", "outcome"))
+
+
+def render():
+    lines = []
+    for metric in _REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def begin_request(endpoint):
+    """현재 컨텍스트를 endpoint 요청으로 설정 → end_request(tokens)가 기록된 span 목록 반환"""
+    return _endpoint.set(endpoint), _spans.set([])
+
+
+def end_request(tokens):
+    endpoint_token, spans_token = tokens
+    spans = _spans.get() or []
+    _spans.reset(spans_token)
+    _endpoint.reset(endpoint_token)
+    return spans
+
+
+def current_endpoint():
+    return _endpoint.get()
+
+
+def record(stage, seconds, outcome="ok"):
+    STAGE_SECONDS.observe(seconds, endpoint=_endpoint.get(), stage=stage, outcome=outcome)
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((stage, seconds))
+
+
+class _Span:
+    __slots__ = ("outcome",)
+
+    def __init__(self):
+        self.outcome = "ok"
+
+
+@contextmanager
+def span(stage):
+    s = _Span()
+    started = time.perf_counter()
+    try:
+        yield s
+    except BaseException:
+        s.outcome = "error"
+        raise
+    finally:
+        record(stage, time.perf_counter() - started, s.outcome)
+
+
+def timed(stage, failed=None):
+    """함수 호출을 span(stage)으로 기록. failed(반환값)이 참이면 outcome="error" (오류를 dict/False로 반환하는 함수용)"""
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage) as s:
+                result = func(*args, **kwargs)
+                if failed is not None and failed(result):
+                    s.outcome = "error"
+                return result
+        return wrapper
+
+    return decorate
+
+
+def server_timing(spans, total_seconds=None):
+    """[(stage, 초), ...] → Server-Timing 헤더 값 (같은 단계는 합산, 처음 나온 순서 유지)"""
+    totals = {}
+    for stage, seconds in spans:
+        totals[stage] = totals.get(stage, 0.0) + seconds
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items()]
+    if total_seconds is not None:
+        parts.append(f"total;dur={total_seconds * 1000:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,159 @@
+"""요청별 PDF 버퍼 (내려받기 → Drive 업로드 → Pipedrive 업로드를 한 버퍼로)
+
+예전 /collect-data는 export 응답 전체를 response.content로 받아 작업 폴더에
+"애니트론견적서_{회사}_{번호}.pdf"로 쓰고, Drive 업로드(MediaFileUpload)와 Pipedrive 업로드가
+그 파일을 각각 다시 열었다. 같은 회사·번호의 요청이 동시에 오면 파일명도 겹쳤다.
+
+- PdfArtifact: 청크 단위로 받아 메모리(BytesIO)에 쌓고, spool_max를 넘으면 요청 전용 폴더의 파일로 옮김
+- open(): 소비자마다 독립된 읽기 객체 — 메모리면 같은 bytes를 공유하는 BytesIO (복사 없음)
+- multipart_body(): Pipedrive 파일 업로드용 multipart 본문을 버퍼를 복사하지 않고 스트리밍
+- scratch_dir(): 요청마다 분리된 임시 폴더 (끝나면 통째로 삭제)
+"""
+import io
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+
+from config import PDF_SPOOL_MAX_BYTES, PDF_SCRATCH_DIR
+
+
+@contextmanager
+def scratch_dir():
+    """요청 전용 임시 폴더 (PDF_SCRATCH_DIR 아래, 없으면 시스템 임시 폴더)"""
+    path = tempfile.mkdtemp(prefix="estimate-", dir=PDF_SCRATCH_DIR or None)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+class PdfArtifact:
+    """한 번 쓰고 여러 번 읽는 PDF 버퍼 (write → open/getvalue)"""
+
+    def __init__(self, scratch, spool_max=PDF_SPOOL_MAX_BYTES):
+        self.scratch = scratch
+        self.spool_max = spool_max
+        self.size = 0
+        self.path = None          # 디스크로 옮겨졌을 때 파일 경로
+        self._mem = io.BytesIO()
+        self._file = None
+        self._data = None         # 메모리 버퍼의 최종 bytes (freeze 후)
+
+    @classmethod
+    def from_path(cls, path):
+        """이미 디스크에 있는 PDF(Pipedrive outbox 보관본 등)를 읽기 전용 버퍼로"""
+        artifact = cls(os.path.dirname(path))
+        artifact.path = path
+        artifact._mem = None
+        artifact.size = os.path.getsize(path)
+        return artifact
+
+    # --- 쓰기 (reportlab·MediaIoBaseDownload도 파일 객체로 사용) ---
+
+    def write(self, chunk):
+        if self._data is not None:
+            raise ValueError("이미 완료된 PDF 버퍼에 쓰기")
+        if self._file is None and self._mem.tell() + len(chunk) > self.spool_max:
+            self.path = os.path.join(self.scratch, f"{uuid.uuid4().hex}.pdf")
+            self._file = open(self.path, "wb")
+            self._file.write(self._mem.getbuffer())
+            self._mem = None
+        (self._file or self._mem).write(chunk)
+        self.size += len(chunk)
+        return len(chunk)
+
+    def flush(self):
+        pass
+
+    def reset(self):
+        """쓰기 도중 실패한 내용을 버리고 처음부터 다시 (다른 생성 방식으로 재시도할 때)"""
+        if self._file is not None:
+            self._file.close()
+            os.remove(self.path)
+        self._file, self.path, self._data = None, None, None
+        self._mem = io.BytesIO()
+        self.size = 0
+
+    def freeze(self):
+        """쓰기 완료 (이후 open/getvalue 가능). 여러 번 불러도 됨"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        elif self._data is None and self._mem is not None:
+            self._data = self._mem.getvalue()
+            self._mem = None
+
+    # --- 읽기 ---
+
+    @property
+    def in_memory(self):
+        return self.path is None
+
+    def open(self):
+        """독립된 위치를 가진 읽기 전용 파일 객체"""
+        self.freeze()
+        if self.in_memory:
+            return io.BytesIO(self._data)  # 초기 bytes를 쓰기 전까지 복사하지 않고 공유
+        return open(self.path, "rb")
+
+    def getvalue(self):
+        self.freeze()
+        if self.in_memory:
+            return self._data
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def multipart_body(self, field, filename, content_type="application/pdf", fields=None):
+        """(본문 파일 객체, Content-Type 헤더) — requests data=로 넘기면 길이를 알고 블록 단위로 전송"""
+        boundary = uuid.uuid4().hex
+        filename = filename.replace('"', "%22")  # requests(files=)와 같은 HTML5 방식 — UTF-8 파일명 그대로
+        head = []
+        for name, value in (fields or {}).items():
+            head.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n')
+        head.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        )
+        tail = f"\r\n--{boundary}--\r\n".encode()
+        body = _ChainedReader([io.BytesIO("".join(head).encode()), self.open(), io.BytesIO(tail)])
+        return body, f"multipart/form-data; boundary={boundary}"
+
+
+class _ChainedReader(io.RawIOBase):
+    """여러 파일 객체를 이어 읽는 스트림 (len을 알려 requests가 Content-Length로 전송)"""
+
+    def __init__(self, parts):
+        self._parts = parts
+        self.len = sum(_remaining(p) for p in parts)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def tell(self):
+        # requests는 len - tell()을 남은 길이로 계산 (tell이 실패하면 chunked 전송으로 바뀜)
+        return self._pos
+
+    def readinto(self, buf):
+        while self._parts:
+            n = self._parts[0].readinto(buf)
+            if n:
+                self._pos += n
+                return n
+            self._parts.pop(0).close()
+        return 0
+
+    def close(self):
+        for part in self._parts:
+            part.close()
+        self._parts = []
+        super().close()
+
+
+def _remaining(f):
+    pos = f.tell()
+    end = f.seek(0, io.SEEK_END)
+    f.seek(pos)
+    return end - pos
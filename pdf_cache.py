@@ -0,0 +1,133 @@
+"""내보낸 견적서 PDF 디스크 캐시 (시트 리비전 기준)
+
+Pipedrive 실패 등으로 같은 견적서를 다시 /collect-data 하면, 시트가 그대로여도 Google PDF export를
+다시 기다려야 했다. export 결과를 (시트 ID, Drive 리비전, export 파라미터) 키로 디스크에 보관하고,
+다음 export 때 가벼운 메타데이터 조회(files.get) 한 번으로 리비전이 같으면 보관본을 쓴다.
+
+- 리비전: Drive version (+ modifiedTime, 있으면 headRevisionId) — 시트 값이 바뀌면 version이 올라감
+- 파일은 임시 이름으로 쓴 뒤 os.replace → 여러 워커가 동시에 써도 깨진 파일을 읽지 않음
+- 전체 크기가 max_bytes를 넘으면 가장 오래 사용하지 않은(mtime) 파일부터 삭제
+"""
+import hashlib
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+
+from config import PDF_CACHE_DIR, PDF_CACHE_MAX_BYTES
+
+
+class PdfCache:
+    def __init__(self, directory=PDF_CACHE_DIR, max_bytes=PDF_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(sheet_id, revision, export_params):
+        return hashlib.sha256(f"{sheet_id}\n{revision}\n{export_params}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def open(self, key):
+        """보관본 읽기 객체 (없으면 None). 사용 시각 갱신 → 삭제 순서에서 뒤로"""
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+        return f
+
+    @contextmanager
+    def writer(self, key):
+        """보관본 쓰기 — commit()을 불러야 저장되고, 아니면(예외 포함) 버림. 비활성이면 None"""
+        if not self.enabled or not key:
+            yield None
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        w = _CacheWriter(os.path.join(self.directory, f".{key}.{uuid.uuid4().hex}.tmp"))
+        try:
+            yield w
+        finally:
+            w.close()
+            if w.committed:
+                os.replace(w.tmp_path, self._path(key))
+                self._evict()
+            else:
+                try:
+                    os.remove(w.tmp_path)
+                except OSError:
+                    pass
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".pdf"):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue  # 다른 워커가 방금 삭제
+            entries.append((st.st_mtime, st.st_size, name))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+                total -= size
+                with self._lock:
+                    self.evictions += 1
+            except FileNotFoundError:
+                pass
+
+    def stats(self):
+        entries = self._entries() if self.enabled and os.path.isdir(self.directory) else []
+        return {
+            "enabled": self.enabled,
+            "files": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class _CacheWriter:
+    def __init__(self, tmp_path):
+        self.tmp_path = tmp_path
+        self._f = open(tmp_path, "wb")
+        self.committed = False
+
+    def write(self, chunk):
+        return self._f.write(chunk)
+
+    def commit(self):
+        self.committed = True
+
+    def close(self):
+        self._f.close()
+
@@ -0,0 +1,215 @@
+"""Pipedrive API 클라이언트 (속도 제한 헤더 기반 페이싱 + 호출별 지연/할당량 통계 + 거래 캐시)
+
+main.py의 Pipedrive 호출은 각자 HTTP.get/patch/post를 직접 불렀고, x-ratelimit-* 헤더를 보지 않아
+검색 팬아웃·미러 동기화·/collect-data가 겹치면 429가 그대로 실패가 됐다. 파일 업로드에는 타임아웃도 없었다.
+
+- request(): 모든 호출이 거치는 한 곳. 기본 타임아웃(업로드는 upload_timeout)과 api_token을 붙임
+- 응답의 x-ratelimit-limit / x-ratelimit-remaining / x-ratelimit-reset(창이 리셋될 때까지 초)을 기록,
+  남은 예산이 min_remaining 이하면 다음 호출은 창이 리셋될 때까지 대기 (최대 max_pace_wait)
+  → Pipedrive에 보내서 429를 받는 대신 여기서 기다림. 동시에 나가는 호출은 남은 예산을 하나씩 미리 차감
+- 429를 받으면 Retry-After(없으면 x-ratelimit-reset)만큼 기다렸다가 재시도 (다시 읽을 수 없는 스트림 본문은 재시도 안 함)
+- get_deal()/patch_deal(): 방금 읽은(또는 고친) 거래를 deal_ttl초 동안 재사용 → 같은 거래 견적이 이어지면 GET 생략.
+  PATCH가 성공하면 보낸 custom_fields를 캐시에 반영. 캐시는 워커 프로세스 단위라 TTL을 짧게 유지
+- stats(): 엔드포인트별(숫자 ID는 {id}로 묶음) 호출 수·오류·429·평균/최대 지연, 남은 할당량
+"""
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+
+from config import (
+    PIPEDRIVE_TIMEOUT_SEC, PIPEDRIVE_UPLOAD_TIMEOUT_SEC, PIPEDRIVE_RATE_MIN_REMAINING,
+    PIPEDRIVE_MAX_PACE_SEC, PIPEDRIVE_RETRY_MAX, PIPEDRIVE_DEAL_CACHE_TTL_SEC,
+)
+from ttl_cache import TTLCache
+
+log = logging.getLogger(__name__)
+
+_ID_SEGMENT = re.compile(r"/\d+")
+
+
+def _header_float(headers, name):
+    try:
+        value = headers.get(name)
+        return float(value) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _endpoint(method, version, path):
+    return f"{method} {version}{_ID_SEGMENT.sub('/{id}', path.split('?')[0])}"
+
+
+class PipedriveClient:
+    """session: requests.Session, config_func() -> {"api_token", "domain"} (호출마다 읽음)"""
+
+    def __init__(self, session, config_func, timeout=PIPEDRIVE_TIMEOUT_SEC, upload_timeout=PIPEDRIVE_UPLOAD_TIMEOUT_SEC,
+                 min_remaining=PIPEDRIVE_RATE_MIN_REMAINING, max_pace_wait=PIPEDRIVE_MAX_PACE_SEC,
+                 retry_max=PIPEDRIVE_RETRY_MAX, deal_ttl=PIPEDRIVE_DEAL_CACHE_TTL_SEC,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.session = session
+        self.config_func = config_func
+        self.timeout = timeout
+        self.upload_timeout = upload_timeout
+        self.min_remaining = min_remaining
+        self.max_pace_wait = max_pace_wait
+        self.retry_max = retry_max
+        self.deals = TTLCache(256, deal_ttl, clock=clock)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        # 마지막 응답 기준 할당량 (모르면 None)
+        self._limit = None
+        self._remaining = None
+        self._reset_at = None
+        self._daily_left = None
+        self.paced = 0
+        self.paced_ms = 0.0
+        self._endpoints = defaultdict(lambda: {"calls": 0, "errors": 0, "throttled": 0,
+                                               "total_ms": 0.0, "max_ms": 0.0, "last_status": None})
+
+    # --- 페이싱 ---
+
+    def _pace(self):
+        """남은 예산이 적으면 창이 리셋될 때까지 대기. 기다린 시간(초) 반환"""
+        with self._lock:
+            now = self._clock()
+            if self._reset_at is not None and now >= self._reset_at:
+                self._remaining = None  # 새 창 — 다음 응답 헤더로 다시 알게 됨
+                self._reset_at = None
+            wait = 0.0
+            if self._remaining is not None and self._remaining <= self.min_remaining and self._reset_at is not None:
+                wait = min(self._reset_at - now, self.max_pace_wait)
+            elif self._remaining is not None:
+                self._remaining -= 1  # 동시에 나가는 호출끼리 남은 예산을 나눠 씀
+            if wait > 0:
+                self.paced += 1
+                self.paced_ms += wait * 1000
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+    def _observe(self, response):
+        headers = response.headers
+        remaining = _header_float(headers, "x-ratelimit-remaining")
+        reset = _header_float(headers, "x-ratelimit-reset")
+        limit = _header_float(headers, "x-ratelimit-limit")
+        daily_left = _header_float(headers, "x-daily-requests-left")
+        with self._lock:
+            if limit is not None:
+                self._limit = int(limit)
+            if remaining is not None:
+                self._remaining = int(remaining)
+            if reset is not None:
+                self._reset_at = self._clock() + reset
+            if daily_left is not None:
+                self._daily_left = int(daily_left)
+            if response.status_code == 429:
+                self._remaining = 0
+                retry_after = _header_float(headers, "retry-after")
+                if retry_after is not None:
+                    self._reset_at = self._clock() + retry_after
+                elif self._reset_at is None:
+                    self._reset_at = self._clock() + 1.0
+
+    def _record(self, endpoint, status, elapsed_ms):
+        with self._lock:
+            s = self._endpoints[endpoint]
+            s["calls"] += 1
+            s["total_ms"] += elapsed_ms
+            s["max_ms"] = max(s["max_ms"], elapsed_ms)
+            s["last_status"] = status
+            if status is None or status >= 400:
+                s["errors"] += 1
+            if status == 429:
+                s["throttled"] += 1
+
+    # --- 호출 ---
+
+    def request(self, method, version, path, params=None, timeout=None, **kwargs):
+        """Pipedrive 호출 (requests.Response 반환, 네트워크 오류는 예외). version: "v1" / "v2" """
+        settings = self.config_func()
+        url = f"https://{settings['domain']}/api/{version}{path}"
+        params = {**(params or {}), "api_token": settings["api_token"]}
+        endpoint = _endpoint(method, version, path)
+        replayable = not hasattr(kwargs.get("data"), "read")
+        for attempt in range(self.retry_max + 1):
+            self._pace()
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, params=params, timeout=timeout or self.timeout, **kwargs)
+            except Exception:
+                self._record(endpoint, None, (time.perf_counter() - started) * 1000)
+                raise
+            self._record(endpoint, response.status_code, (time.perf_counter() - started) * 1000)
+            self._observe(response)
+            if response.status_code != 429 or attempt == self.retry_max or not replayable:
+                return response
+            # 대기는 다음 _pace()에서 (429 응답으로 남은 예산 0, 리셋 시각 = Retry-After)
+            log.warning(f"⚠️ [Pipedrive] 429 {endpoint} → 재시도 ({attempt + 1}/{self.retry_max})")
+
+    def get_json(self, version, path, params=None, timeout=None):
+        return self.request("GET", version, path, params=params, timeout=timeout).json()
+
+    def upload(self, path, body, content_type):
+        """multipart 본문(파일형 객체) 업로드 — v1, upload_timeout 적용"""
+        return self.request("POST", "v1", path, data=body, headers={"Content-Type": content_type},
+                            timeout=self.upload_timeout)
+
+    # --- 거래 ---
+
+    def get_deal(self, deal_id):
+        """v2 거래 data (deal_ttl 안에 읽거나 고친 거래면 캐시). 조회 실패면 None"""
+        key = str(deal_id)
+        deal = self.deals.get(key)
+        if deal is not None:
+            return deal
+        res = self.request("GET", "v2", f"/deals/{deal_id}")
+        if res.status_code != 200:
+            log.warning(f"거래 조회 실패 - deal_id: {deal_id}, status: {res.status_code}, body: {res.text[:200]}")
+            return None
+        deal = res.json().get("data") or {}
+        self.deals.set(key, deal)
+        return deal
+
+    def patch_deal(self, deal_id, body):
+        """v2 거래 PATCH. 성공하면 캐시된 거래에 보낸 custom_fields를 반영 (다음 견적에서 GET 생략)"""
+        res = self.request("PATCH", "v2", f"/deals/{deal_id}", json=body)
+        key = str(deal_id)
+        if res.status_code not in (200, 201):
+            self.deals.pop(key)
+            return res
+        cached = self.deals.peek(key)
+        if cached is not None:
+            patched = dict(cached)
+            patched["custom_fields"] = {**(cached.get("custom_fields") or {}), **(body.get("custom_fields") or {})}
+            self.deals.set(key, patched)
+        return res
+
+    def invalidate_deal(self, deal_id):
+        self.deals.pop(str(deal_id))
+
+    def stats(self):
+        with self._lock:
+            now = self._clock()
+            endpoints = {
+                name: {
+                    "calls": s["calls"],
+                    "errors": s["errors"],
+                    "throttled": s["throttled"],
+                    "avg_ms": round(s["total_ms"] / s["calls"], 1) if s["calls"] else None,
+                    "max_ms": round(s["max_ms"], 1),
+                    "last_status": s["last_status"],
+                }
+                for name, s in sorted(self._endpoints.items())
+            }
+            quota = {
+                "limit": self._limit,
+                "remaining": self._remaining,
+                "reset_in_sec": round(max(self._reset_at - now, 0), 1) if self._reset_at is not None else None,
+                "daily_left": self._daily_left,
+                "paced": self.paced,
+                "paced_ms": round(self.paced_ms, 1),
+            }
+        return {"quota": quota, "endpoints": endpoints, "deal_cache": self.deals.stats()}
@@ -0,0 +1,276 @@
+"""Pipedrive 거래/조직 로컬 미러 (SQLite + 메모리)
+
+/search-deals가 입력마다 Pipedrive 검색 API를 여러 번 호출하던 것을, 로컬에 들고 있는
+거래/조직 목록에서 바로 응답할 수 있게 한다.
+
+- 처음 한 번 v2 /organizations, /deals를 커서 페이지로 전부 받아 SQLite에 저장 (bootstrap)
+- 이후 sync_interval마다 updated_since(마지막으로 본 update_time)로 바뀐 것만 가져옴
+- full_resync_interval마다 전체를 다시 받아 삭제된 거래/조직 정리
+- 메모리에는 정규화된 제목/조직명을 미리 계산해 두고 부분일치로 검색
+- 여러 gunicorn 워커 중 임대(lease)를 잡은 하나만 Pipedrive를 호출하고,
+  나머지는 SQLite에서 바뀐 행만 다시 읽어 메모리를 맞춤
+"""
+import logging
+import threading
+import time
+import uuid
+
+import state_db
+from config import PIPEDRIVE_MIRROR_SYNC_SEC, PIPEDRIVE_MIRROR_FULL_RESYNC_SEC, PIPEDRIVE_MIRROR_STALE_SEC
+from search_text import norm_text
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS pd_deals (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL DEFAULT '',
+        org_id INTEGER,
+        value REAL,
+        currency TEXT,
+        status TEXT,
+        add_time TEXT,
+        update_time TEXT NOT NULL DEFAULT ''
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pd_orgs (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL DEFAULT '',
+        update_time TEXT NOT NULL DEFAULT ''
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS pd_deals_update_time ON pd_deals (update_time)",
+    "CREATE INDEX IF NOT EXISTS pd_orgs_update_time ON pd_orgs (update_time)",
+    """
+    CREATE TABLE IF NOT EXISTS pd_mirror_state (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    """,
+]
+
+_PAGE_LIMIT = 500
+
+
+class PipedriveMirror:
+    """get_json(path, params) -> Pipedrive v2 응답 JSON (api_token·timeout은 호출하는 쪽에서 처리)"""
+
+    def __init__(self, get_json, sync_interval=PIPEDRIVE_MIRROR_SYNC_SEC,
+                 full_resync_interval=PIPEDRIVE_MIRROR_FULL_RESYNC_SEC,
+                 stale_after=PIPEDRIVE_MIRROR_STALE_SEC, db_path=None):
+        self.get_json = get_json
+        self.sync_interval = sync_interval
+        self.full_resync_interval = full_resync_interval
+        self.stale_after = stale_after
+        self.db_path = db_path
+        self._deals = {}        # id -> (정규화 제목, org_id, 응답 item)
+        self._orgs = {}         # id -> (이름, 정규화 이름)
+        self._cursor = {"deals": "", "orgs": ""}  # 메모리에 반영한 마지막 update_time
+        self._loaded_full_at = None  # 메모리 기준이 된 전체 동기화 시각 (다른 워커의 전체 동기화 감지용)
+        self._lock = threading.Lock()       # 메모리 보호
+        self._sync_lock = threading.Lock()  # 동기화는 한 번에 하나만
+        self._owner = uuid.uuid4().hex
+        self._thread = None
+        self._schema_ready = False
+
+    def _conn(self):
+        conn = state_db.get_conn(self.db_path)
+        if not self._schema_ready:
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+            self._schema_ready = True
+        return conn
+
+    def _state(self, key, default=None):
+        row = self._conn().execute("SELECT value FROM pd_mirror_state WHERE key = ?", (key,)).fetchone()
+        return row["value"] if row else default
+
+    # --- 조회 ---
+
+    def last_sync_age(self):
+        """마지막 성공 동기화(어느 워커든) 이후 경과 초 (한 번도 없으면 None)"""
+        last = self._state("last_sync_at")
+        return time.time() - float(last) if last else None
+
+    def is_ready(self):
+        """전체 목록을 한 번이라도 받아 메모리에 올렸는지"""
+        return self._loaded_full_at is not None
+
+    def is_fresh(self):
+        age = self.last_sync_age()
+        return self.is_ready() and age is not None and age <= self.stale_after
+
+    def search(self, qn, limit=100):
+        """정규화 검색어가 제목 또는 조직명에 포함된 거래를 최신 생성순으로 (live 검색과 같은 형식)"""
+        matches = []
+        with self._lock:
+            for title_n, org_id, item in self._deals.values():
+                org = self._orgs.get(org_id)
+                if qn in title_n or (org and qn in org[1]):
+                    matches.append(dict(item, org_name=org[0] if org else ""))
+        matches.sort(key=lambda d: d["add_time"], reverse=True)
+        return matches[:limit]
+
+    def stats(self):
+        age = self.last_sync_age()
+        return {
+            "ready": self.is_ready(),
+            "fresh": self.is_fresh(),
+            "deals": len(self._deals),
+            "orgs": len(self._orgs),
+            "last_sync_age_sec": round(age, 1) if age is not None else None,
+        }
+
+    # --- 메모리 반영 ---
+
+    def _put_deal(self, row):
+        value = row["value"] or 0
+        self._deals[row["id"]] = (norm_text(row["title"]), row["org_id"], {
+            "id": row["id"],
+            "title": row["title"] or "",
+            "value": f"{int(value):,}" if value else "-",
+            "currency": row["currency"] or "KRW",
+            "add_time": (row["add_time"] or "")[:10],
+            "status": row["status"] or "",
+        })
+
+    def reload(self):
+        """SQLite에서 메모리 갱신 — 다른 워커가 전체 동기화를 했으면 전부, 아니면 바뀐 행만"""
+        conn = self._conn()
+        full_at = self._state("last_full_sync_at")
+        if full_at is None:
+            return
+        full = full_at != self._loaded_full_at
+        since = {"deals": "", "orgs": ""} if full else dict(self._cursor)
+        orgs = conn.execute("SELECT id, name, update_time FROM pd_orgs WHERE update_time >= ?", (since["orgs"],)).fetchall()
+        deals = conn.execute("SELECT * FROM pd_deals WHERE update_time >= ?", (since["deals"],)).fetchall()
+        with self._lock:
+            if full:
+                self._deals, self._orgs = {}, {}
+            for row in orgs:
+                self._orgs[row["id"]] = (row["name"], norm_text(row["name"]))
+                self._cursor["orgs"] = max(self._cursor["orgs"], row["update_time"])
+            for row in deals:
+                if row["status"] == "deleted":
+                    self._deals.pop(row["id"], None)
+                else:
+                    self._put_deal(row)
+                self._cursor["deals"] = max(self._cursor["deals"], row["update_time"])
+            self._loaded_full_at = full_at
+
+    # --- Pipedrive 동기화 ---
+
+    def _pages(self, path, updated_since):
+        """v2 커서 페이지 순회 (update_time 오름차순)"""
+        params = {"limit": _PAGE_LIMIT, "sort_by": "update_time", "sort_direction": "asc"}
+        if updated_since:
+            params["updated_since"] = updated_since
+        cursor = None
+        while True:
+            page_params = dict(params, cursor=cursor) if cursor else params
+            res = self.get_json(path, page_params)
+            if not res.get("success"):
+                raise RuntimeError(f"Pipedrive {path} 조회 실패: {str(res)[:200]}")
+            yield res.get("data") or []
+            cursor = (res.get("additional_data") or {}).get("next_cursor")
+            if not cursor:
+                return
+
+    def _take_lease(self, seconds):
+        now = time.time()
+        with state_db.transaction(self.db_path) as conn:
+            row = conn.execute("SELECT value FROM pd_mirror_state WHERE key = 'lease'").fetchone()
+            if row:
+                owner, expires = row["value"].split("|")
+                if owner != self._owner and float(expires) > now:
+                    return False
+            conn.execute(
+                "INSERT INTO pd_mirror_state (key, value) VALUES ('lease', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (f"{self._owner}|{now + seconds}",),
+            )
+            return True
+
+    def _set_state(self, conn, **values):
+        conn.executemany(
+            "INSERT INTO pd_mirror_state (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            [(k, str(v)) for k, v in values.items()],
+        )
+
+    def sync(self, full=False):
+        """Pipedrive에서 바뀐 것(full=True면 전체)을 받아 SQLite·메모리에 반영. 다른 워커가 동기화 중이면 SQLite만 다시 읽음"""
+        with self._sync_lock:
+            self._conn()
+            full = full or self._state("last_full_sync_at") is None
+            if not self._take_lease(seconds=max(120, self.sync_interval * 2)):
+                self.reload()
+                return False
+            try:
+                started = time.time()
+                seen = {"orgs": set(), "deals": set()}
+                for kind, path in (("orgs", "/organizations"), ("deals", "/deals")):
+                    since = "" if full else self._state(f"{kind}_cursor", "")
+                    for page in self._pages(path, since):
+                        self._store_page(kind, page)
+                        seen[kind].update(item["id"] for item in page)
+                with state_db.transaction(self.db_path) as conn:
+                    if full:
+                        # 전체 목록에 없는 행 = Pipedrive에서 삭제됨
+                        for kind, table in (("orgs", "pd_orgs"), ("deals", "pd_deals")):
+                            known = {r["id"] for r in conn.execute(f"SELECT id FROM {table}")}
+                            gone = known - seen[kind]
+                            conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(i,) for i in gone])
+                        self._set_state(conn, last_full_sync_at=started)
+                    self._set_state(conn, last_sync_at=time.time())
+                self.reload()
+                return True
+            finally:
+                self._conn().execute(
+                    "DELETE FROM pd_mirror_state WHERE key = 'lease' AND value LIKE ?", (f"{self._owner}|%",))
+
+    def _store_page(self, kind, page):
+        if not page:
+            return
+        with state_db.transaction(self.db_path) as conn:
+            if kind == "orgs":
+                conn.executemany(
+                    "INSERT OR REPLACE INTO pd_orgs (id, name, update_time) VALUES (?, ?, ?)",
+                    [(o["id"], o.get("name") or "", o.get("update_time") or "") for o in page],
+                )
+            else:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO pd_deals (id, title, org_id, value, currency, status, add_time, update_time) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(d["id"], d.get("title") or "", d.get("org_id"), d.get("value") or 0, d.get("currency") or "",
+                      "deleted" if d.get("is_deleted") else (d.get("status") or ""),
+                      d.get("add_time") or "", d.get("update_time") or "") for d in page],
+                )
+            # 페이지마다 커서 저장 → 중간에 끊겨도 다음 동기화는 이어서
+            cursor = max(item.get("update_time") or "" for item in page)
+            prev = self._state(f"{kind}_cursor", "")
+            self._set_state(conn, **{f"{kind}_cursor": max(prev, cursor)})
+
+    # --- 백그라운드 ---
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="pipedrive-mirror", daemon=True)
+        self._thread.start()
+        log.info(f"✅ [Pipedrive 미러] 동기화 스레드 시작 (주기 {self.sync_interval}s)")
+
+    def _loop(self):
+        try:
+            self.reload()  # 재시작 시 SQLite에 있던 목록으로 바로 응답 가능
+        except Exception as e:
+            log.warning(f"⚠️ [Pipedrive 미러] 로컬 목록 읽기 실패: {e}")
+        while True:
+            try:
+                last_full = float(self._state("last_full_sync_at", 0))
+                self.sync(full=time.time() - last_full > self.full_resync_interval)
+            except Exception as e:
+                log.exception(f"⚠️ [Pipedrive 미러] 동기화 실패: {e}")
+            time.sleep(self.sync_interval)
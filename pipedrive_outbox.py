@@ -0,0 +1,365 @@
+"""Pipedrive 반영 outbox (SQLite 영속 작업 + 백그라운드 재시도)
+
+/collect-data는 견적번호 기록(GET→PATCH), PDF 첨부, 노트를 요청 안에서 보냈다.
+Pipedrive가 느리면 요청도 느렸고, PATCH가 실패하면 견적번호·PDF가 거래에 영영 남지 않았다.
+
+- enqueue(deal_id, tasks): 작업(kind별: quote / file / note)을 한 트랜잭션으로 pd_outbox에 기록하고 바로 반환
+  → /collect-data 응답 시간은 Pipedrive 상태와 무관. dedupe_key가 같은 작업은 한 번만 기록
+- 드레인 스레드가 due 작업을 거래별로 묶어 처리: batch_kinds(quote)는 같은 거래의 작업을 한 번의 호출로
+  (견적번호 여러 개 → GET 한 번 + PATCH 한 번), 나머지는 작업마다
+- prerequisite_kinds(quote)가 끝나지 않은 거래의 다른 작업(file / note)은 기다림
+  → PDF 첨부·노트는 견적번호 기록이 성공한 거래에만 (quote가 dead면 requeue해서 끝날 때까지 대기)
+- quote가 끝난 거래의 file / note 묶음은 작은 풀(parallel)에서 함께 실행하고 모두 끝날 때까지 기다림
+- 실패하면 attempts를 올리고 지수 백오프(+지터) 뒤 재시도, max_attempts를 넘으면 dead (requeue()로 다시)
+- attempts는 실행을 시작할 때(_claim) 올림. 처리 함수는 attempts > 0이면 이미 반영됐는지 먼저 확인
+  → 보냈는데 응답을 못 받았거나, 보낸 뒤 done 기록 전에 워커가 죽은 경우에도 중복 없음
+- 첨부할 PDF는 spool()로 spool_dir에 복사해 두고 file 작업이 끝나면 삭제 (요청 임시 폴더는 요청과 함께 지워짐)
+- 여러 gunicorn 워커 중 임대(lease)를 잡은 하나만 드레인. 한 번에 최대 drain_max건, 묶음마다 임대를 연장하고
+  실행 직전 묶음의 next_attempt_at을 임대 시간만큼 미뤄 둠 → 드레인이 길어져도 다른 워커가 같은 작업을 다시 실행하지 않음
+"""
+import json
+import logging
+import os
+import random
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import state_db
+from config import (
+    PIPEDRIVE_OUTBOX_DIR, PIPEDRIVE_OUTBOX_POLL_SEC, PIPEDRIVE_OUTBOX_BACKOFF_BASE_SEC,
+    PIPEDRIVE_OUTBOX_BACKOFF_MAX_SEC, PIPEDRIVE_OUTBOX_MAX_ATTEMPTS, PIPEDRIVE_OUTBOX_RETENTION_SEC,
+    PIPEDRIVE_OUTBOX_DRAIN_MAX, PIPEDRIVE_OUTBOX_PARALLEL,
+)
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS pd_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        deal_id TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        dedupe_key TEXT NOT NULL UNIQUE,
+        payload TEXT NOT NULL,
+        state TEXT NOT NULL DEFAULT 'pending',   -- pending / done / dead
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL,
+        result TEXT,
+        last_error TEXT,
+        created_at REAL NOT NULL,
+        updated_at REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS pd_outbox_due ON pd_outbox (state, next_attempt_at)",
+    """
+    CREATE TABLE IF NOT EXISTS pd_outbox_lease (
+        name TEXT PRIMARY KEY,
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    """,
+]
+
+# 드레인 도중 워커가 죽었을 때 다른 워커가 임대를 넘겨받기까지의 시간
+_LEASE_SEC = 300
+
+
+class PipedriveOutbox:
+    """handlers: {kind: func(deal_id, payloads, attempts) -> 결과(JSON 직렬화 가능)}. 실패는 예외
+
+    batch_kinds에 없는 kind는 payloads가 항상 한 개
+    """
+
+    def __init__(self, handlers, batch_kinds=("quote",), prerequisite_kinds=("quote",), poll_interval=PIPEDRIVE_OUTBOX_POLL_SEC,
+                 backoff_base=PIPEDRIVE_OUTBOX_BACKOFF_BASE_SEC, backoff_max=PIPEDRIVE_OUTBOX_BACKOFF_MAX_SEC,
+                 max_attempts=PIPEDRIVE_OUTBOX_MAX_ATTEMPTS, retention=PIPEDRIVE_OUTBOX_RETENTION_SEC,
+                 drain_max=PIPEDRIVE_OUTBOX_DRAIN_MAX, parallel=PIPEDRIVE_OUTBOX_PARALLEL,
+                 spool_dir=PIPEDRIVE_OUTBOX_DIR, db_path=None):
+        self.handlers = handlers
+        self.batch_kinds = set(batch_kinds)
+        self.prerequisite_kinds = tuple(prerequisite_kinds)
+        self.poll_interval = poll_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self.drain_max = drain_max
+        self.spool_dir = spool_dir
+        self.db_path = db_path
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._schema_ready = False
+        self._drain_lock = threading.Lock()
+        self._count_lock = threading.Lock()   # file / note가 함께 실행될 때 집계용
+        self._executor = ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="pd-outbox")
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.completed = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_drain_at = None
+
+    def _conn(self):
+        conn = state_db.get_conn(self.db_path)
+        if not self._schema_ready:
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            self._schema_ready = True
+        return conn
+
+    # --- 기록 ---
+
+    def spool(self, fileobj):
+        """첨부할 파일을 outbox 폴더에 복사하고 경로 반환 (file 작업 payload의 path로)"""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        path = os.path.join(self.spool_dir, f"{uuid.uuid4().hex}.pdf")
+        with fileobj, open(path, "wb") as out:
+            shutil.copyfileobj(fileobj, out)
+        return path
+
+    def enqueue(self, deal_id, tasks):
+        """tasks: [(kind, dedupe_key, payload)] → 작업 id 목록 (이미 있던 dedupe_key는 기존 id)"""
+        self._conn()
+        now = time.time()
+        ids = []
+        with state_db.transaction(self.db_path) as conn:
+            for kind, dedupe_key, payload in tasks:
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO pd_outbox (deal_id, kind, dedupe_key, payload, next_attempt_at, "
+                    "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (str(deal_id), kind, dedupe_key, json.dumps(payload, ensure_ascii=False), now, now, now),
+                )
+                if cur.rowcount:
+                    ids.append(cur.lastrowid)
+                    continue
+                _remove_spool(payload)  # 중복 — 새로 보관한 파일은 필요 없음
+                ids.append(conn.execute("SELECT id FROM pd_outbox WHERE dedupe_key = ?", (dedupe_key,)).fetchone()["id"])
+        self._wakeup.set()
+        return ids
+
+    def get(self, task_id):
+        row = self._conn().execute("SELECT * FROM pd_outbox WHERE id = ?", (task_id,)).fetchone()
+        return _task_dict(row) if row else None
+
+    def requeue(self, task_id):
+        """dead(또는 대기 중) 작업을 지금 바로 다시 시도. 작업이 없거나 이미 끝났으면 False"""
+        cur = self._conn().execute(
+            "UPDATE pd_outbox SET state = 'pending', attempts = 0, next_attempt_at = ?, updated_at = ? "
+            "WHERE id = ? AND state != 'done'",
+            (time.time(), time.time(), task_id),
+        )
+        self._wakeup.set()
+        return cur.rowcount > 0
+
+    # --- 드레인 ---
+
+    def _acquire_lease(self):
+        self._conn()
+        now = time.time()
+        with state_db.transaction(self.db_path) as conn:
+            row = conn.execute("SELECT owner, expires_at FROM pd_outbox_lease WHERE name = 'drain'").fetchone()
+            if row and row["owner"] != self.owner and row["expires_at"] > now:
+                return False
+            conn.execute(
+                "INSERT INTO pd_outbox_lease (name, owner, expires_at) VALUES ('drain', ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at",
+                (self.owner, now + _LEASE_SEC),
+            )
+            return True
+
+    def _renew_lease(self):
+        """아직 임대를 가지고 있으면 연장하고 True (다른 워커가 넘겨받았으면 False)"""
+        return self._conn().execute(
+            "UPDATE pd_outbox_lease SET expires_at = ? WHERE name = 'drain' AND owner = ?",
+            (time.time() + _LEASE_SEC, self.owner),
+        ).rowcount == 1
+
+    def _release_lease(self):
+        self._conn().execute("DELETE FROM pd_outbox_lease WHERE name = 'drain' AND owner = ?", (self.owner,))
+
+    def backoff(self, attempts):
+        """attempts번 실패한 작업의 다음 시도까지 대기 시간 (지수 + 지터)"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** max(attempts - 1, 0))
+        return delay * random.uniform(0.5, 1.0)
+
+    def drain(self):
+        """due 작업을 거래별로 묶어 처리. 끝낸 작업 수 반환 (다른 워커가 드레인 중이면 0)"""
+        with self._drain_lock:
+            if not self._acquire_lease():
+                return 0
+            try:
+                prereq = ",".join("?" * len(self.prerequisite_kinds)) or "NULL"
+                rows = self._conn().execute(
+                    f"SELECT * FROM pd_outbox WHERE state = 'pending' AND next_attempt_at <= ? "
+                    f"AND (kind IN ({prereq}) OR deal_id NOT IN ("
+                    f"    SELECT deal_id FROM pd_outbox WHERE kind IN ({prereq}) AND state != 'done')) "
+                    f"ORDER BY id LIMIT ?",
+                    (time.time(), *self.prerequisite_kinds, *self.prerequisite_kinds, self.drain_max),
+                ).fetchall()
+                by_deal = OrderedDict()
+                for row in rows:
+                    by_deal.setdefault(row["deal_id"], []).append(row)
+                done = 0
+                steps = [(deal_id, step) for deal_id, deal_rows in by_deal.items() for step in self._steps(deal_rows)]
+                for deal_id, step in steps:
+                    if not self._renew_lease() or not self._claim([r for group in step for r in group]):
+                        break  # 임대를 잃음 → 남은 작업은 임대를 가진 워커가 처리
+                    done += self._run_step(deal_id, step)
+                self._purge()
+                self.last_drain_at = time.time()
+                return done
+            finally:
+                self._release_lease()
+
+    def _claim(self, rows):
+        """실행 직전 묶음의 next_attempt_at을 임대 시간만큼 미루고 attempts를 올림
+
+        실행 중 임대가 넘어가도 다른 워커가 집지 않고, 실행 도중 죽은 작업을 다시 집으면 attempts > 0
+        → 처리 함수가 이미 반영됐는지 확인부터 함. 이번 실행에는 claim 전 attempts(rows)를 넘김
+        """
+        ids = [r["id"] for r in rows]
+        claimed = self._conn().execute(
+            f"UPDATE pd_outbox SET next_attempt_at = ?, attempts = attempts + 1 "
+            f"WHERE state = 'pending' AND next_attempt_at <= ? "
+            f"AND id IN ({','.join('?' * len(ids))})",
+            [time.time() + _LEASE_SEC, time.time(), *ids],
+        ).rowcount
+        return claimed == len(ids)
+
+    def _groups(self, rows):
+        """batch_kinds는 kind별로 한 묶음, 나머지는 작업 하나씩 (기록 순서 유지)"""
+        batches = OrderedDict()
+        for row in rows:
+            key = row["kind"] if row["kind"] in self.batch_kinds else row["id"]
+            batches.setdefault(key, []).append(row)
+        return list(batches.values())
+
+    def _steps(self, rows):
+        """거래 하나의 묶음을 실행 단계로: prerequisite_kinds 묶음은 하나씩, 나머지(file / note)는 한 단계로 함께
+
+        선행 작업이 끝나지 않은 거래의 file / note는 drain()의 SELECT에서 이미 빠져 있음
+        """
+        groups = self._groups(rows)
+        steps = [[group] for group in groups if group[0]["kind"] in self.prerequisite_kinds]
+        rest = [group for group in groups if group[0]["kind"] not in self.prerequisite_kinds]
+        if rest:
+            steps.append(rest)
+        return steps
+
+    def _run_step(self, deal_id, groups):
+        """묶음이 여럿이면 풀에서 동시에 실행하고 모두 끝날 때까지 대기. 끝낸 작업 수 반환"""
+        if len(groups) == 1:
+            return self._run(deal_id, groups[0])
+        futures = [self._executor.submit(self._run, deal_id, group) for group in groups]
+        return sum(f.result() for f in futures)
+
+    def _run(self, deal_id, rows):
+        kind = rows[0]["kind"]
+        ids = [r["id"] for r in rows]
+        payloads = [json.loads(r["payload"]) for r in rows]
+        attempts = max(r["attempts"] for r in rows)
+        try:
+            handler = self.handlers[kind]
+            result = handler(deal_id, payloads, attempts)
+        except Exception as e:
+            with self._count_lock:
+                self.failures += 1
+                self.last_error = f"{kind} {deal_id}: {type(e).__name__}: {e}"
+            attempts += 1
+            dead = attempts >= self.max_attempts
+            delay = self.backoff(attempts)
+            log.log(logging.ERROR if dead else logging.WARNING,
+                    f"⚠️ [Pipedrive outbox] {kind} 거래 {deal_id} 실패 ({attempts}회"
+                    f"{', 중단' if dead else f', {delay:.0f}초 후 재시도'}): {e}", exc_info=dead)
+            self._conn().execute(
+                f"UPDATE pd_outbox SET attempts = ?, state = ?, next_attempt_at = ?, last_error = ?, updated_at = ? "
+                f"WHERE id IN ({','.join('?' * len(ids))})",
+                [attempts, "dead" if dead else "pending", time.time() + delay, str(e)[:500], time.time(), *ids],
+            )
+            return 0
+        self._conn().execute(
+            f"UPDATE pd_outbox SET state = 'done', result = ?, last_error = NULL, updated_at = ? "
+            f"WHERE id IN ({','.join('?' * len(ids))})",
+            [json.dumps(result, ensure_ascii=False), time.time(), *ids],
+        )
+        for payload in payloads:
+            _remove_spool(payload)
+        if kind in self.prerequisite_kinds:
+            self._wakeup.set()  # 기다리던 같은 거래의 file / note를 바로 다음 드레인에서
+        with self._count_lock:
+            self.completed += len(ids)
+        return len(ids)
+
+    def _purge(self):
+        self._conn().execute("DELETE FROM pd_outbox WHERE state = 'done' AND updated_at < ?",
+                             (time.time() - self.retention,))
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="pd-outbox", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                done = self.drain()
+                if done:
+                    log.info(f"✅ [Pipedrive outbox] 작업 {done}건 반영")
+            except Exception as e:
+                log.warning(f"⚠️ [Pipedrive outbox] 드레인 오류: {e}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+
+    def stop(self, timeout=5):
+        """드레인 스레드 종료 (남은 작업은 DB에 보관 → 다음 시작 시 처리)"""
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._executor.shutdown(wait=False)
+
+    def stats(self):
+        conn = self._conn()
+        counts = {r["state"]: r["n"] for r in conn.execute("SELECT state, COUNT(*) AS n FROM pd_outbox GROUP BY state")}
+        oldest = conn.execute("SELECT MIN(created_at) FROM pd_outbox WHERE state = 'pending'").fetchone()[0]
+        dead = conn.execute("SELECT * FROM pd_outbox WHERE state = 'dead' ORDER BY id DESC LIMIT 20").fetchall()
+        return {
+            "pending": counts.get("pending", 0),
+            "done": counts.get("done", 0),
+            "dead": counts.get("dead", 0),
+            "oldest_pending_sec": round(time.time() - oldest, 1) if oldest else None,
+            "completed": self.completed,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "last_drain_at": self.last_drain_at,
+            "dead_tasks": [_task_dict(r) for r in dead],
+        }
+
+
+def _task_dict(row):
+    return {
+        "id": row["id"],
+        "deal_id": row["deal_id"],
+        "kind": row["kind"],
+        "state": row["state"],
+        "attempts": row["attempts"],
+        "payload": json.loads(row["payload"]),
+        "result": json.loads(row["result"]) if row["result"] else None,
+        "last_error": row["last_error"],
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+    }
+
+
+def _remove_spool(payload):
+    path = payload.get("path") if isinstance(payload, dict) else None
+    if path:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,183 @@
+"""단계(stage) 의존성 그래프 실행기
+
+각 Stage는 이름, 실행 함수, 선행 단계 목록을 가진다. 선행 단계가 모두 끝난 단계부터
+스레드 풀에서 병렬로 실행하므로, 전체 소요 시간은 단계 합계가 아니라 가장 긴 경로로 줄어든다.
+단계별 소요 시간과 임계 경로(critical path)를 함께 기록한다.
+
+실행 함수는 results 딕셔너리(완료된 단계 이름 → 반환값)를 인자로 받는다.
+예외가 난 단계에 의존하는 단계는 실행하지 않고 skipped로 표시한다.
+"""
+import contextvars
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+log = logging.getLogger(__name__)
+
+
+class Stage:
+    def __init__(self, name, func, deps=()):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+
+
+class PipelineRun:
+    """실행 결과: results / errors / skipped / timings(ms) / critical_path"""
+
+    def __init__(self):
+        self.results = {}
+        self.errors = {}
+        self.skipped = []
+        self.timings = {}        # name -> {"start_ms", "end_ms", "duration_ms"}
+        self.critical_path = []
+        self.critical_path_ms = 0
+        self.total_ms = 0
+
+    def summary(self):
+        return {
+            "total_ms": self.total_ms,
+            "critical_path": self.critical_path,
+            "critical_path_ms": self.critical_path_ms,
+            "stages": {name: t["duration_ms"] for name, t in self.timings.items()},
+            "failed": sorted(self.errors),
+            "skipped": self.skipped,
+        }
+
+
+def _topological_order(stages):
+    by_name = {}
+    for stage in stages:
+        if stage.name in by_name:
+            raise ValueError(f"중복된 단계 이름: {stage.name}")
+        by_name[stage.name] = stage
+    for stage in stages:
+        for dep in stage.deps:
+            if dep not in by_name:
+                raise ValueError(f"단계 '{stage.name}'의 선행 단계 '{dep}'가 없습니다")
+
+    order, done = [], set()
+    remaining = list(stages)
+    while remaining:
+        ready = [s for s in remaining if all(d in done for d in s.deps)]
+        if not ready:
+            raise ValueError(f"단계 의존성에 순환이 있습니다: {[s.name for s in remaining]}")
+        for stage in ready:
+            order.append(stage)
+            done.add(stage.name)
+        remaining = [s for s in remaining if s.name not in done]
+    return order
+
+
+def _critical_path(order, timings):
+    """완료된 단계들 중 소요 시간 합이 가장 큰 의존 경로"""
+    best = {}  # name -> (누적 ms, 경로)
+    for stage in order:
+        if stage.name not in timings:
+            continue
+        prev = max((best[d] for d in stage.deps if d in best), key=lambda x: x[0], default=(0, []))
+        best[stage.name] = (prev[0] + timings[stage.name]["duration_ms"], prev[1] + [stage.name])
+    if not best:
+        return [], 0
+    total, path = max(best.values(), key=lambda x: x[0])
+    return path, total
+
+
+def run_stages(stages, executor, on_stage_done=None):
+    """stages를 의존성 순서에 맞춰 executor에서 병렬 실행하고 PipelineRun 반환
+
+    on_stage_done(name, status, duration_ms): 단계가 끝날 때마다 호출 (status: ok / error / skipped)
+    주의: executor는 이 함수를 호출한 스레드와 다른 풀이어야 함 (같은 풀이면 교착 위험)
+    """
+    order = _topological_order(stages)
+    run = PipelineRun()
+    started = time.perf_counter()
+    pending = {s.name: s for s in order}
+    running = {}  # future -> (stage, start)
+
+    def elapsed_ms(t):
+        return round((t - started) * 1000, 1)
+
+    def notify(name, status, duration_ms):
+        if on_stage_done:
+            try:
+                on_stage_done(name, status, duration_ms)
+            except Exception as e:
+                log.warning(f"⚠️ [pipeline] on_stage_done 콜백 오류 ({name}): {e}")
+
+    def launch_ready():
+        for name, stage in list(pending.items()):
+            if any(d in run.errors or d in run.skipped for d in stage.deps):
+                del pending[name]
+                run.skipped.append(name)
+                notify(name, "skipped", 0)
+                continue
+            if all(d in run.results for d in stage.deps):
+                del pending[name]
+                # 호출한 쪽의 contextvars(요청 ID 등)를 단계 스레드로 넘김
+                future = executor.submit(contextvars.copy_context().run, stage.func, run.results)
+                running[future] = (stage, time.perf_counter())
+
+    launch_ready()
+    while running:
+        done, _ = wait(list(running), return_when=FIRST_COMPLETED)
+        for future in done:
+            stage, stage_start = running.pop(future)
+            stage_end = time.perf_counter()
+            duration = round((stage_end - stage_start) * 1000, 1)
+            run.timings[stage.name] = {
+                "start_ms": elapsed_ms(stage_start),
+                "end_ms": elapsed_ms(stage_end),
+                "duration_ms": duration,
+            }
+            try:
+                run.results[stage.name] = future.result()
+                notify(stage.name, "ok", duration)
+            except Exception as e:
+                run.errors[stage.name] = e
+                log.error(f"❌ [pipeline] 단계 '{stage.name}' 실패: {type(e).__name__}: {e}")
+                notify(stage.name, "error", duration)
+        launch_ready()
+    # 실패 전파로 남은 단계 정리 (launch_ready에서 대부분 처리되지만 방어적으로)
+    for name in pending:
+        run.skipped.append(name)
+
+    run.total_ms = elapsed_ms(time.perf_counter())
+    run.critical_path, run.critical_path_ms = _critical_path(order, run.timings)
+    run.critical_path_ms = round(run.critical_path_ms, 1)
+    return run
+
+
+def fan_out(calls, executor, max_concurrency, deadline):
+    """서로 독립적인 호출들을 최대 max_concurrency개씩 동시에 실행하고, deadline까지 끝난 것만 모아 반환
+
+    - calls: {key: 인자 없는 함수}
+    - deadline: time.monotonic() 기준 절대 시각 — 넘기면 기다리지 않고 부분 결과 반환
+    반환: (results {key: 값}, errors {key: 예외}, unfinished [key, ...])
+    마감 후에도 실행 중인 호출은 풀에서 끝까지 돌지만 결과는 버려짐 (아직 시작 전이면 제출하지 않음)
+    """
+    queue = list(calls.items())
+    results, errors = {}, {}
+    running = {}  # future -> key
+    while queue or running:
+        if deadline - time.monotonic() <= 0:
+            break  # 마감 후에는 새로 제출하지 않음 (결과를 버릴 호출로 할당량을 쓰지 않도록)
+        while queue and len(running) < max_concurrency:
+            key, func = queue.pop(0)
+            running[executor.submit(contextvars.copy_context().run, func)] = key
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        done, _ = wait(list(running), timeout=remaining, return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for future in done:
+            key = running.pop(future)
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                errors[key] = e
+    unfinished = list(running.values()) + [key for key, _ in queue]
+    for future in running:
+        future.cancel()
+    return results, errors, unfinished
@@ -0,0 +1,275 @@
+"""Google Sheets/Drive 호출 공용 속도 제한 스케줄러 (토큰 버킷 + 429/503 지터 백오프 + 우선순위)
+
+main.py의 Sheets/Drive 호출은 모두 즉시 나갔고, 사용자당 분당 60회 Sheets 할당량을 넘으면 429가
+그대로 "견적서 생성 중 오류"로 보였다.
+
+- 버킷(sheets / drive)마다 분당 허용량만큼 토큰이 차오르고, 호출은 토큰 하나를 쓰고 나감
+  (토큰이 없으면 다음 토큰까지 대기 — Google에 보내서 429를 받는 대신 여기서 기다림)
+- 우선순위: 요청 처리(interactive)가 기본. 템플릿 풀 보충·발행목록 동기화·append 플러시(실패 행 재전송 포함)는
+  background → 버킷에 reserve 비율 이상 남아 있고 대기 중인 interactive 호출이 없을 때만 토큰 사용.
+  background_max_wait 넘게 기다린 background 호출은 토큰 하나만 있으면 나감 (할당량 압박이 계속돼도 끝없이 밀리지 않음)
+- 429/503을 받으면 버킷을 비우고(남은 예산 0으로 보정) Retry-After 또는 full-jitter 지수 백오프 후 재시도.
+  단 POST/PATCH(values.append, files.copy 등)는 429만 재시도 — 503은 Google이 이미 처리했을 수 있어
+  다시 보내면 행·파일이 중복됨
+- 연결 지점: gspread는 scheduled_http_client()로 만든 HTTPClient, Drive(googleapiclient)는 ScheduledHttp,
+  그 밖의 직접 호출(PDF export)은 scheduler.run()
+- 버킷은 워커 프로세스 단위 → 워커가 여러 개면 GOOGLE_SHEETS_PER_MIN을 워커 수로 나눈 값으로 설정
+"""
+import contextvars
+import functools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from config import (
+    GOOGLE_SHEETS_PER_MIN, GOOGLE_DRIVE_PER_MIN, GOOGLE_BACKGROUND_RESERVE,
+    GOOGLE_RETRY_MAX, GOOGLE_BACKOFF_BASE_SEC, GOOGLE_BACKOFF_MAX_SEC, GOOGLE_MAX_WAIT_SEC,
+    GOOGLE_BACKGROUND_MAX_WAIT_SEC,
+)
+
+log = logging.getLogger(__name__)
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+RETRY_STATUSES = (429, 503)
+NON_IDEMPOTENT_RETRY_STATUSES = (429,)  # 429는 처리 전에 거절된 요청
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+
+_priority = contextvars.ContextVar("google_call_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def background_priority():
+    """이 블록 안의 Google 호출은 background 우선순위 (같은 스레드 안에서만 유효)"""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def background(func):
+    """함수 전체를 background 우선순위로 실행하는 데코레이터 (템플릿 풀 보충 등 백그라운드 작업용)"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with background_priority():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class TokenBucket:
+    def __init__(self, per_minute, burst=None, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = float(burst or per_minute)
+        self.tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+
+    def refill(self):
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, need):
+        """need개가 될 때까지 남은 시간(초)"""
+        return max(0.0, (need - self.tokens) / self.rate) if self.rate > 0 else float("inf")
+
+
+class GoogleScheduler:
+    def __init__(self, limits=None, reserve=GOOGLE_BACKGROUND_RESERVE, retry_max=GOOGLE_RETRY_MAX,
+                 backoff_base=GOOGLE_BACKOFF_BASE_SEC, backoff_max=GOOGLE_BACKOFF_MAX_SEC,
+                 max_wait=GOOGLE_MAX_WAIT_SEC, background_max_wait=GOOGLE_BACKGROUND_MAX_WAIT_SEC,
+                 clock=time.monotonic, sleep=time.sleep):
+        limits = limits or {"sheets": GOOGLE_SHEETS_PER_MIN, "drive": GOOGLE_DRIVE_PER_MIN}
+        self.buckets = {name: TokenBucket(per_min, clock=clock) for name, per_min in limits.items()}
+        self.reserve = reserve
+        self.retry_max = retry_max
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_wait = max_wait
+        self.background_max_wait = background_max_wait
+        self._clock = clock
+        self._sleep = sleep
+        self._cond = threading.Condition()
+        self._interactive_waiting = {name: 0 for name in self.buckets}
+        self._stats = {name: {"calls": 0, "waits": 0, "wait_ms": 0.0, "throttled": 0, "retries": 0,
+                              "background_calls": 0, "over_budget": 0} for name in self.buckets}
+
+    # --- 토큰 ---
+
+    def acquire(self, bucket_name, priority=None):
+        """토큰 하나 사용 (없으면 대기). 기다린 시간(초) 반환
+
+        max_wait를 넘기면 토큰 없이 보냄 (요청을 여기서 실패시키지 않고 Google 판단에 맡김 — 429면 백오프)
+        """
+        priority = priority or _priority.get()
+        bucket = self.buckets[bucket_name]
+        stats = self._stats[bucket_name]
+        started = self._clock()
+        waited_once = False
+        with self._cond:
+            if priority == INTERACTIVE:
+                self._interactive_waiting[bucket_name] += 1
+            try:
+                while True:
+                    bucket.refill()
+                    if priority == INTERACTIVE or self._clock() - started >= self.background_max_wait:
+                        need = 1.0
+                        allowed = bucket.tokens >= need
+                    else:
+                        need = 1.0 + self.reserve * bucket.capacity
+                        allowed = bucket.tokens >= need and not self._interactive_waiting[bucket_name]
+                    if allowed:
+                        bucket.tokens -= 1.0
+                        break
+                    elapsed = self._clock() - started
+                    if priority == INTERACTIVE and elapsed >= self.max_wait:
+                        stats["over_budget"] += 1
+                        break
+                    waited_once = True
+                    timeout = min(max(bucket.wait_time(need), 0.01), 1.0)
+                    if priority != INTERACTIVE:
+                        timeout = min(timeout, max(self.background_max_wait - elapsed, 0.01))
+                    self._cond.wait(timeout)
+            finally:
+                if priority == INTERACTIVE:
+                    self._interactive_waiting[bucket_name] -= 1
+                    self._cond.notify_all()
+            waited = self._clock() - started
+            stats["calls"] += 1
+            if priority != INTERACTIVE:
+                stats["background_calls"] += 1
+            if waited_once:
+                stats["waits"] += 1
+                stats["wait_ms"] += waited * 1000
+        return waited
+
+    def throttled(self, bucket_name):
+        """429/503 수신 — 남은 예산을 0으로 보정 (다른 호출도 토큰이 다시 찰 때까지 대기)"""
+        with self._cond:
+            bucket = self.buckets[bucket_name]
+            bucket.refill()
+            bucket.tokens = min(bucket.tokens, 0.0)
+            self._stats[bucket_name]["throttled"] += 1
+
+    def backoff(self, attempt, retry_after=None):
+        """attempt번째 재시도 전 대기 시간 (Retry-After가 있으면 그 값, 없으면 full jitter)"""
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    # --- 호출 ---
+
+    def run(self, bucket_name, func, status_of=None, idempotent=True):
+        """func()를 토큰을 받아 실행, 429/503이면 백오프 후 재시도 (재시도도 토큰을 받아서)
+
+        idempotent=False: 429만 재시도 (503 뒤 재전송으로 같은 작업이 두 번 반영되지 않도록)
+
+        status_of(result) -> (상태 코드, Retry-After초|None): 응답 객체로 상태를 돌려주는 호출용 (예외를 내지 않는 경우)
+        예외로 알리는 호출(gspread APIError, googleapiclient HttpError)은 예외에서 상태를 읽음
+        """
+        retry_statuses = RETRY_STATUSES if idempotent else NON_IDEMPOTENT_RETRY_STATUSES
+        for attempt in range(self.retry_max + 1):
+            self.acquire(bucket_name)
+            try:
+                result = func()
+            except Exception as e:
+                status, retry_after = _status_from_exception(e)
+                if status not in retry_statuses or attempt == self.retry_max:
+                    if status in RETRY_STATUSES:
+                        self.throttled(bucket_name)
+                    raise
+            else:
+                status, retry_after = status_of(result) if status_of else (None, None)
+                if status not in retry_statuses or attempt == self.retry_max:
+                    if status in RETRY_STATUSES:
+                        self.throttled(bucket_name)
+                    return result
+                _close(result)
+            self.throttled(bucket_name)
+            self._stats[bucket_name]["retries"] += 1
+            delay = self.backoff(attempt, retry_after)
+            log.warning(f"⚠️ [Google {bucket_name}] {status} → {delay:.1f}초 후 재시도 ({attempt + 1}/{self.retry_max})")
+            self._sleep(delay)
+
+    def stats(self):
+        with self._cond:
+            out = {}
+            for name, bucket in self.buckets.items():
+                bucket.refill()
+                out[name] = {
+                    "tokens": round(bucket.tokens, 2),
+                    "capacity": bucket.capacity,
+                    "per_min": round(bucket.rate * 60),
+                    **{k: (round(v, 1) if isinstance(v, float) else v) for k, v in self._stats[name].items()},
+                }
+            return out
+
+
+def _retry_after(headers):
+    try:
+        value = headers.get("retry-after") or headers.get("Retry-After")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def response_status(response):
+    """requests 응답용 status_of (run(..., status_of=response_status))"""
+    status = response.status_code
+    return status, _retry_after(response.headers) if status in RETRY_STATUSES else None
+
+
+def is_permanent_error(e):
+    """다시 보내도 같은 결과인 오류인지 (잘못된 요청·셀 크기 초과 등 4xx — 인증/권한·할당량·타임아웃 제외)"""
+    status, _ = _status_from_exception(e)
+    return status is not None and 400 <= status < 500 and status not in (401, 403, 408, 429)
+
+
+def _status_from_exception(e):
+    response = getattr(e, "response", None)
+    if response is not None and hasattr(response, "status_code"):  # gspread APIError / requests
+        return response.status_code, _retry_after(response.headers)
+    resp = getattr(e, "resp", None)                                 # googleapiclient HttpError
+    if resp is not None and hasattr(resp, "status"):
+        return resp.status, _retry_after(resp)
+    return None, None
+
+
+def _close(result):
+    close = getattr(result, "close", None)
+    if close:
+        close()
+
+
+def scheduled_http_client(scheduler, bucket_name="sheets"):
+    """gspread.authorize(creds, http_client=...)에 넘길 HTTPClient 클래스 (모든 Sheets 호출이 scheduler를 거침)"""
+    from gspread.http_client import HTTPClient
+
+    class ScheduledHTTPClient(HTTPClient):
+        def request(self, method, *args, **kwargs):
+            return scheduler.run(bucket_name, lambda: HTTPClient.request(self, method, *args, **kwargs),
+                                 idempotent=method.upper() in IDEMPOTENT_METHODS)
+
+    return ScheduledHTTPClient
+
+
+class ScheduledHttp:
+    """googleapiclient build(http=...)용 httplib2 호환 래퍼 (AuthorizedHttp를 감쌈)"""
+
+    def __init__(self, http, scheduler, bucket_name="drive"):
+        self._http = http
+        self._scheduler = scheduler
+        self._bucket_name = bucket_name
+
+    def request(self, uri, method="GET", *args, **kwargs):
+        def status_of(result):
+            resp, _ = result
+            return resp.status, _retry_after(resp)
+        return self._scheduler.run(self._bucket_name, lambda: self._http.request(uri, method, *args, **kwargs),
+                                   status_of, idempotent=method.upper() in IDEMPOTENT_METHODS)
+
+    def __getattr__(self, name):
+        return getattr(self._http, name)
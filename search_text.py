@@ -0,0 +1,10 @@
+"""검색 비교용 문자열 정규화 (발행목록 색인, Pipedrive 미러, 실시간 거래 검색이 모두 같은 규칙을 쓰도록 한 곳에)"""
+import re
+
+_NORM = re.compile(r"[^0-9a-zA-Z가-힣]")
+
+
+def norm_text(s):
+    """공백/특수문자 제거 + 소문자 (한글/영문/숫자만 유지)
+    예: '(주)경신 이엔피' → '주경신이엔피' — '경신이' 검색어도 매칭됨"""
+    return _NORM.sub("", str(s or "")).lower()
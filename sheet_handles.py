@@ -0,0 +1,58 @@
+"""열어 둔 스프레드시트/워크시트 핸들 캐시 (파일 ID 기준, TTL + LRU)
+
+gspread 6의 open_by_key와 sheet1/get_worksheet는 부를 때마다 스프레드시트 메타데이터를 조회한다.
+같은 견적서가 /estimate → /load-estimate로 몇 분 안에 다시 열리고,
+DATA_COLLECTION_SHEET_ID는 /collect-data마다 열린다.
+
+- spreadsheet(): Spreadsheet 핸들 (제목·시트 목록 메타데이터 포함)
+- worksheets(): 메타데이터 한 번으로 모든 Worksheet 핸들 (gid·제목·크기)을 만들어 함께 보관
+- worksheet(index) / gids(): 위 목록에서 바로 — 캐시가 있으면 메타데이터 조회 없음
+- 캐시에 없어 Google에서 여는 경우만 metrics "open" 단계로 기록
+- invalidate(file_id): 제목 변경(/estimate batchUpdate)이나 핸들 사용 중 오류가 나면 해당 파일 항목 제거
+"""
+from gspread.worksheet import Worksheet
+
+import metrics
+from config import SHEET_HANDLE_CACHE_SIZE, SHEET_HANDLE_TTL_SEC
+from ttl_cache import TTLCache
+
+
+class SheetHandleCache:
+    def __init__(self, maxsize=SHEET_HANDLE_CACHE_SIZE, ttl=SHEET_HANDLE_TTL_SEC):
+        self._cache = TTLCache(maxsize, ttl)
+
+    def spreadsheet(self, gc, file_id):
+        key = (file_id, None)
+        sh = self._cache.get(key)
+        if sh is None:
+            with metrics.span("open"):
+                sh = gc.open_by_key(file_id)
+            self._cache.set(key, sh)
+        return sh
+
+    def worksheets(self, gc, file_id):
+        key = (file_id, "worksheets")
+        sheets = self._cache.get(key)
+        if sheets is None:
+            sh = self.spreadsheet(gc, file_id)
+            with metrics.span("open"):
+                metadata = sh.fetch_sheet_metadata()
+            sheets = [Worksheet(sh, s["properties"], sh.id, sh.client) for s in metadata.get("sheets", [])]
+            self._cache.set(key, sheets)
+        return sheets
+
+    def worksheet(self, gc, file_id, index=0):
+        sheets = self.worksheets(gc, file_id)
+        if index >= len(sheets):
+            raise ValueError(f"워크시트 없음: {file_id} #{index}")
+        return sheets[index]
+
+    def gids(self, gc, file_id):
+        """{시트 제목: gid}"""
+        return {ws.title: ws.id for ws in self.worksheets(gc, file_id)}
+
+    def invalidate(self, file_id):
+        return self._cache.invalidate(lambda key, _: key[0] == file_id)
+
+    def stats(self):
+        return self._cache.stats()
@@ -0,0 +1,87 @@
+"""견적서 시트 쓰기를 spreadsheets.batchUpdate 한 번으로 묶는 요청 빌더
+
+/estimate는 예전에 open_by_key(메타데이터 조회) → update_title → 값 batch_update →
+batch_format(줄바꿈) → unmerge 로 Google을 5번 왕복했다. 여기서는 같은 작업을
+batchUpdate 요청 목록으로 만들어, 스프레드시트를 열지 않고 한 번에 보낸다.
+"""
+import logging
+
+import gspread
+from gspread.utils import a1_range_to_grid_range
+
+log = logging.getLogger(__name__)
+
+
+def cell_data(value):
+    """ws.batch_update(raw=True)와 같은 의미의 CellData (값을 해석하지 않고 그대로 기록)"""
+    if value is None or value == "":
+        return {}  # userEnteredValue 생략 + fields 지정 → 셀 비움
+    if isinstance(value, bool):
+        return {"userEnteredValue": {"boolValue": value}}
+    if isinstance(value, (int, float)):
+        return {"userEnteredValue": {"numberValue": value}}
+    return {"userEnteredValue": {"stringValue": str(value)}}
+
+
+def build_estimate_requests(sheet_id, updates, title=None, wrap_cells=(), unmerge_cells=()):
+    """batchUpdate 요청 목록 생성
+
+    - sheet_id: 대상 시트 gid (템플릿 복사본은 템플릿과 같은 gid)
+    - updates: 기존 ws.batch_update 형식 [{"range": "F5", "values": [[값]]}, ...]
+    - title: 파일명 변경 (None이면 생략)
+    - wrap_cells: 줄바꿈(WRAP) 포맷을 적용할 A1 범위 목록
+    - unmerge_cells: 병합 해제할 A1 범위 목록
+    """
+    requests = []
+    if title:
+        requests.append({
+            "updateSpreadsheetProperties": {"properties": {"title": title}, "fields": "title"}
+        })
+    for update in updates:
+        requests.append({
+            "updateCells": {
+                "range": a1_range_to_grid_range(update["range"], sheet_id),
+                "rows": [{"values": [cell_data(v) for v in row]} for row in update["values"]],
+                "fields": "userEnteredValue",
+            }
+        })
+    for cell in wrap_cells:
+        requests.append({
+            "repeatCell": {
+                "range": a1_range_to_grid_range(cell, sheet_id),
+                "cell": {"userEnteredFormat": {"wrapStrategy": "WRAP"}},
+                "fields": "userEnteredFormat.wrapStrategy",
+            }
+        })
+    for cell in unmerge_cells:
+        requests.append({"unmergeCells": {"range": a1_range_to_grid_range(cell, sheet_id)}})
+    return requests
+
+
+def _first_sheet_id(gc, file_id):
+    meta = gc.http_client.fetch_sheet_metadata(file_id, params={"fields": "sheets.properties.sheetId"})
+    return meta["sheets"][0]["properties"]["sheetId"]
+
+
+def send_estimate_batch(gc, file_id, sheet_id, updates, title=None, wrap_cells=(), unmerge_cells=()):
+    """요청 목록을 만들어 batchUpdate 1회로 전송
+
+    batchUpdate는 원자적이라 요청 하나만 실패해도 전체가 거부되므로, 예전에 '무시됨'으로
+    처리하던 경우만 좁게 재시도한다:
+    - 병합 해제 실패 → 병합 해제 없이 재전송 (기존: 오류 무시)
+    - sheet gid 불일치 (템플릿 gid가 기본값과 다름) → 실제 첫 시트 gid를 조회해 재전송
+    """
+    requests = build_estimate_requests(sheet_id, updates, title, wrap_cells, unmerge_cells)
+    try:
+        return gc.http_client.batch_update(file_id, {"requests": requests})
+    except gspread.exceptions.APIError as e:
+        msg = str(e).lower()
+        if unmerge_cells and "merge" in msg:
+            log.warning(f"⚠️ 셀 합치기 해제 실패 (무시됨, 나머지 재전송): {e}")
+            return send_estimate_batch(gc, file_id, sheet_id, updates, title, wrap_cells)
+        if "grid" in msg and "id" in msg:
+            actual = _first_sheet_id(gc, file_id)
+            if actual != sheet_id:
+                log.warning(f"⚠️ 시트 gid 불일치 ({sheet_id} → {actual}), 재전송")
+                return send_estimate_batch(gc, file_id, actual, updates, title, wrap_cells, unmerge_cells)
+        raise
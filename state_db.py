@@ -0,0 +1,44 @@
+"""로컬 상태 저장소 (SQLite, WAL 모드)
+
+gunicorn 워커 프로세스끼리 공유해야 하는 작은 상태(백그라운드 작업 등)를 저장.
+연결은 스레드별로 하나씩 재사용하며, 쓰기는 transaction()으로 감싸서 원자적으로 처리.
+"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from config import STATE_DB_PATH
+
+_local = threading.local()
+
+
+def get_conn(path=None):
+    """현재 스레드 전용 SQLite 연결 반환 (없으면 생성)"""
+    path = path or STATE_DB_PATH
+    conns = getattr(_local, "conns", None)
+    if conns is None:
+        conns = _local.conns = {}
+    conn = conns.get(path)
+    if conn is None:
+        # isolation_level=None: 자동 트랜잭션 끔 → BEGIN/COMMIT은 transaction()에서 명시적으로
+        conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conns[path] = conn
+    return conn
+
+
+@contextmanager
+def transaction(path=None):
+    """BEGIN IMMEDIATE ~ COMMIT (예외 시 ROLLBACK). 쓰기 잠금을 시작 시점에 잡아 경쟁 방지"""
+    conn = get_conn(path)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    else:
+        conn.execute("COMMIT")
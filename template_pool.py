@@ -0,0 +1,213 @@
+"""미리 복사해 둔 견적서 템플릿 풀
+
+Drive files().copy는 /estimate·/create-estimate-template에서 가장 느린 단일 호출이다.
+백그라운드 스레드가 ESTIMATE_FOLDER_ID에 빈 템플릿 복사본을 미리 만들어 두고,
+요청 시에는 대기 중인 복사본을 즉시 내어준다.
+
+- 대기 복사본이 low 미만이면 high까지 비동기로 보충
+- 템플릿 원본의 Drive version이 바뀌면 이전 버전 복사본은 삭제 후 다시 채움
+- 배포 시 정한 파일명은 바로 바꾸지 않고, 첫 /estimate의 batchUpdate에서 함께 변경
+  (take_pending_title) → 배포 자체는 로컬 DB 조회 한 번
+- 풀 상태는 SQLite에 있으므로 여러 gunicorn 워커가 같은 복사본을 중복 배포하지 않음
+"""
+import logging
+import threading
+import time
+import uuid
+
+import state_db
+from config import TEMPLATE_POOL_LOW, TEMPLATE_POOL_HIGH, TEMPLATE_POOL_CHECK_SEC
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS template_pool (
+        file_id TEXT PRIMARY KEY,
+        web_view_link TEXT NOT NULL DEFAULT '',
+        template_version TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        claimed_at REAL,              -- NULL이면 대기 중
+        pending_title TEXT            -- 배포 시 정한 파일명 (첫 /estimate에서 적용 후 행 삭제)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS template_pool_lease (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        owner TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    """,
+]
+
+# 배포 후 /estimate가 끝내 오지 않은 항목은 이 시간이 지나면 풀 관리 대상에서 제외
+_CLAIMED_RETENTION_SEC = 24 * 3600
+
+
+class TemplatePool:
+    """copy_func(name) -> (file_id, web_view_link), version_func() -> str, delete_func(file_id)"""
+
+    def __init__(self, copy_func, version_func, delete_func,
+                 low=TEMPLATE_POOL_LOW, high=TEMPLATE_POOL_HIGH,
+                 check_interval=TEMPLATE_POOL_CHECK_SEC, db_path=None):
+        self.copy_func = copy_func
+        self.version_func = version_func
+        self.delete_func = delete_func
+        self.low = low
+        self.high = high
+        self.check_interval = check_interval
+        self.db_path = db_path
+        self._version = None
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._owner = uuid.uuid4().hex
+        self._schema_ready = False
+
+    @property
+    def enabled(self):
+        return self.high > 0
+
+    def _conn(self):
+        conn = state_db.get_conn(self.db_path)
+        if not self._schema_ready:
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+            self._schema_ready = True
+        return conn
+
+    # --- 요청 경로 ---
+
+    def acquire(self, title):
+        """대기 중인 최신 버전 복사본 하나를 배포 처리하고 {"file_id", "web_view_link"} 반환 (없으면 None)"""
+        if not self.enabled or self._version is None:
+            return None
+        self._conn()
+        with state_db.transaction(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT file_id, web_view_link FROM template_pool "
+                "WHERE claimed_at IS NULL AND template_version = ? ORDER BY created_at LIMIT 1",
+                (self._version,),
+            ).fetchone()
+            if row is None:
+                claimed = None
+            else:
+                conn.execute(
+                    "UPDATE template_pool SET claimed_at = ?, pending_title = ? WHERE file_id = ?",
+                    (time.time(), title, row["file_id"]),
+                )
+                claimed = {"file_id": row["file_id"], "web_view_link": row["web_view_link"]}
+        self._wakeup.set()  # 보충 스레드 깨우기 (low 미만이면 채움)
+        return claimed
+
+    def take_pending_title(self, file_id):
+        """배포된 복사본이면 적용할 파일명을 돌려주고 풀에서 제거 (풀 복사본이 아니면 None)"""
+        if not self.enabled:
+            return None
+        self._conn()
+        with state_db.transaction(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT pending_title FROM template_pool WHERE file_id = ? AND claimed_at IS NOT NULL",
+                (file_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM template_pool WHERE file_id = ?", (file_id,))
+            return row["pending_title"]
+
+    def status(self):
+        conn = self._conn()
+        counts = {r["kind"]: r["n"] for r in conn.execute(
+            "SELECT CASE WHEN claimed_at IS NULL THEN 'ready' ELSE 'claimed' END AS kind, COUNT(*) AS n "
+            "FROM template_pool GROUP BY kind"
+        )}
+        return {
+            "enabled": self.enabled,
+            "template_version": self._version,
+            "ready": counts.get("ready", 0),
+            "claimed": counts.get("claimed", 0),
+            "low": self.low,
+            "high": self.high,
+        }
+
+    # --- 백그라운드 보충 ---
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="template-pool", daemon=True)
+        self._thread.start()
+        log.info(f"✅ [템플릿 풀] 보충 스레드 시작 (low={self.low}, high={self.high})")
+
+    def _loop(self):
+        while True:
+            try:
+                self.refill()
+            except Exception as e:
+                log.exception(f"⚠️ [템플릿 풀] 보충 중 오류: {e}")
+            self._wakeup.wait(self.check_interval)
+            self._wakeup.clear()
+
+    def _take_lease(self, seconds):
+        """보충 작업 임대 (여러 워커가 동시에 복사해 풀을 과하게 채우는 것 방지)"""
+        now = time.time()
+        with state_db.transaction(self.db_path) as conn:
+            row = conn.execute("SELECT owner, expires_at FROM template_pool_lease WHERE id = 1").fetchone()
+            if row and row["owner"] != self._owner and row["expires_at"] > now:
+                return False
+            conn.execute(
+                "INSERT INTO template_pool_lease (id, owner, expires_at) VALUES (1, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at",
+                (self._owner, now + seconds),
+            )
+            return True
+
+    def _release_lease(self):
+        self._conn().execute("DELETE FROM template_pool_lease WHERE id = 1 AND owner = ?", (self._owner,))
+
+    def refill(self):
+        """템플릿 버전 확인 → 이전 버전 복사본 정리 → low 미만이면 high까지 보충"""
+        conn = self._conn()
+        self._version = str(self.version_func())
+
+        if not self._take_lease(seconds=max(60, self.high * 30)):
+            return
+        try:
+            conn.execute(
+                "DELETE FROM template_pool WHERE claimed_at IS NOT NULL AND claimed_at < ?",
+                (time.time() - _CLAIMED_RETENTION_SEC,),
+            )
+            stale = [r["file_id"] for r in conn.execute(
+                "SELECT file_id FROM template_pool WHERE claimed_at IS NULL AND template_version != ?",
+                (self._version,),
+            )]
+            for file_id in stale:
+                # 배포되기 전에 먼저 풀에서 빼고 Drive 삭제 (삭제 실패해도 재배포되지 않음)
+                # SELECT 뒤에 버전 갱신 전인 다른 워커가 배포했으면 행이 안 지워짐 → 사용자 파일이므로 삭제하지 않음
+                removed = conn.execute(
+                    "DELETE FROM template_pool WHERE file_id = ? AND claimed_at IS NULL", (file_id,)
+                ).rowcount
+                if removed != 1:
+                    continue
+                try:
+                    self.delete_func(file_id)
+                except Exception as e:
+                    log.warning(f"⚠️ [템플릿 풀] 이전 버전 복사본 삭제 실패 ({file_id}): {e}")
+            if stale:
+                log.info(f"[템플릿 풀] 템플릿 변경 감지 → 이전 버전 복사본 {len(stale)}개 정리")
+
+            ready = conn.execute(
+                "SELECT COUNT(*) FROM template_pool WHERE claimed_at IS NULL AND template_version = ?",
+                (self._version,),
+            ).fetchone()[0]
+            if ready >= self.low:
+                return
+            for i in range(self.high - ready):
+                name = f"견적서_DLP_대기_{time.strftime('%y%m%d_%H%M%S')}_{i}"
+                file_id, web_view_link = self.copy_func(name)
+                conn.execute(
+                    "INSERT INTO template_pool (file_id, web_view_link, template_version, created_at) VALUES (?, ?, ?, ?)",
+                    (file_id, web_view_link or "", self._version, time.time()),
+                )
+            log.info(f"✅ [템플릿 풀] {self.high - ready}개 보충 완료 (대기 {self.high}개)")
+        finally:
+            self._release_lease()
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# main/config import 전에 로컬 상태 DB·PDF 캐시를 임시 경로로 (저장소 폴더에 파일이 생기지 않도록)
+_TMP = tempfile.mkdtemp(prefix="auto-estimate-test-")
+os.environ.setdefault("STATE_DB_PATH", os.path.join(_TMP, "state.db"))
+os.environ.setdefault("PDF_CACHE_DIR", os.path.join(_TMP, "pdf_cache"))
+os.environ.setdefault("PIPEDRIVE_OUTBOX_DIR", os.path.join(_TMP, "pd_outbox"))
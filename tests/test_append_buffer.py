@@ -0,0 +1,132 @@
+"""write-behind append 버퍼: 저널 기록 후 반환, 묶음 전송, 실패 시 보관, 종료 시 전송, 미러 반영"""
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from append_buffer import AppendBuffer
+from history_mirror import SheetMirror
+
+
+class FakeSheet:
+    def __init__(self, header_rows=1):
+        self.rows = [["header"]] * header_rows
+        self.calls = 0
+        self.fail = False
+
+    def append_rows(self, rows):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("429 quota")
+        first = len(self.rows) + 1
+        self.rows.extend(rows)
+        return {"updates": {"updatedRange": f"Sheet1!A{first}:Y{len(self.rows)}"}}
+
+
+def test_concurrent_rows_are_sent_in_one_append_and_mirrored(tmp_path):
+    sheet = FakeSheet()
+    mirror = SheetMirror(lambda start: sheet.rows[start - 1:])
+    mirror.sync(full=True)
+    buffer = AppendBuffer("sheet-a", sheet.append_rows, on_flushed=mirror.apply_append_rows,
+                          max_rows=50, db_path=str(tmp_path / "state.db"))
+
+    threads = [threading.Thread(target=buffer.enqueue, args=([f"row{i}", i],)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sheet.calls == 0 and buffer.pending() == 8
+
+    assert buffer.flush() == 8
+    assert sheet.calls == 1 and len(sheet.rows) == 9
+    assert buffer.pending() == 0
+    assert len(list(mirror.iter_newest_first())) == 8  # 전송 응답의 행 번호로 바로 반영
+
+
+def test_failed_flush_keeps_rows_in_journal(tmp_path):
+    sheet = FakeSheet()
+    db_path = str(tmp_path / "state.db")
+    buffer = AppendBuffer("sheet-b", sheet.append_rows, max_rows=2, db_path=db_path)
+    for i in range(3):
+        buffer.enqueue([i])
+    sheet.fail = True
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    assert buffer.pending() == 3 and buffer.stats()["failures"] == 1
+
+    # 프로세스 재시작: 새 버퍼가 같은 저널에서 이어서 전송 (max_rows씩 순서대로)
+    sheet.fail = False
+    restarted = AppendBuffer("sheet-b", sheet.append_rows, max_rows=2, db_path=db_path)
+    assert restarted.flush() == 3
+    assert sheet.rows[1:] == [[0], [1], [2]]
+
+
+def test_stop_drains_and_lease_blocks_other_worker(tmp_path):
+    sheet = FakeSheet()
+    db_path = str(tmp_path / "state.db")
+    buffer = AppendBuffer("sheet-c", sheet.append_rows, flush_interval_ms=60_000, db_path=db_path)
+    other = AppendBuffer("sheet-c", sheet.append_rows, db_path=db_path)
+    buffer.enqueue(["a"])
+    assert buffer._acquire_lease()
+    assert other.flush() == 0  # 다른 워커가 플러시 중이면 건너뜀
+    buffer._release_lease()
+
+    buffer.start()
+    assert buffer.stop(timeout=5) == 0
+    assert sheet.rows[1:] == [["a"]]
+
+
+class _BadRequest(Exception):
+    def __init__(self):
+        super().__init__("400: Your input contains more than the maximum of 50000 characters in a single cell.")
+        self.response = SimpleNamespace(status_code=400, headers={})
+
+
+def test_permanently_failing_row_is_moved_to_dead_and_unblocks_the_rest(tmp_path):
+    sheet = FakeSheet()
+    append = sheet.append_rows
+
+    def append_rows(rows):
+        if ["poison"] in rows:
+            raise _BadRequest()
+        return append(rows)
+
+    buffer = AppendBuffer("sheet-d", append_rows, max_rows=10, db_path=str(tmp_path / "state.db"))
+    for row in ([0], [1], ["poison"], [2]):
+        buffer.enqueue(row)
+    assert buffer.flush() == 3
+    assert sheet.rows[1:] == [[0], [1], [2]]
+    stats = buffer.stats()
+    assert stats["pending"] == 0 and stats["dead"] == 1
+    assert stats["dead_rows"][0]["row"] == ["poison"] and "400" in stats["dead_rows"][0]["last_error"]
+
+
+def test_rows_over_attempt_limit_go_dead_but_transient_errors_keep_rows(tmp_path):
+    sheet = FakeSheet()
+    buffer = AppendBuffer("sheet-e", sheet.append_rows, max_attempts=2, db_path=str(tmp_path / "state.db"))
+    buffer.enqueue([0])
+    sheet.fail = True
+    with pytest.raises(RuntimeError):
+        buffer.flush()
+    assert buffer.pending() == 1
+    assert buffer.flush() == 0  # 두 번째 실패 → 한도 도달
+    assert buffer.pending() == 0 and buffer.stats()["dead"] == 1
+
+
+def test_flush_stops_when_lease_is_taken_over(tmp_path):
+    sheet = FakeSheet()
+    db_path = str(tmp_path / "state.db")
+    buffer = AppendBuffer("sheet-f", None, max_rows=1, db_path=db_path)
+    other = AppendBuffer("sheet-f", sheet.append_rows, max_rows=1, db_path=db_path)
+
+    def slow_append(rows):
+        # 임대 시간을 넘긴 배치 → 다른 워커가 임대를 넘겨받음
+        buffer._conn().execute("UPDATE append_lease SET owner = ?, expires_at = ?", (other.owner, time.time() + 60))
+        return sheet.append_rows(rows)
+
+    buffer.append_func = slow_append
+    for i in range(3):
+        buffer.enqueue([i])
+    assert buffer.flush() == 1
+    assert buffer.pending() == 2
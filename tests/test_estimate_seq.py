@@ -0,0 +1,61 @@
+"""견적번호 일련번호 발급기: 여러 프로세스·스레드가 동시에 발급해도 번호가 겹치지 않음"""
+import json
+import multiprocessing
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+
+import estimate_seq
+
+DAY = time.strftime("%Y-%m-%d")  # 보관 기간 정리 대상이 아닌 날짜
+
+
+def _allocate_many(db_path, count, scope=""):
+    return [estimate_seq.next_number(DAY, scope, db_path=db_path) for _ in range(count)]
+
+
+def test_parallel_processes_get_unique_numbers(tmp_path):
+    db_path = str(tmp_path / "seq.db")
+    processes, per_process = 8, 60
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processes, mp_context=ctx) as pool:
+        batches = list(pool.map(_allocate_many, [db_path] * processes, [per_process] * processes))
+
+    numbers = [n for batch in batches for n in batch]
+    assert len(numbers) == processes * per_process
+    assert sorted(numbers) == list(range(1, processes * per_process + 1))
+    assert estimate_seq.current_count(DAY, db_path=db_path) == processes * per_process
+
+
+def test_parallel_threads_and_scopes(tmp_path):
+    db_path = str(tmp_path / "seq.db")
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        a = pool.map(lambda _: estimate_seq.next_number(DAY, "A", db_path=db_path), range(100))
+        b = pool.map(lambda _: estimate_seq.next_number(DAY, "B", db_path=db_path), range(50))
+        a, b = list(a), list(b)
+    assert sorted(a) == list(range(1, 101))
+    assert sorted(b) == list(range(1, 51))
+    assert estimate_seq.current_count(DAY, "A", db_path=db_path) == 100
+    assert estimate_seq.current_count(DAY, "C", db_path=db_path) == 0
+
+
+def test_imports_legacy_pdf_count_json(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with open(estimate_seq.LEGACY_COUNT_FILE, "w", encoding="utf-8") as f:
+        json.dump({DAY: 7}, f)
+    db_path = str(tmp_path / "seq.db")
+    assert estimate_seq.current_count(DAY, db_path=db_path) == 7
+    assert estimate_seq.next_number(DAY, db_path=db_path) == 8
+
+
+def test_allocation_error_is_not_replaced_by_a_default_number(monkeypatch):
+    import main  # 모듈 위에서 가져오면 spawn 자식 프로세스도 main을 import함
+
+    def busy(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(estimate_seq, "next_number", busy)
+    with pytest.raises(sqlite3.OperationalError):
+        main.get_today_pdf_count("B")  # 예전에는 1을 돌려줘 DLP...-B-1이 다시 발급됨
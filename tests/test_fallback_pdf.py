@@ -0,0 +1,31 @@
+"""대체 PDF 렌더러: kit 재사용, 프로세스 풀 렌더링, create_test_pdf 호환"""
+import io
+
+import main
+from fallback_pdf import FallbackRenderer, get_kit, render_estimate_pdf
+
+DATA = {
+    "estimate_number": "DLP250101-B-1",
+    "receiver_company": "경신이엔피",
+    "products": [{"name": "라벨 프린터", "qty": 2, "price": 1000, "total": 2000},
+                 {"name": "", "total": 0}],
+}
+
+
+def test_kit_is_built_once_and_render_returns_pdf():
+    assert get_kit() is get_kit()
+    pdf = render_estimate_pdf(DATA)
+    assert pdf.startswith(b"%PDF") and pdf.rstrip().endswith(b"%%EOF")
+
+
+def test_process_pool_render_and_create_test_pdf(monkeypatch):
+    renderer = FallbackRenderer(workers=1, timeout=60)
+    try:
+        pdf = renderer.render(DATA)
+        assert pdf.startswith(b"%PDF")
+        monkeypatch.setattr(main, "FALLBACK_RENDERER", renderer)
+        out = io.BytesIO()
+        assert main.create_test_pdf(out, DATA) is out
+        assert out.getvalue().startswith(b"%PDF")
+    finally:
+        renderer.shutdown()
@@ -0,0 +1,72 @@
+"""자격증명 부트스트랩(한 번 파싱·검증, 네트워크 없음)과 백그라운드 시계 오차 측정"""
+import json
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from google_auth import ClockSkewProbe, GoogleAuth, parse_service_account_info
+
+
+def _service_account_json():
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    info = {
+        "type": "service_account",
+        "project_id": "p",
+        "private_key_id": "k1",
+        # Render 환경변수에 붙여 넣은 형태: 개행이 \n 문자 그대로 들어간 경우
+        "private_key": pem.replace("\n", "\\n"),
+        "client_email": "svc@p.iam.gserviceaccount.com",
+        "token_uri": "https://oauth2.googleapis.com/token",
+    }
+    return json.dumps(info)
+
+
+@pytest.mark.parametrize("raw, message", [
+    ("", "설정되지 않았습니다"),
+    ("{not json", "JSON 파싱 오류"),
+    (json.dumps({"type": "service_account"}), "필수 키 누락"),
+    (json.dumps({"type": "x", "project_id": "p", "private_key_id": "k", "private_key": "abc",
+                 "client_email": "e"}), "BEGIN PRIVATE KEY"),
+])
+def test_parse_rejects_bad_credentials(raw, message):
+    with pytest.raises(ValueError, match=message):
+        parse_service_account_info(raw)
+
+
+def test_load_once_and_build_credentials_without_network(monkeypatch):
+    monkeypatch.setenv("TEST_GOOGLE_CREDENTIALS", _service_account_json())
+    auth = GoogleAuth(env_var="TEST_GOOGLE_CREDENTIALS")
+    assert auth.load()
+    assert "\\n" not in auth.info["private_key"]
+    monkeypatch.delenv("TEST_GOOGLE_CREDENTIALS")
+    assert auth.load()  # 캐시된 결과 (환경변수를 다시 읽지 않음)
+    creds = auth.credentials()
+    assert creds.service_account_email == "svc@p.iam.gserviceaccount.com"
+    assert creds.token is None  # refresh는 사용하는 쪽에서 한 번
+    assert auth.stats()["loaded"]
+
+
+def test_load_failure_is_cached(monkeypatch):
+    monkeypatch.delenv("TEST_GOOGLE_CREDENTIALS", raising=False)
+    auth = GoogleAuth(env_var="TEST_GOOGLE_CREDENTIALS")
+    assert auth.credentials() is None
+    assert "설정되지 않았습니다" in auth.stats()["error"]
+
+
+def test_clock_probe_uses_first_answering_server():
+    def query(server):
+        if server == "down":
+            raise OSError("timeout")
+        return 42.5, 0.02
+
+    probe = ClockSkewProbe(servers=["down", "up"], interval=0, warn_after=30, query=query)
+    assert probe.check() == 42.5
+    stats = probe.stats()
+    assert stats["server"] == "up" and stats["warn"] and stats["error"] is None
+
+    probe = ClockSkewProbe(servers=["down"], interval=0, query=query)
+    assert probe.check() is None
+    assert "timeout" in probe.stats()["error"]
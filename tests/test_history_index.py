@@ -0,0 +1,81 @@
+"""발행목록 n-gram 색인: 기존 선형 스캔과 같은 결과 (정규화 부분일치, 최신순, limit)"""
+import random
+
+from history_index import HistoryIndex, norm_text
+
+HEADER = ["견적일자", "견적번호", "견적담당자", "수신자-회사명"]
+
+
+def _row(n, company, manager="차재원"):
+    return ["2025-01-01", f"DLP250101-B-{n}", manager, company] + [""] * 21
+
+
+def _linear(rows, pn, qn, limit):
+    """예전 /estimate-history 구현과 같은 방식의 기준 결과"""
+    out = []
+    for row in reversed(rows[1:]):
+        number, manager, company = row[1], row[2], row[3]
+        if not number and not company:
+            continue
+        if pn and pn not in norm_text(manager):
+            continue
+        if qn and qn not in norm_text(company) and qn not in norm_text(number):
+            continue
+        out.append(number)
+        if len(out) >= limit:
+            break
+    return out
+
+
+def _build(rows):
+    index = HistoryIndex()
+    for i, row in enumerate(rows):
+        index.add(i + 1, row)
+    return index
+
+
+def test_matches_linear_scan_on_random_data():
+    rng = random.Random(7)
+    words = ["경신", "이엔피", "(주)", "한빛", "테크", "ABC", "코리아", "전자", " "]
+    managers = ["차재원", "이훈수", "김 민수"]
+    rows = [HEADER] + [
+        _row(i, "".join(rng.choice(words) for _ in range(rng.randint(1, 4))), rng.choice(managers))
+        for i in range(500)
+    ]
+    index = _build(rows)
+    for pn in ["", "차재", "훈", "김민수"]:
+        for qn in ["", "경", "경신이", "주한빛", "abc코", "b12", "없는회사"]:
+            for limit in (1, 5, 50):
+                got = [item["number"] for item in index.search(norm_text(pn), norm_text(qn), limit)]
+                assert got == _linear(rows, norm_text(pn), norm_text(qn), limit), (pn, qn, limit)
+
+
+def test_replaced_row_and_reset():
+    index = _build([HEADER, _row(1, "경신이엔피"), _row(2, "한빛테크")])
+    index.add(3, _row(2, "다른회사"))  # 같은 행이 교체된 경우 이전 내용으로는 검색되지 않음
+    assert index.search("", "한빛", 10) == []
+    assert [item["company"] for item in index.search("", "회사", 10)] == ["다른회사"]
+
+    index.add(5, _row(5, "경신"))
+    index.add(4, _row(4, "경신"))  # 늦게 도착한 행도 행 번호 순서 유지
+    assert [item["number"] for item in index.search("", "경신", 10)] == [
+        "DLP250101-B-5", "DLP250101-B-4", "DLP250101-B-1"]
+
+    index.reset()
+    assert len(index) == 0 and index.search("", "", 10) == []
+
+
+def test_rebuild_keeps_answering_from_the_old_index_until_swapped():
+    index = _build([HEADER, _row(1, "경신이엔피"), _row(2, "경신테크")])
+    seen = []
+
+    def rows():
+        yield 2, _row(1, "경신이엔피")
+        seen.append([item["number"] for item in index.search("", "경신", 10)])  # 재구성 도중의 조회
+        yield 3, _row(2, "경신테크")
+        yield 4, _row(3, "경신상사")
+
+    index.rebuild(rows())
+    assert seen == [["DLP250101-B-2", "DLP250101-B-1"]]
+    assert [item["number"] for item in index.search("", "경신", 10)] == [
+        "DLP250101-B-3", "DLP250101-B-2", "DLP250101-B-1"]
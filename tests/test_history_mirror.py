@@ -0,0 +1,72 @@
+"""발행목록 미러: 새 행만 가져오기, append 즉시 반영, /estimate-history 메모리 응답"""
+import main
+from history_index import HistoryIndex
+from history_mirror import SheetMirror
+
+HEADER = ["견적일자", "견적번호", "견적담당자", "수신자-회사명"]
+
+
+def _row(n, company="회사", manager="차재원"):
+    return ["2025-01-01", f"DLP250101-B-{n}", manager, company] + [""] * 21
+
+
+class _FakeSheet:
+    def __init__(self, rows):
+        self.rows = rows
+        self.fetches = []
+
+    def fetch(self, start_row):
+        self.fetches.append(start_row)
+        return [list(r) for r in self.rows[start_row - 1:]]
+
+
+def test_incremental_sync_only_fetches_new_rows():
+    sheet = _FakeSheet([HEADER, _row(1), _row(2)])
+    mirror = SheetMirror(sheet.fetch)
+    mirror.ensure_fresh()
+    assert sheet.fetches == [1]
+
+    sheet.rows.append(_row(3))
+    assert mirror.sync() == 1
+    assert sheet.fetches == [1, 4]
+    assert [n for n, _ in mirror.iter_newest_first()] == [4, 3, 2]
+
+
+def test_append_response_is_applied_immediately_and_resynced_in_place():
+    sheet = _FakeSheet([HEADER, _row(1)])
+    mirror = SheetMirror(sheet.fetch)
+    mirror.sync(full=True)
+
+    # 다른 워커가 3행을 쓰기 전에 이 워커의 행이 4행에 기록된 상황
+    assert mirror.apply_append({"updates": {"updatedRange": "'시트1'!A4:Y4"}}, _row(9))
+    assert [n for n, _ in mirror.iter_newest_first()] == [4, 2]
+
+    sheet.rows += [_row(2), _row(9)]
+    mirror.sync()
+    assert [r[1] for _, r in mirror.iter_newest_first()] == ["DLP250101-B-9", "DLP250101-B-2", "DLP250101-B-1"]
+    assert not mirror.apply_append(None, _row(10))  # 행 번호를 모르면 다음 동기화로 미룸
+
+
+def test_estimate_history_served_from_mirror(monkeypatch):
+    sheet = _FakeSheet([HEADER, _row(1, "(주)경신 이엔피"), _row(2, "다른회사", "이훈수"), _row(3, "경신이엔피")])
+    mirror, index = SheetMirror(sheet.fetch), HistoryIndex()
+    mirror.add_listener(index.add, index.rebuild)
+    monkeypatch.setattr(main, "HISTORY_MIRROR", mirror)
+    monkeypatch.setattr(main, "HISTORY_INDEX", index)
+
+    res = main.estimate_history(person="", q="경신이", limit=20)
+    assert [item["number"] for item in res["items"]] == ["DLP250101-B-3", "DLP250101-B-1"]
+
+    res = main.estimate_history(person="이훈수", q="", limit=20)
+    assert [item["company"] for item in res["items"]] == ["다른회사"]
+    assert sheet.fetches == [1]  # 두 번째 조회는 시트 호출 없음
+
+
+def test_first_sync_on_request_path_is_interactive_and_background_sync_is_not():
+    from rate_limit import BACKGROUND, INTERACTIVE, _priority
+
+    seen = []
+    mirror = SheetMirror(lambda start: seen.append(_priority.get()) or [["h"]], sync_interval=0)
+    mirror.ensure_fresh()  # 첫 조회: 요청 스레드에서 동기화
+    mirror._background_sync(False)
+    assert seen == [INTERACTIVE, BACKGROUND]
@@ -0,0 +1,73 @@
+"""공용 HTTP 연결 풀: 기본 타임아웃, 풀 크기 제한과 대기/시간 초과, 연결 재사용 통계 (로컬 HTTP 서버)"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from http_client import pool_stats, pooled
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        delay = float(self.path.rsplit("/", 1)[1] or 0)
+        time.sleep(delay)
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _host_stats(name):
+    (stats,) = pool_stats()[name].values()
+    return stats
+
+
+def test_default_timeout_applies_when_caller_omits_it(server):
+    session = pooled(requests.Session(), "test-timeout", timeout=(1, 0.2))
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        session.get(f"{server}/0.5")
+    assert session.get(f"{server}/0.5", timeout=2).text == "ok"  # 호출별 timeout이 우선
+
+
+def test_full_pool_waits_then_times_out(server):
+    session = pooled(requests.Session(), "test-full", pool_maxsize=1, pool_timeout=0.1)
+    held = session.get(f"{server}/0", stream=True)  # 본문을 읽기 전까지 연결 사용 중
+    assert _host_stats("test-full")["in_use"] == 1
+    with pytest.raises(requests.exceptions.ConnectionError, match="연결 풀 대기 시간 초과"):
+        session.get(f"{server}/0")
+    held.close()
+
+    assert session.get(f"{server}/0").text == "ok"
+    stats = _host_stats("test-full")
+    assert stats["in_use"] == 0 and stats["idle"] == 1
+    assert stats["pool_timeouts"] == 1 and stats["opened"] == 1  # 같은 연결 재사용
+
+
+def test_concurrent_calls_queue_on_pool_instead_of_opening_more(server):
+    session = pooled(requests.Session(), "test-wait", pool_maxsize=1, pool_timeout=5)
+    threads = [threading.Thread(target=lambda: session.get(f"{server}/0.2").text) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats = _host_stats("test-wait")
+    assert stats["waits"] >= 1 and stats["wait_ms"] > 0
+    assert stats["opened"] == 1 and stats["in_use"] == 0
@@ -0,0 +1,59 @@
+"""백그라운드 작업 큐: 접수 즉시 반환, 단계 기록, 결과 조회, 중단 작업 복구"""
+import time
+
+from jobs import JobQueue
+
+
+def _wait_finished(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["state"] in ("success", "error"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} not finished: {queue.get(job_id)}")
+
+
+def test_submit_runs_stages_and_stores_result(tmp_path):
+    def runner(payload, report):
+        report("pdf_export", source="google")
+        report("drive_upload", pdf_link="https://drive/x")
+        return {"status": "success", "echo": payload["n"]}
+
+    queue = JobQueue("test", runner, db_path=str(tmp_path / "state.db"))
+    job_id = queue.submit({"n": 7})
+
+    job = _wait_finished(queue, job_id)
+    assert job["state"] == "success"
+    assert [s["name"] for s in job["stages"]] == ["pdf_export", "drive_upload"]
+    assert job["stages"][0]["source"] == "google"
+    assert job["result"] == {"status": "success", "echo": 7}
+
+
+def test_runner_exception_marks_job_error(tmp_path):
+    def runner(payload, report):
+        raise RuntimeError("boom")
+
+    queue = JobQueue("test", runner, db_path=str(tmp_path / "state.db"))
+    job = _wait_finished(queue, queue.submit({}))
+    assert job["state"] == "error"
+    assert "boom" in job["result"]["message"]
+
+
+def test_recover_reruns_queued_jobs(tmp_path):
+    db_path = str(tmp_path / "state.db")
+    ran = []
+
+    # 접수만 되고 실행되지 못한 작업 (워커가 죽은 상황) 흉내
+    crashed = JobQueue("test", lambda p, report: {"status": "success"}, db_path=db_path)
+    crashed._executor.submit = lambda *a, **k: None
+    job_id = crashed.submit({"n": 1})
+
+    def runner(payload, report):
+        ran.append(payload["n"])
+        return {"status": "success"}
+
+    queue = JobQueue("test", runner, db_path=db_path)
+    assert queue.recover() == 1
+    assert _wait_finished(queue, job_id)["state"] == "success"
+    assert ran == [1]
@@ -0,0 +1,95 @@
+"""로컬 PDF 엔진: CELL_MAP 배치, 기준 PDF 회귀 비교, 엔진 선택
+
+기준 PDF(tests/reference/*.pdf)는 reportlab invariant 모드 출력이라 같은 입력이면 바이트가 같다.
+배치를 의도적으로 바꿨다면 UPDATE_REFERENCE_PDFS=1 pytest tests/test_local_pdf.py 로 다시 만들고 눈으로 확인 후 커밋.
+"""
+import io
+import os
+
+import pytest
+
+import main
+from config import CELL_MAP
+from local_pdf import cell_values, fits, render_estimate_local
+
+REFERENCE_DIR = os.path.join(os.path.dirname(__file__), "reference")
+
+BASE = {
+    "estimate_date": "2025-01-02",
+    "estimate_number": "DLP250102-B-3",
+    "supplier_person": "홍길동",
+    "supplier_email": "sales@example.com",
+    "supplier_phone": "010-0000-0000",
+    "receiver_company": "경신이엔피",
+    "receiver_person": "김담당",
+    "receiver_email": "buyer@example.com",
+    "receiver_phone": "02-000-0000",
+    "quote_validity": "견적일로부터 30일",
+    "delivery_date": "발주 후 2주",
+    "product_training": "설치 시 1회",
+    "extra_note": "부가세 별도",
+}
+
+CASES = {
+    "single_product": dict(BASE, products=[
+        {"type": "프린터", "name": "라벨 프린터", "detail": "300dpi<br>USB/LAN", "qty": 2, "price": 1500000, "total": 3000000},
+    ]),
+    "full_grid": dict(BASE, products=[
+        {"type": "소모품", "name": f"리본 {i}", "detail": "왁스 리본 110mm x 300m " * (i % 3 + 1),
+         "qty": i, "price": 12000, "total": 12000 * i, "note": "재고" if i % 2 else ""}
+        for i in range(1, 11)
+    ]),
+}
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_matches_reference_pdf(name):
+    pdf = render_estimate_local(CASES[name], invariant=True)
+    assert pdf.startswith(b"%PDF")
+    path = os.path.join(REFERENCE_DIR, f"{name}.pdf")
+    if os.environ.get("UPDATE_REFERENCE_PDFS"):
+        os.makedirs(REFERENCE_DIR, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(pdf)
+    with open(path, "rb") as f:
+        assert pdf == f.read(), f"{name}: 기준 PDF와 다름 (배치 변경이면 UPDATE_REFERENCE_PDFS=1로 갱신)"
+
+
+def test_values_are_placed_by_cell_map():
+    cells = cell_values(CASES["single_product"])
+    assert cells[CELL_MAP["estimate_number"]] == ("DLP250102-B-3", "value")
+    assert cells[CELL_MAP["receiver_company"]][0] == "경신이엔피"
+    assert cells[CELL_MAP["products[0][detail]"]][0] == "300dpi\nUSB/LAN"
+    assert cells[CELL_MAP["products[0][price]"]] == ("1,500,000", "number")
+    assert cells["F26"][0] == "3,000,000" and cells["F27"][0] == "300,000" and cells["F28"][0] == "3,300,000"
+
+
+def test_engine_selection(monkeypatch):
+    monkeypatch.setattr(main, "PDF_ENGINE", "google")
+    assert main.pdf_engine_for(BASE) == "google"
+    assert main.pdf_engine_for(dict(BASE, pdf_engine="local")) == "local"
+    monkeypatch.setattr(main, "PDF_ENGINE", "auto")
+    assert main.pdf_engine_for(CASES["full_grid"]) == "local"
+    too_many = dict(BASE, products=[{"name": f"p{i}", "total": 1} for i in range(11)])
+    assert not fits(too_many)
+    assert main.pdf_engine_for(too_many) == "google"
+
+
+def test_create_local_pdf_writes_into_buffer():
+    out = io.BytesIO()
+    assert main.create_local_pdf(out, CASES["single_product"]) is out
+    assert out.getvalue().startswith(b"%PDF")
+
+
+def test_more_than_ten_products_never_render_locally(monkeypatch):
+    monkeypatch.setattr(main, "PDF_ENGINE", "google")
+    twelve = dict(BASE, pdf_engine="local", products=[{"name": f"p{i}", "total": 100} for i in range(12)])
+    assert main.pdf_engine_for(twelve) == "google"
+    with pytest.raises(ValueError, match="격자"):
+        cell_values(twelve)
+    assert main.create_local_pdf(io.BytesIO(), twelve) is None
+
+    # 빈 행이 뒤에 붙은 경우는 그대로 local, 합계는 전체 제품 기준
+    padded = dict(BASE, products=[{"name": f"p{i}", "total": 100} for i in range(10)] + [{"name": ""}] * 2)
+    assert fits(padded)
+    assert cell_values(padded)["F26"][0] == "1,000"
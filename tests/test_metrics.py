@@ -0,0 +1,72 @@
+"""지연 시간 계측: 히스토그램 텍스트 형식, span 결과 라벨, 스레드로 넘어간 단계 기록, /metrics와 Server-Timing"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import pytest
+
+import main
+import metrics
+from pipeline import Stage, run_stages
+
+
+def test_histogram_renders_cumulative_buckets_sum_and_count():
+    h = metrics.Histogram("test_render_seconds", "테스트", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        h.observe(value, stage="export")
+    lines = h.render()
+    assert lines[:2] == ["# HELP test_render_seconds 테스트", "# TYPE test_render_seconds histogram"]
+    assert 'test_render_seconds_bucket{stage="export",le="0.1"} 1' in lines
+    assert 'test_render_seconds_bucket{stage="export",le="1.0"} 3' in lines
+    assert 'test_render_seconds_bucket{stage="export",le="+Inf"} 4' in lines
+    assert 'test_render_seconds_sum{stage="export"} 4.250000' in lines
+    assert 'test_render_seconds_count{stage="export"} 4' in lines
+    assert "test_render_seconds" in metrics.render()
+
+
+def test_span_and_timed_label_outcome():
+    tokens = metrics.begin_request("/test-span")
+    with pytest.raises(RuntimeError):
+        with metrics.span("pd_patch"):
+            raise RuntimeError("boom")
+
+    @metrics.timed("template_copy", failed=lambda r: r["status"] != "success")
+    def copy():
+        return {"status": "error"}
+
+    copy()
+    spans = metrics.end_request(tokens)
+    assert [name for name, _ in spans] == ["pd_patch", "template_copy"]
+    for stage in ("pd_patch", "template_copy"):
+        assert metrics.STAGE_SECONDS.samples(endpoint="/test-span", stage=stage, outcome="error")["count"] == 1
+    assert metrics.current_endpoint() == "background"
+
+
+def test_spans_recorded_in_pipeline_threads_reach_the_request():
+    def stage(results):
+        metrics.record("drive_upload", 0.2)
+        return "ok"
+
+    tokens = metrics.begin_request("/test-pipeline")
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        run_stages([Stage("a", stage), Stage("b", stage, deps=["a"])], executor)
+    spans = metrics.end_request(tokens)
+    assert metrics.server_timing(spans, 0.5) == "drive_upload;dur=400.0, total;dur=500.0"
+    assert metrics.STAGE_SECONDS.samples(endpoint="/test-pipeline", stage="drive_upload", outcome="ok")["count"] == 2
+
+
+def test_metrics_endpoint_and_server_timing_header():
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            ping = await client.get("/ping")
+            await client.get("/jobs/does-not-exist")
+            scraped = await client.get("/metrics")
+        return ping, scraped
+
+    ping, scraped = asyncio.run(scenario())
+    assert ping.headers["server-timing"].startswith("total;dur=")
+    assert scraped.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = scraped.text
+    assert 'auto_estimate_request_seconds_count{endpoint="/ping",method="GET",status="200"}' in body
+    assert 'endpoint="/jobs/{job_id}"' in body and "does-not-exist" not in body
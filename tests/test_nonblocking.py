@@ -0,0 +1,93 @@
+"""느린 /collect-data 처리 중에도 같은 워커의 /health가 즉시 응답하는지 확인"""
+import asyncio
+import time
+
+import httpx
+
+import main
+from append_buffer import AppendBuffer
+from pipedrive_outbox import PipedriveOutbox
+
+
+class _FakeWorksheet:
+    def __init__(self):
+        self.rows = []
+
+    def append_rows(self, rows):
+        self.rows.extend(rows)
+        return {"updates": {"updatedRange": f"Sheet1!A{len(self.rows) - len(rows) + 1}:Y{len(self.rows)}"}}
+
+
+class _FakeSpreadsheet:
+    def __init__(self):
+        self.sheet1 = _FakeWorksheet()
+
+
+class _FakeGspread:
+    def __init__(self):
+        self.sheet = _FakeSpreadsheet()
+
+    def open_by_key(self, key):
+        return self.sheet
+
+
+SLOW_EXPORT_SEC = 1.0
+
+
+def _install_fakes(monkeypatch, tmp_path):
+    gc = _FakeGspread()
+    monkeypatch.setattr(main, "get_google_clients", lambda: (object(), gc, object()))
+    # 행은 저널에만 기록되고, 시트 전송은 플러시에서
+    monkeypatch.setattr(main, "COLLECT_APPENDS", AppendBuffer("nonblocking-test", gc.sheet.sheet1.append_rows))
+
+    def slow_export(sheet_id, pdf_filename, creds, gid=0):
+        time.sleep(SLOW_EXPORT_SEC)  # 동기 HTTP 호출 흉내 (이벤트 루프에서 돌면 전체가 멈춤)
+        return True
+
+    monkeypatch.setattr(main, "export_sheet_to_pdf", slow_export)
+    monkeypatch.setattr(main, "upload_pdf_to_drive", lambda *a, **k: ("pdf-id", "https://drive/pdf"))
+    # Pipedrive 반영은 outbox에만 기록되고, 호출은 드레인에서
+    handlers = {kind: (lambda deal_id, payloads, attempts, kind=kind: f"pd-{kind}") for kind in ("quote", "file", "note")}
+    monkeypatch.setattr(main, "PD_OUTBOX", PipedriveOutbox(handlers, spool_dir=str(tmp_path / "outbox"),
+                                                           db_path=str(tmp_path / "outbox.db")))
+    return gc
+
+
+def test_health_responsive_during_slow_collect_data(monkeypatch, tmp_path):
+    gc = _install_fakes(monkeypatch, tmp_path)
+    payload = {
+        "fileId": "sheet-1",
+        "estimate_number": "DLP250101-A-1",
+        "receiver_company": "테스트",
+        "pipedrive_deal_id": 42,
+        "products": [{"name": "제품", "total": 1000}],
+    }
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            collect = asyncio.create_task(client.post("/collect-data", json=payload))
+            await asyncio.sleep(0.1)  # collect-data가 export 단계에 들어갈 때까지 대기
+
+            started = time.perf_counter()
+            health = await client.get("/health")
+            health_elapsed = time.perf_counter() - started
+
+            assert not collect.done()
+            collect_res = await collect
+            return health, health_elapsed, collect_res
+
+    health, health_elapsed, collect_res = asyncio.run(scenario())
+
+    assert health.status_code == 200
+    assert health.json()["status"] == "healthy"
+    assert health_elapsed < SLOW_EXPORT_SEC / 4
+    assert collect_res.json()["status"] == "success"
+    assert gc.sheet.sheet1.rows == []
+    assert main.COLLECT_APPENDS.flush() == 1
+    assert len(gc.sheet.sheet1.rows) == 1
+    tasks = collect_res.json()["pipedrive_tasks"]
+    assert len(tasks) == 3 and main.PD_OUTBOX.stats()["pending"] == 3
+    assert main.PD_OUTBOX.drain() == 1  # 견적번호 → 그다음 PDF 첨부·노트
+    assert main.PD_OUTBOX.drain() == 2
+    assert main.PD_OUTBOX.get(tasks[1])["result"] == "pd-file"
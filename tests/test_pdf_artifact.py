@@ -0,0 +1,60 @@
+"""요청별 PDF 버퍼: 메모리/디스크 전환, 독립 읽기, 스트리밍 multipart 본문"""
+import os
+from email.parser import BytesParser
+from email.policy import HTTP
+
+import requests
+
+from pdf_artifact import PdfArtifact, scratch_dir
+
+PDF = b"%PDF-1.4\n" + bytes(range(256)) * 200 + b"\n%%EOF"
+
+
+def _write_in_chunks(artifact, data, size=4096):
+    for i in range(0, len(data), size):
+        artifact.write(data[i:i + size])
+
+
+def test_spills_to_request_scratch_dir_and_cleans_up():
+    with scratch_dir() as scratch:
+        small, big = PdfArtifact(scratch), PdfArtifact(scratch, spool_max=10_000)
+        _write_in_chunks(small, PDF)
+        _write_in_chunks(big, PDF)
+        assert small.in_memory and not big.in_memory
+        assert os.path.dirname(big.path) == scratch
+        for artifact in (small, big):
+            r1, r2 = artifact.open(), artifact.open()
+            assert r1.read(100) == PDF[:100]
+            assert r2.read() == PDF  # 읽는 위치는 소비자마다 독립
+            r1.close(), r2.close()
+    assert not os.path.exists(scratch)
+
+
+def test_reset_discards_partial_write():
+    with scratch_dir() as scratch:
+        artifact = PdfArtifact(scratch, spool_max=10)
+        artifact.write(b"partial export that failed")
+        artifact.reset()
+        artifact.write(b"%PDF")
+        assert artifact.getvalue() == b"%PDF" and artifact.in_memory and os.listdir(scratch) == []
+
+
+def test_multipart_body_streams_with_content_length():
+    with scratch_dir() as scratch:
+        artifact = PdfArtifact(scratch)
+        _write_in_chunks(artifact, PDF)
+        body, content_type = artifact.multipart_body("file", "애니트론견적서_회사_1.pdf", fields={"deal_id": 42})
+
+        prepared = requests.Request("POST", "http://pipedrive.invalid/files", data=body,
+                                    headers={"Content-Type": content_type}).prepare()
+        assert prepared.body is body  # 본문을 미리 만들지 않고 파일 객체 그대로 전송
+        assert int(prepared.headers["Content-Length"]) == body.len
+        assert "Transfer-Encoding" not in prepared.headers
+
+        raw = body.read()
+        assert len(raw) == body.len
+        msg = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + raw)
+        parts = {p.get_param("name", header="content-disposition"): p for p in msg.iter_parts()}
+        assert parts["deal_id"].get_content() == "42"
+        assert parts["file"].get_filename() == "애니트론견적서_회사_1.pdf"
+        assert parts["file"].get_payload(decode=True) == PDF
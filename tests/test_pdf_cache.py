@@ -0,0 +1,85 @@
+"""PDF 캐시: 리비전이 같으면 export 생략, 바뀌면 다시 export, 크기 제한 삭제"""
+import io
+import os
+import time
+
+import main
+from pdf_cache import PdfCache
+
+PDF = b"%PDF-1.4 estimate" * 1000
+
+
+class _Drive:
+    def __init__(self):
+        self.version = "10"
+
+    def files(self):
+        return self
+
+    def get(self, **kwargs):
+        return self
+
+    def execute(self):
+        return {"version": self.version, "modifiedTime": "2026-01-01T00:00:00Z"}
+
+
+class _Response:
+    status_code = 200
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(PDF), chunk_size):
+            yield PDF[i:i + chunk_size]
+
+
+class _Http:
+    def __init__(self):
+        self.exports = 0
+
+    def get(self, url, **kwargs):
+        self.exports += 1
+        return _Response()
+
+
+class _Creds:
+    expired = False
+    token = "t"
+
+
+def test_export_reuses_cached_pdf_for_same_revision(tmp_path, monkeypatch):
+    drive, http = _Drive(), _Http()
+    monkeypatch.setattr(main, "get_google_clients", lambda: (None, None, drive))
+    monkeypatch.setattr(main, "HTTP", http)
+    monkeypatch.setattr(main, "PDF_CACHE", PdfCache(str(tmp_path), max_bytes=10_000_000))
+
+    for _ in range(2):
+        out = io.BytesIO()
+        assert main.export_sheet_to_pdf("sheet", out, _Creds())
+        assert out.getvalue() == PDF
+    assert http.exports == 1 and main.PDF_CACHE.hits == 1
+
+    drive.version = "11"  # 시트가 수정됨 → 다시 export
+    out = io.BytesIO()
+    assert main.export_sheet_to_pdf("sheet", out, _Creds())
+    assert http.exports == 2
+
+
+def test_discarded_writes_and_size_bound(tmp_path):
+    cache = PdfCache(str(tmp_path), max_bytes=2500)
+    with cache.writer("broken") as w:
+        w.write(b"x" * 100)  # commit 안 함 (export 실패) → 저장 안 됨
+    assert cache.open("broken") is None and os.listdir(tmp_path) == []
+
+    for i, key in enumerate(["a", "b", "c"]):
+        with cache.writer(key) as w:
+            w.write(b"x" * 1000)
+            w.commit()
+        os.utime(tmp_path / f"{key}.pdf", (time.time() - 100 + i, time.time() - 100 + i))  # a가 가장 오래됨
+    # 세 번째 저장 시 2500바이트 초과 → 가장 오래된 a 삭제
+    assert cache.open("a") is None
+    assert cache.stats()["files"] == 2 and cache.evictions == 1
@@ -0,0 +1,115 @@
+"""PipedriveClient: 속도 제한 헤더 페이싱, 429 재시도, 타임아웃, 거래 캐시, 엔드포인트별 통계"""
+import io
+import json
+
+import requests
+
+from pipedrive_client import PipedriveClient
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _response(status=200, payload=None, headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r._content = json.dumps(payload or {"success": True, "data": {}}).encode()
+    r.headers.update(headers or {})
+    return r
+
+
+class _Session:
+    """응답을 차례로 돌려주는 requests.Session 대역"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, params=None, timeout=None, **kwargs):
+        self.calls.append({"method": method, "url": url, "params": params, "timeout": timeout, **kwargs})
+        return self.responses.pop(0)
+
+
+def _client(session, clock=None, slept=None, **kwargs):
+    clock = clock or _Clock()
+    slept = slept if slept is not None else []
+
+    def sleep(s):
+        slept.append(s)
+        clock.now += s
+
+    return PipedriveClient(session, lambda: {"api_token": "t", "domain": "x.pipedrive.com"},
+                           clock=clock, sleep=sleep, **kwargs)
+
+
+def test_request_adds_token_and_default_timeout():
+    session = _Session(_response(), _response(201))
+    client = _client(session, timeout=7, upload_timeout=45)
+    client.request("GET", "v2", "/deals/5", params={"a": 1})
+    client.upload("/files", io.BytesIO(b"x"), "multipart/form-data; boundary=b")
+    assert session.calls[0]["url"] == "https://x.pipedrive.com/api/v2/deals/5"
+    assert session.calls[0]["params"] == {"a": 1, "api_token": "t"} and session.calls[0]["timeout"] == 7
+    assert session.calls[1]["timeout"] == 45  # 업로드에도 타임아웃
+
+
+def test_low_remaining_waits_for_window_reset():
+    clock, slept = _Clock(), []
+    session = _Session(_response(headers={"x-ratelimit-remaining": "1", "x-ratelimit-reset": "2",
+                                          "x-ratelimit-limit": "80"}), _response())
+    client = _client(session, clock=clock, slept=slept, min_remaining=2)
+    client.request("GET", "v2", "/deals")
+    client.request("GET", "v2", "/deals")
+    assert slept == [2.0]
+    quota = client.stats()["quota"]
+    assert quota["limit"] == 80 and quota["paced"] == 1
+
+
+def test_concurrent_calls_share_remaining_budget():
+    session = _Session(_response(headers={"x-ratelimit-remaining": "4", "x-ratelimit-reset": "2"}))
+    client = _client(session, min_remaining=2)
+    client.request("GET", "v2", "/deals")
+    # 응답을 기다리는 동안 나간 호출이 예산을 하나씩 차감 → 세 번째부터 대기
+    assert client._pace() == 0 and client._pace() == 0
+    assert client._pace() == 2.0
+
+
+def test_429_retries_after_retry_after_but_not_streams():
+    slept = []
+    session = _Session(_response(429, headers={"retry-after": "3"}), _response(200))
+    client = _client(session, slept=slept)
+    assert client.request("POST", "v1", "/notes", json={"content": "c"}).status_code == 200
+    assert slept == [3.0]
+    assert client.stats()["endpoints"]["POST v1/notes"]["throttled"] == 1
+
+    session = _Session(_response(429, headers={"retry-after": "1"}), _response(201))
+    client = _client(session)
+    assert client.upload("/files", io.BytesIO(b"x"), "multipart/form-data").status_code == 429
+    assert len(session.calls) == 1
+
+
+def test_deal_cache_reuses_read_and_applies_patch():
+    deal = {"id": 5, "custom_fields": {"q": {"value": "A-1"}}}
+    session = _Session(_response(payload={"success": True, "data": deal}), _response(200))
+    client = _client(session)
+    assert client.get_deal(5)["custom_fields"]["q"]["value"] == "A-1"
+    client.patch_deal(5, {"custom_fields": {"q": {"value": "A-1, A-2"}}})
+    assert client.get_deal(5)["custom_fields"]["q"]["value"] == "A-1, A-2"  # GET 없이 캐시
+    assert [c["method"] for c in session.calls] == ["GET", "PATCH"]
+
+    session.responses.append(_response(500))
+    client.patch_deal(5, {"custom_fields": {"q": {"value": "x"}}})
+    assert client.deals.peek("5") is None  # 실패하면 다음에 다시 읽음
+
+
+def test_stats_group_ids_per_endpoint():
+    session = _Session(_response(), _response(404))
+    client = _client(session)
+    client.request("GET", "v2", "/deals/1")
+    client.request("GET", "v2", "/deals/2")
+    stats = client.stats()["endpoints"]["GET v2/deals/{id}"]
+    assert stats["calls"] == 2 and stats["errors"] == 1 and stats["last_status"] == 404
@@ -0,0 +1,74 @@
+"""Pipedrive 미러: 커서 페이지 bootstrap, updated_since 변경분, 전체 재동기화 삭제 반영, 워커 간 공유"""
+import main
+from pipedrive_mirror import PipedriveMirror
+
+
+class _FakePipedrive:
+    def __init__(self):
+        self.orgs = {10: {"id": 10, "name": "(주)경신 이엔피", "update_time": "2025-01-01T00:00:00Z"}}
+        self.deals = {
+            i: {"id": i, "title": f"거래 {i}", "org_id": 10 if i % 2 else None, "value": 1000 * i,
+                "currency": "KRW", "status": "open", "add_time": f"2025-01-{i:02d} 09:00:00",
+                "update_time": f"2025-01-{i:02d}T09:00:00Z"}
+            for i in range(1, 8)
+        }
+        self.calls = []
+
+    def get_json(self, path, params):
+        self.calls.append((path, params.get("updated_since"), params.get("cursor")))
+        items = sorted((self.orgs if path == "/organizations" else self.deals).values(),
+                       key=lambda x: x["update_time"])
+        if params.get("updated_since"):
+            items = [x for x in items if x["update_time"] >= params["updated_since"]]
+        start = int(params.get("cursor") or 0)
+        page = items[start:start + 3]  # 작은 페이지로 커서 순회 확인
+        more = start + 3 < len(items)
+        return {"success": True, "data": page, "additional_data": {"next_cursor": str(start + 3) if more else None}}
+
+
+def test_bootstrap_delta_and_full_resync(tmp_path):
+    fake = _FakePipedrive()
+    mirror = PipedriveMirror(fake.get_json, db_path=str(tmp_path / "pd.db"))
+    assert not mirror.is_ready()
+
+    mirror.sync()
+    assert mirror.is_fresh() and mirror.stats()["deals"] == 7
+    assert [c for c in fake.calls if c[0] == "/deals"] == [("/deals", None, None), ("/deals", None, "3"), ("/deals", None, "6")]
+    # 조직명으로도 검색, 최신 생성순, live 검색과 같은 형식
+    hits = mirror.search(main.norm_text("경신"))
+    assert [d["id"] for d in hits] == [7, 5, 3, 1]
+    assert hits[0] == {"id": 7, "title": "거래 7", "org_name": "(주)경신 이엔피", "value": "7,000",
+                       "currency": "KRW", "add_time": "2025-01-07", "status": "open"}
+
+    fake.calls.clear()
+    fake.deals[2] = dict(fake.deals[2], title="경신 추가 거래", update_time="2025-02-01T00:00:00Z")
+    mirror.sync()
+    assert ("/deals", "2025-01-07T09:00:00Z", None) in fake.calls  # 변경분만 요청
+    assert 2 in [d["id"] for d in mirror.search(main.norm_text("경신추가"))]
+
+    del fake.deals[3]
+    mirror.sync(full=True)
+    assert 3 not in [d["id"] for d in mirror.search("거래")]
+
+
+def test_second_worker_reads_shared_store(tmp_path):
+    fake = _FakePipedrive()
+    db = str(tmp_path / "pd.db")
+    leader = PipedriveMirror(fake.get_json, db_path=db)
+    leader.sync()
+
+    follower = PipedriveMirror(fake.get_json, db_path=db)
+    follower._take_lease = lambda seconds: False  # 다른 워커가 동기화 중인 상황
+    n_calls = len(fake.calls)
+    assert follower.sync() is False
+    assert len(fake.calls) == n_calls
+    assert follower.stats()["deals"] == 7 and follower.is_fresh()
+
+
+def test_search_deals_uses_fresh_mirror(tmp_path, monkeypatch):
+    fake = _FakePipedrive()
+    mirror = PipedriveMirror(fake.get_json, db_path=str(tmp_path / "pd.db"))
+    mirror.sync()
+    monkeypatch.setattr(main, "PD_MIRROR", mirror)
+    monkeypatch.setattr(main, "PIPEDRIVE", None)  # API를 부르면 실패
+    assert [d["id"] for d in main.search_deals("경신", mode="auto")["deals"]] == [7, 5, 3, 1]
@@ -0,0 +1,211 @@
+"""Pipedrive outbox: 중복 없는 기록, 거래별 묶음 처리, 백오프 재시도/중단, 견적번호 누적의 멱등성"""
+import io
+import json
+import threading
+
+import pytest
+import requests
+
+import main
+from pipedrive_client import PipedriveClient
+from pipedrive_outbox import PipedriveOutbox
+
+
+def _outbox(tmp_path, handlers, **kwargs):
+    return PipedriveOutbox(handlers, spool_dir=str(tmp_path / "spool"), db_path=str(tmp_path / "outbox.db"), **kwargs)
+
+
+def test_enqueue_dedupes_and_drops_duplicate_spool(tmp_path):
+    outbox = _outbox(tmp_path, {})
+    first = outbox.spool(io.BytesIO(b"%PDF-1"))
+    ids = outbox.enqueue(7, [("quote", "quote:7:A-1", {"estimate_number": "A-1"}),
+                             ("file", "file:7:x", {"path": first, "file_name": "a.pdf"})])
+    second = outbox.spool(io.BytesIO(b"%PDF-1"))
+    again = outbox.enqueue(7, [("file", "file:7:x", {"path": second, "file_name": "a.pdf"})])
+    assert again == ids[1:]
+    assert (tmp_path / "spool").exists() and len(list((tmp_path / "spool").iterdir())) == 1
+    assert outbox.stats()["pending"] == 2
+
+
+def test_drain_batches_quotes_per_deal_and_removes_spool(tmp_path):
+    calls = []
+
+    def handler(kind):
+        def run(deal_id, payloads, attempts):
+            calls.append((kind, deal_id, [p.get("estimate_number") or p.get("file_name") for p in payloads]))
+            return f"{kind}-ok"
+        return run
+
+    outbox = _outbox(tmp_path, {k: handler(k) for k in ("quote", "file", "note")})
+    path = outbox.spool(io.BytesIO(b"%PDF"))
+    outbox.enqueue(7, [("quote", "q1", {"estimate_number": "A-1"}), ("file", "f1", {"path": path, "file_name": "a.pdf"})])
+    outbox.enqueue(7, [("quote", "q2", {"estimate_number": "A-2"}), ("note", "n2", {"estimate_number": "A-2"})])
+    outbox.enqueue(8, [("quote", "q3", {"estimate_number": "B-1"})])
+
+    assert outbox.drain() == 3  # 견적번호부터 — 첨부·노트는 거래의 quote가 끝난 뒤
+    assert outbox.drain() == 2
+    assert calls[:2] == [("quote", "7", ["A-1", "A-2"]), ("quote", "8", ["B-1"])]
+    assert sorted(calls[2:]) == [("file", "7", ["a.pdf"]), ("note", "7", ["A-2"])]
+    stats = outbox.stats()
+    assert stats["pending"] == 0 and stats["done"] == 5
+    assert not (tmp_path / "spool" / path.rsplit("/", 1)[1]).exists()
+
+
+def test_failures_back_off_then_go_dead_and_can_be_requeued(tmp_path):
+    attempts_seen = []
+
+    def flaky(deal_id, payloads, attempts):
+        attempts_seen.append(attempts)
+        raise RuntimeError("Pipedrive 503")
+
+    outbox = _outbox(tmp_path, {"note": flaky}, backoff_base=0, max_attempts=2)
+    (task_id,) = outbox.enqueue(7, [("note", "n1", {"estimate_number": "A-1"})])
+    assert outbox.drain() == 0
+    assert outbox.get(task_id)["state"] == "pending" and outbox.get(task_id)["attempts"] == 1
+    outbox.drain()
+    task = outbox.get(task_id)
+    assert task["state"] == "dead" and "503" in task["last_error"]
+    assert attempts_seen == [0, 1]
+    assert outbox.stats()["dead_tasks"][0]["id"] == task_id
+
+    outbox.handlers["note"] = lambda deal_id, payloads, attempts: 99
+    assert outbox.requeue(task_id)
+    assert outbox.drain() == 1 and outbox.get(task_id)["result"] == 99
+
+
+def test_file_and_note_wait_for_the_deals_quote(tmp_path):
+    calls = []
+    outbox = _outbox(tmp_path, {"note": lambda deal_id, payloads, attempts: calls.append("note")},
+                     backoff_base=0, max_attempts=1)
+
+    def failing_quote(deal_id, payloads, attempts):
+        raise RuntimeError("PATCH 400")
+
+    outbox.handlers["quote"] = failing_quote
+    (quote_id, note_id) = outbox.enqueue(7, [("quote", "q1", {"estimate_number": "A-1"}),
+                                            ("note", "n1", {"estimate_number": "A-1"})])
+    outbox.drain()
+    outbox.drain()
+    assert outbox.get(quote_id)["state"] == "dead"
+    assert outbox.get(note_id)["state"] == "pending" and calls == []
+
+    outbox.handlers["quote"] = lambda deal_id, payloads, attempts: "A-1"
+    outbox.requeue(quote_id)
+    assert outbox.drain() == 1 and outbox.drain() == 1
+    assert calls == ["note"]
+
+
+def test_file_and_note_of_a_deal_run_concurrently(tmp_path):
+    both_running = threading.Barrier(2, timeout=5)  # 하나씩 실행하면 BrokenBarrierError
+
+    def handler(deal_id, payloads, attempts):
+        both_running.wait()
+        return "ok"
+
+    outbox = _outbox(tmp_path, {"quote": lambda deal_id, payloads, attempts: "A-1", "file": handler, "note": handler})
+    path = outbox.spool(io.BytesIO(b"%PDF"))
+    outbox.enqueue(7, [("quote", "q1", {"estimate_number": "A-1"}), ("file", "f1", {"path": path, "file_name": "a.pdf"}),
+                       ("note", "n1", {"estimate_number": "A-1"})])
+    assert outbox.drain() == 1
+    assert outbox.drain() == 2
+    assert outbox.stats()["failures"] == 0
+
+
+class _WorkerDied(BaseException):
+    pass
+
+
+def test_task_rerun_after_worker_died_mid_call_checks_first(tmp_path):
+    attempts_seen = []
+
+    def note(deal_id, payloads, attempts):
+        attempts_seen.append(attempts)
+        if len(attempts_seen) == 1:
+            raise _WorkerDied()  # 노트 POST는 보냈지만 done 기록 전에 프로세스가 죽음
+        return "ok"
+
+    outbox = _outbox(tmp_path, {"note": note})
+    (task_id,) = outbox.enqueue(7, [("note", "n1", {"estimate_number": "A-1"})])
+    with pytest.raises(_WorkerDied):
+        outbox.drain()
+    outbox._conn().execute("UPDATE pd_outbox SET next_attempt_at = 0")  # 임대 시간이 지남
+    assert outbox.drain() == 1
+    assert attempts_seen == [0, 1]  # 다시 집은 실행은 이미 반영됐는지 확인부터
+    assert outbox.get(task_id)["attempts"] == 2  # 시작한 실행 수
+
+
+def test_backoff_grows_and_is_capped(tmp_path):
+    outbox = _outbox(tmp_path, {}, backoff_base=5, backoff_max=60)
+    assert 2.5 <= outbox.backoff(1) <= 5
+    assert 10 <= outbox.backoff(3) <= 20
+    assert outbox.backoff(20) <= 60
+
+
+class _Session:
+    def __init__(self, deal):
+        self.deal = deal
+        self.patches = []
+
+    def request(self, method, url, params=None, timeout=None, **kwargs):
+        r = requests.Response()
+        r.status_code = 200
+        if method == "PATCH":
+            self.patches.append(kwargs["json"])
+            self.deal["custom_fields"].update(kwargs["json"]["custom_fields"])
+        r._content = json.dumps({"success": True, "data": self.deal}).encode()
+        return r
+
+
+def test_quote_handler_appends_each_number_once(monkeypatch):
+    key = main.PIPEDRIVE_QUOTE_NUM_FIELD_KEY
+    session = _Session({"id": 7, "custom_fields": {key: {"value": "A-1"}}})
+    monkeypatch.setattr(main, "PIPEDRIVE", PipedriveClient(session, lambda: {"api_token": "t", "domain": "x"}))
+
+    value = main.update_pipedrive_quote_number(7, [{"estimate_number": "A-1"}, {"estimate_number": "A-2"}])
+    assert value == "A-1, A-2"
+    # 재시도(응답을 못 받았던 PATCH)에도 다시 붙이지 않음
+    assert main.update_pipedrive_quote_number(7, [{"estimate_number": "A-2"}], attempts=1) == "A-1, A-2"
+    assert len(session.patches) == 1
+
+
+def test_quote_handler_raises_when_deal_cannot_be_read(monkeypatch):
+    class _Down:
+        def request(self, method, url, **kwargs):
+            r = requests.Response()
+            r.status_code = 503
+            r._content = json.dumps({"success": False}).encode()
+            return r
+
+    monkeypatch.setattr(main, "PIPEDRIVE", PipedriveClient(_Down(), lambda: {"api_token": "t", "domain": "x"}))
+    with pytest.raises(RuntimeError, match="거래 조회 실패"):
+        main.update_pipedrive_quote_number(7, [{"estimate_number": "A-1"}])
+
+
+
+def test_drain_stops_when_lease_is_lost_and_running_task_is_not_rerun(tmp_path):
+    calls = []
+    outbox = _outbox(tmp_path, {})
+    other = _outbox(tmp_path, {"note": lambda deal_id, payloads, attempts: calls.append(("other", deal_id))})
+
+    def slow_note(deal_id, payloads, attempts):
+        calls.append(("first", deal_id))
+        # 임대 시간을 넘긴 드레인 → 다른 워커가 임대를 넘겨받아 드레인
+        outbox._conn().execute("UPDATE pd_outbox_lease SET expires_at = 0")
+        assert other.drain() == 2  # 실행 중인 거래 1 작업은 미뤄져 있어 다시 실행하지 않음
+        return "ok"
+
+    outbox.handlers["note"] = slow_note
+    for deal in range(1, 4):
+        outbox.enqueue(deal, [("note", f"n{deal}", {"estimate_number": f"A-{deal}"})])
+
+    assert outbox.drain() == 1  # 임대를 잃은 뒤로는 실행하지 않음
+    assert calls == [("first", "1"), ("other", "2"), ("other", "3")]
+    assert outbox.stats()["done"] == 3
+
+
+def test_drain_handles_at_most_drain_max_tasks(tmp_path):
+    outbox = _outbox(tmp_path, {"note": lambda deal_id, payloads, attempts: "ok"}, drain_max=3)
+    for deal in range(1, 6):
+        outbox.enqueue(deal, [("note", f"n{deal}", {"estimate_number": f"A-{deal}"})])
+    assert outbox.drain() == 3
+    assert outbox.drain() == 2
@@ -0,0 +1,133 @@
+"""단계 의존성 그래프: 독립 단계 병렬 실행, 실패 전파, 임계 경로 계산 / fan_out 동시 실행 제한·마감"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import pipeline
+from pipeline import Stage, fan_out, run_stages
+
+
+def _sleeper(seconds, value=None):
+    def run(results):
+        time.sleep(seconds)
+        return value
+    return run
+
+
+def test_independent_branches_run_in_parallel():
+    stages = [
+        Stage("export", _sleeper(0.2, "pdf")),
+        Stage("drive_upload", _sleeper(0.2), deps=["export"]),
+        Stage("pd_file", _sleeper(0.2), deps=["export"]),
+        Stage("pd_quote", _sleeper(0.3)),
+        Stage("append_row", _sleeper(0.1), deps=["drive_upload"]),
+    ]
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        run = run_stages(stages, executor)
+
+    assert not run.errors and not run.skipped
+    # 직렬 합계 1.0s → 가장 긴 경로(export → drive_upload → append_row) 0.5s 근처
+    assert run.total_ms < 800
+    assert run.critical_path == ["export", "drive_upload", "append_row"]
+    assert run.critical_path_ms >= 500
+    assert set(run.timings) == {s.name for s in stages}
+
+
+def test_results_are_passed_to_dependents():
+    seen = {}
+
+    def consume(results):
+        seen["export"] = results["export"]
+        return "ok"
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        run = run_stages([Stage("export", _sleeper(0, "pdf-bytes")), Stage("upload", consume, deps=["export"])], executor)
+    assert seen == {"export": "pdf-bytes"}
+    assert run.results["upload"] == "ok"
+
+
+def test_failure_skips_dependents_only():
+    def fail(results):
+        raise RuntimeError("export failed")
+
+    events = []
+    stages = [
+        Stage("export", fail),
+        Stage("drive_upload", _sleeper(0), deps=["export"]),
+        Stage("append_row", _sleeper(0), deps=["drive_upload"]),
+        Stage("pd_quote", _sleeper(0, True)),
+    ]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        run = run_stages(stages, executor, on_stage_done=lambda name, status, ms: events.append((name, status)))
+
+    assert set(run.errors) == {"export"}
+    assert run.skipped == ["drive_upload", "append_row"]
+    assert run.results == {"pd_quote": True}
+    assert ("export", "error") in events and ("append_row", "skipped") in events
+
+
+def test_rejects_cycles_and_unknown_deps():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with pytest.raises(ValueError):
+            run_stages([Stage("a", _sleeper(0), deps=["b"]), Stage("b", _sleeper(0), deps=["a"])], executor)
+        with pytest.raises(ValueError):
+            run_stages([Stage("a", _sleeper(0), deps=["missing"])], executor)
+
+
+def test_fan_out_caps_concurrency_and_returns_partial_results_at_deadline():
+    lock = threading.Lock()
+    active = {"now": 0, "max": 0}
+
+    def call(seconds, fail=False):
+        def run():
+            with lock:
+                active["now"] += 1
+                active["max"] = max(active["max"], active["now"])
+            time.sleep(seconds)
+            with lock:
+                active["now"] -= 1
+            if fail:
+                raise RuntimeError("boom")
+            return seconds
+        return run
+
+    calls = {f"fast{i}": call(0.05) for i in range(4)}
+    calls["bad"] = call(0, fail=True)
+    calls["slow"] = call(2)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        started = time.monotonic()
+        results, errors, unfinished = fan_out(calls, executor, 2, time.monotonic() + 0.5)
+        elapsed = time.monotonic() - started
+
+    assert elapsed < 1.0
+    assert set(results) == {f"fast{i}" for i in range(4)}
+    assert set(errors) == {"bad"} and unfinished == ["slow"]
+    assert active["max"] <= 2
+
+
+
+def test_fan_out_submits_nothing_after_deadline(monkeypatch):
+    clock = {"now": 100.0}
+    monkeypatch.setattr(pipeline, "time", SimpleNamespace(monotonic=lambda: clock["now"], perf_counter=time.perf_counter))
+
+    class CountingExecutor(ThreadPoolExecutor):
+        submitted = 0
+
+        def submit(self, *args, **kwargs):
+            CountingExecutor.submitted += 1
+            return super().submit(*args, **kwargs)
+
+    def call(key):
+        def run():
+            time.sleep(0.05)
+            clock["now"] = 200.0  # 이 호출이 끝날 때 이미 마감 지남
+            return key
+        return run
+
+    with CountingExecutor(max_workers=2) as executor:
+        results, errors, unfinished = fan_out({k: call(k) for k in ("a", "b", "c")}, executor, 1, 150.0)
+    assert CountingExecutor.submitted == 1 and results == {"a": "a"}
+    assert unfinished == ["b", "c"]
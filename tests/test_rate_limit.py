@@ -0,0 +1,149 @@
+"""GoogleScheduler: 토큰 버킷 대기, 백그라운드 예약분, 429/503 백오프 재시도, gspread/Drive 연결"""
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from rate_limit import GoogleScheduler, ScheduledHttp, background_priority, scheduled_http_client
+
+
+def _scheduler(**kwargs):
+    kwargs.setdefault("sleep", lambda s: None)
+    return GoogleScheduler(limits={"sheets": 600, "drive": 600}, **kwargs)
+
+
+def _response(status, headers=None):
+    r = requests.Response()
+    r.status_code = status
+    r._content = json.dumps({"error": {"code": status, "message": "quota", "status": "RESOURCE_EXHAUSTED"}}).encode()
+    r.headers.update(headers or {})
+    return r
+
+
+def test_empty_bucket_waits_for_refill():
+    scheduler = _scheduler()
+    scheduler.buckets["sheets"].tokens = 0  # 600/분 = 0.1초에 1개
+    waited = scheduler.acquire("sheets")
+    assert 0.05 < waited < 0.5
+    assert scheduler.stats()["sheets"]["waits"] == 1
+
+
+def test_background_keeps_reserve_for_interactive():
+    scheduler = _scheduler(reserve=0.5)
+    bucket = scheduler.buckets["sheets"]
+    bucket.tokens = bucket.capacity * 0.4  # reserve(50%) 아래
+
+    done = threading.Event()
+
+    def background_call():
+        with background_priority():
+            scheduler.acquire("sheets")
+        done.set()
+
+    t = threading.Thread(target=background_call, daemon=True)
+    t.start()
+    assert not done.wait(0.2)       # 백그라운드는 대기
+    scheduler.acquire("sheets")     # 요청 처리 호출은 바로 통과
+    bucket.tokens = bucket.capacity
+    assert done.wait(2)
+    assert scheduler.stats()["sheets"]["background_calls"] == 1
+
+
+def test_run_retries_429_with_backoff_and_drains_budget():
+    sleeps = []
+    scheduler = _scheduler(sleep=sleeps.append, retry_max=3)
+    client_cls = scheduled_http_client(scheduler)
+
+    class FakeSession:
+        def __init__(self):
+            self.responses = [_response(429, {"Retry-After": "2"}), _response(503), _response(200)]
+
+        def request(self, **kwargs):
+            return self.responses.pop(0)
+
+    client = client_cls(None, session=FakeSession())
+    assert client.request("get", "https://sheets.googleapis.com/v4/x").status_code == 200
+    assert sleeps[0] == 2.0 and len(sleeps) == 2
+    stats = scheduler.stats()["sheets"]
+    assert stats["retries"] == 2 and stats["throttled"] == 2 and stats["calls"] == 3
+
+
+def test_run_gives_up_after_retry_max():
+    scheduler = _scheduler(retry_max=1)
+    client = scheduled_http_client(scheduler)(None, session=type("S", (), {"request": lambda self, **k: _response(429)})())
+    from gspread.exceptions import APIError
+    with pytest.raises(APIError):
+        client.request("get", "https://sheets.googleapis.com/v4/x")
+
+
+def test_scheduled_httplib2_wrapper_retries_on_status():
+    class Resp(dict):
+        def __init__(self, status):
+            super().__init__()
+            self.status = status
+
+    class FakeHttp:
+        redirect_codes = {301}
+
+        def __init__(self):
+            self.results = [(Resp(503), b""), (Resp(200), b"ok")]
+
+        def request(self, uri, method="GET", **kwargs):
+            return self.results.pop(0)
+
+    http = ScheduledHttp(FakeHttp(), _scheduler())
+    resp, content = http.request("https://www.googleapis.com/drive/v3/files")
+    assert resp.status == 200 and content == b"ok"
+    assert http.redirect_codes == {301}  # 나머지 속성은 감싼 객체로 위임
+
+
+def test_background_wait_is_bounded_under_constant_pressure():
+    scheduler = _scheduler(reserve=0.5, background_max_wait=0.1)
+    bucket = scheduler.buckets["sheets"]
+    bucket.tokens = bucket.capacity * 0.4  # reserve 아래 그대로 → 예약분 조건은 계속 불충족
+    with background_priority():
+        waited = scheduler.acquire("sheets")
+    assert 0.1 <= waited < 1.0
+    assert scheduler.stats()["sheets"]["background_calls"] == 1
+
+
+def test_non_idempotent_calls_retry_429_but_not_503():
+    class FakeSession:
+        def __init__(self, statuses):
+            self.statuses = list(statuses)
+            self.calls = 0
+
+        def request(self, **kwargs):
+            self.calls += 1
+            return _response(self.statuses.pop(0))
+
+    from gspread.exceptions import APIError
+    client_cls = scheduled_http_client(_scheduler())
+    append = FakeSession([503, 200])  # values.append: 503이면 이미 추가됐을 수 있음
+    with pytest.raises(APIError):
+        client_cls(None, session=append).request("post", "https://sheets.googleapis.com/v4/x:append")
+    assert append.calls == 1
+
+    throttled = FakeSession([429, 200])
+    assert client_cls(None, session=throttled).request("post", "https://sheets.googleapis.com/v4/x").status_code == 200
+    assert throttled.calls == 2
+
+
+def test_scheduled_httplib2_wrapper_does_not_retry_post_on_503():
+    class Resp(dict):
+        def __init__(self, status):
+            super().__init__()
+            self.status = status
+
+    class FakeHttp:
+        def __init__(self):
+            self.results = [(Resp(503), b""), (Resp(200), b"ok")]
+
+        def request(self, uri, method="GET", **kwargs):
+            return self.results.pop(0)
+
+    http = ScheduledHttp(FakeHttp(), _scheduler())
+    resp, _ = http.request("https://www.googleapis.com/drive/v3/files/x/copy", method="POST")
+    assert resp.status == 503
@@ -0,0 +1,132 @@
+"""TTL/LRU 캐시와 /search-deals 캐시 (정확 적중, 접두어 재사용, 무효화) / 병렬 호출·마감"""
+import time
+
+import main
+from pipedrive_client import PipedriveClient
+from ttl_cache import TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_and_lru_eviction():
+    clock = _Clock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1   # a가 최근 사용 → 다음 추가 시 b가 제거됨
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("c") == 3
+
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 2
+
+
+class _Resp:
+    status_code = 200
+    headers = {}
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+DEALS = [
+    {"id": 1, "title": "경신이엔피 라이선스", "organization": {"id": 10, "name": "(주)경신 이엔피"}},
+    {"id": 2, "title": "경신전자 유지보수", "organization": {"id": 11, "name": "경신전자"}},
+]
+
+
+class _FakePipedrive:
+    def __init__(self):
+        self.calls = []
+
+    def request(self, method, url, params=None, timeout=None):
+        return self.get(url, params, timeout)
+
+    def get(self, url, params=None, timeout=None):
+        self.calls.append((url.rsplit("/api/v2", 1)[1], params.get("term")))
+        if url.endswith("/deals/search"):
+            qn = main.norm_text(params["term"])
+            return _Resp({"success": True, "data": {"items": [
+                {"item": d} for d in DEALS if qn in main.norm_text(d["title"])]}})
+        return _Resp({"success": True, "data": []})
+
+
+def _install(monkeypatch):
+    fake = _FakePipedrive()
+    monkeypatch.setattr(main, "PIPEDRIVE", PipedriveClient(fake, main.get_pipedrive_config))
+    monkeypatch.setattr(main, "DEAL_SEARCH_CACHE", TTLCache(16, 60))
+    return fake
+
+
+def test_exact_and_prefix_hits_skip_pipedrive(monkeypatch):
+    fake = _install(monkeypatch)
+    assert [d["id"] for d in main.search_deals("경신")["deals"]] == [1, 2]
+    n_calls = len(fake.calls)
+
+    assert [d["id"] for d in main.search_deals("경신")["deals"]] == [1, 2]
+    assert [d["id"] for d in main.search_deals("경신 이엔")["deals"]] == [1]  # "경신" 결과를 로컬 필터링
+    assert len(fake.calls) == n_calls
+    stats = main.DEAL_SEARCH_CACHE.stats()
+    assert stats["hits"] == 1 and stats["prefix_hits"] == 1
+
+
+def test_truncated_result_is_not_reused_for_prefix(monkeypatch):
+    fake = _install(monkeypatch)
+    main.DEAL_SEARCH_CACHE.set("경신", {"deals": [], "complete": False})
+    main.search_deals("경신이")
+    assert ("/deals/search", "경신이") in fake.calls
+
+
+def test_invalidate_by_deal_id(monkeypatch):
+    _install(monkeypatch)
+    main.search_deals("경신")
+    main.search_deals("유지보수")
+    main.invalidate_deal_search_cache("1")
+    assert main.DEAL_SEARCH_CACHE.peek("경신") is None
+    assert main.DEAL_SEARCH_CACHE.peek("유지보수") is not None
+
+
+class _SlowOrgPipedrive(_FakePipedrive):
+    """조직 검색에 두 조직이 걸리고, 그중 한 조직의 거래 목록은 마감보다 오래 걸림"""
+
+    def get(self, url, params=None, timeout=None):
+        if url.endswith("/organizations/search"):
+            self.calls.append(("/organizations/search", params.get("term")))
+            return _Resp({"success": True, "data": {"items": [
+                {"item": {"id": 10, "name": "(주)경신 이엔피"}}, {"item": {"id": 11, "name": "경신전자"}}]}})
+        if url.endswith("/deals") and params.get("org_id"):
+            self.calls.append(("/deals", params["org_id"]))
+            if params["org_id"] == 11:
+                time.sleep(1.5)
+            return _Resp({"success": True, "data": [
+                {"id": 100 + params["org_id"], "title": "조직 거래", "add_time": "2025-03-01 10:00:00"},
+                {"id": 1, "title": DEALS[0]["title"], "add_time": "2025-02-01 09:00:00"}]})
+        return super().get(url, params, timeout)
+
+
+def test_fan_out_shares_org_listing_and_returns_partial_results(monkeypatch):
+    fake = _SlowOrgPipedrive()
+    monkeypatch.setattr(main, "PIPEDRIVE", PipedriveClient(fake, main.get_pipedrive_config))
+    monkeypatch.setattr(main, "DEAL_SEARCH_CACHE", TTLCache(16, 60))
+    monkeypatch.setattr(main, "SEARCH_DEADLINE_SEC", 0.5)
+
+    started = time.monotonic()
+    deals = main.search_deals("경신")["deals"]
+    assert time.monotonic() - started < 1.2
+
+    # 조직 10의 목록은 거래 수집과 add_time 보충에 함께 쓰이고 한 번만 조회됨
+    assert fake.calls.count(("/deals", 10)) == 1
+    by_id = {d["id"]: d for d in deals}
+    assert by_id[110]["add_time"] == "2025-03-01" and by_id[1]["add_time"] == "2025-02-01"
+    assert 2 in by_id and 111 not in by_id   # 마감을 넘긴 조직 11의 목록은 빠짐
+    assert main.DEAL_SEARCH_CACHE.peek("경신")["complete"] is False
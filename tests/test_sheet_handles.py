@@ -0,0 +1,44 @@
+"""SheetHandleCache: 같은 파일은 메타데이터 조회 없이 재사용, 무효화 후 다시 열기"""
+import requests
+from gspread.http_client import HTTPClient
+
+from sheet_handles import SheetHandleCache
+
+
+class FakeSpreadsheet:
+    def __init__(self, file_id, counts):
+        self.id = file_id
+        self.client = HTTPClient(None, session=requests.Session())  # 호출하지 않음
+        self.counts = counts
+
+    def fetch_sheet_metadata(self):
+        self.counts["metadata"] += 1
+        return {"sheets": [{"properties": {"sheetId": 0, "title": "견적서", "index": 0}},
+                           {"properties": {"sheetId": 777, "title": "참고", "index": 1}}]}
+
+
+class FakeClient:
+    def __init__(self):
+        self.counts = {"open": 0, "metadata": 0}
+
+    def open_by_key(self, file_id):
+        self.counts["open"] += 1
+        return FakeSpreadsheet(file_id, self.counts)
+
+
+def test_worksheet_handles_are_reused_until_invalidated():
+    gc = FakeClient()
+    cache = SheetHandleCache(maxsize=8, ttl=600)
+    ws = cache.worksheet(gc, "file-1")
+    assert (ws.id, ws.title) == (0, "견적서")
+    assert cache.worksheet(gc, "file-1") is ws
+    assert cache.gids(gc, "file-1") == {"견적서": 0, "참고": 777}
+    assert gc.counts == {"open": 1, "metadata": 1}
+
+    cache.worksheet(gc, "file-2")
+    assert gc.counts["open"] == 2
+
+    assert cache.invalidate("file-1") == 2  # Spreadsheet + 워크시트 목록
+    cache.worksheet(gc, "file-1", index=1)
+    assert gc.counts == {"open": 3, "metadata": 3}
+    assert cache.stats()["hits"] >= 2
@@ -0,0 +1,91 @@
+"""/estimate 시트 쓰기: batchUpdate 1회로 제목·값·포맷·병합해제 전송"""
+import gspread
+import pytest
+
+import main
+from sheets_batch import build_estimate_requests, send_estimate_batch
+
+
+class _FakeResponse:
+    def __init__(self, status, message):
+        self.status_code = status
+        self.text = message
+
+    def json(self):
+        return {"error": {"code": self.status_code, "message": self.text, "status": "INVALID_ARGUMENT"}}
+
+
+class _FakeHttpClient:
+    def __init__(self, fail_with=None):
+        self.calls = []
+        self.fail_with = list(fail_with or [])
+
+    def batch_update(self, file_id, body):
+        self.calls.append((file_id, body))
+        if self.fail_with:
+            raise gspread.exceptions.APIError(_FakeResponse(400, self.fail_with.pop(0)))
+        return {"replies": []}
+
+    def fetch_sheet_metadata(self, file_id, params=None):
+        return {"sheets": [{"properties": {"sheetId": 777}}]}
+
+
+class _FakeClient:
+    def __init__(self, http_client):
+        self.http_client = http_client
+
+    def open_by_key(self, key):
+        raise AssertionError("batchUpdate 경로에서는 스프레드시트를 열지 않아야 함")
+
+
+def test_build_requests_covers_title_values_wrap_unmerge():
+    requests = build_estimate_requests(
+        0,
+        [{"range": "F6", "values": [["DLP250101-A-1"]]}, {"range": "D16", "values": [[3]]}, {"range": "G16", "values": [[""]]}],
+        title="DLP250101-A-1",
+        wrap_cells=["C16"],
+        unmerge_cells=["B47"],
+    )
+    kinds = [next(iter(r)) for r in requests]
+    assert kinds == ["updateSpreadsheetProperties", "updateCells", "updateCells", "updateCells", "repeatCell", "unmergeCells"]
+    assert requests[1]["updateCells"]["range"] == {
+        "sheetId": 0, "startRowIndex": 5, "endRowIndex": 6, "startColumnIndex": 5, "endColumnIndex": 6,
+    }
+    assert requests[1]["updateCells"]["rows"] == [{"values": [{"userEnteredValue": {"stringValue": "DLP250101-A-1"}}]}]
+    assert requests[2]["updateCells"]["rows"] == [{"values": [{"userEnteredValue": {"numberValue": 3}}]}]
+    assert requests[3]["updateCells"]["rows"] == [{"values": [{}]}]  # 빈 값 → 셀 비움
+
+
+def test_merge_error_is_retried_without_unmerge():
+    http = _FakeHttpClient(fail_with=["You must select all cells in a merged range to merge or unmerge them."])
+    send_estimate_batch(_FakeClient(http), "file", 0, [{"range": "F6", "values": [["x"]]}], unmerge_cells=["B47"])
+    assert len(http.calls) == 2
+    assert not any("unmergeCells" in r for r in http.calls[1][1]["requests"])
+
+
+def test_unknown_grid_id_is_retried_with_actual_sheet_id():
+    http = _FakeHttpClient(fail_with=["Invalid requests[0].updateCells: No grid with id: 0"])
+    send_estimate_batch(_FakeClient(http), "file", 0, [{"range": "F6", "values": [["x"]]}])
+    assert http.calls[1][1]["requests"][0]["updateCells"]["range"]["sheetId"] == 777
+
+
+def test_other_errors_propagate():
+    http = _FakeHttpClient(fail_with=["The caller does not have permission"])
+    with pytest.raises(gspread.exceptions.APIError):
+        send_estimate_batch(_FakeClient(http), "file", 0, [{"range": "F6", "values": [["x"]]}])
+
+
+def test_fill_estimate_makes_single_sheets_call(monkeypatch):
+    http = _FakeHttpClient()
+    monkeypatch.setattr(main, "get_google_clients", lambda: (object(), _FakeClient(http), object()))
+    result = main._fill_estimate_sync({
+        "fileId": "sheet-1",
+        "estimate_number": "DLP250101-A-1",
+        "supplier_person": "차재원",
+        "products": [{"name": "제품", "detail": "a<br>b", "qty": 1, "price": 10, "total": 10}],
+    })
+    assert result == {"status": "success"}
+    assert len(http.calls) == 1
+    kinds = [next(iter(r)) for r in http.calls[0][1]["requests"]]
+    assert kinds[0] == "updateSpreadsheetProperties"
+    assert kinds.count("repeatCell") == 10 and kinds[-1] == "unmergeCells"
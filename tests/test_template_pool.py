@@ -0,0 +1,99 @@
+"""템플릿 풀: 워터마크 보충, 즉시 배포, 파일명 지연 변경, 템플릿 변경 시 재생성"""
+from template_pool import TemplatePool
+
+
+class _FakeDrive:
+    def __init__(self):
+        self.version = "1"
+        self.files = {}
+        self.deleted = []
+
+    def copy(self, name):
+        file_id = f"copy-{len(self.files) + len(self.deleted)}"
+        self.files[file_id] = name
+        return file_id, f"https://docs/{file_id}"
+
+    def delete(self, file_id):
+        self.files.pop(file_id)
+        self.deleted.append(file_id)
+
+
+def _pool(tmp_path, drive, low=2, high=4):
+    return TemplatePool(drive.copy, lambda: drive.version, drive.delete,
+                        low=low, high=high, db_path=str(tmp_path / "state.db"))
+
+
+def test_refill_to_high_watermark_and_hand_out(tmp_path):
+    drive = _FakeDrive()
+    pool = _pool(tmp_path, drive)
+    pool.refill()
+    assert pool.status()["ready"] == 4
+
+    claimed = pool.acquire("견적서_DLP_250101_090000")
+    assert claimed["file_id"] in drive.files
+    assert pool.status() == {**pool.status(), "ready": 3, "claimed": 1}
+
+    # low(2) 이상이면 보충하지 않음
+    pool.refill()
+    assert pool.status()["ready"] == 3
+
+    # 첫 /estimate에서 파일명 적용 후 풀에서 제거, 두 번째는 None
+    assert pool.take_pending_title(claimed["file_id"]) == "견적서_DLP_250101_090000"
+    assert pool.take_pending_title(claimed["file_id"]) is None
+
+
+def test_refills_when_below_low_watermark(tmp_path):
+    drive = _FakeDrive()
+    pool = _pool(tmp_path, drive)
+    pool.refill()
+    handed_out = {pool.acquire(f"t{i}")["file_id"] for i in range(3)}
+    assert len(handed_out) == 3
+    pool.refill()
+    assert pool.status()["ready"] == 4
+
+
+def test_template_change_recycles_stale_copies(tmp_path):
+    drive = _FakeDrive()
+    pool = _pool(tmp_path, drive)
+    pool.refill()
+    old_ids = set(drive.files)
+
+    drive.version = "2"
+    pool.refill()
+    assert set(drive.deleted) == old_ids
+    assert pool.status()["ready"] == 4
+    assert pool.acquire("t")["file_id"] not in old_ids
+
+
+def test_disabled_or_unknown_version_falls_back_to_copy(tmp_path):
+    drive = _FakeDrive()
+    assert _pool(tmp_path, drive, high=0).acquire("t") is None
+    assert _pool(tmp_path, drive).acquire("t") is None  # 버전 확인 전
+    assert _pool(tmp_path, drive).take_pending_title("not-pooled") is None
+
+
+def test_stale_copy_claimed_by_another_worker_is_not_deleted(tmp_path):
+    drive = _FakeDrive()
+    pool = _pool(tmp_path, drive, low=1, high=1)
+    pool.refill()
+    (old_id,) = drive.files
+    other = _pool(tmp_path, drive, low=1, high=1)
+    other._version = "1"  # 아직 새 버전을 모르는 다른 워커
+
+    class _Interleave:
+        """정리 DELETE 직전에 다른 워커가 같은 복사본을 배포"""
+
+        def __init__(self, conn):
+            self.conn = conn
+
+        def execute(self, sql, *args):
+            if sql.startswith("DELETE FROM template_pool WHERE file_id"):
+                assert other.acquire("t")["file_id"] == old_id
+            return self.conn.execute(sql, *args)
+
+    real_conn = pool._conn
+    pool._conn = lambda: _Interleave(real_conn())
+    drive.version = "2"
+    pool.refill()
+    assert old_id in drive.files and old_id not in drive.deleted
+    assert other.take_pending_title(old_id) == "t"
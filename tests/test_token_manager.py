@@ -0,0 +1,77 @@
+"""TokenManager: 동시 갱신 합치기, 만료 margin 전 미리 갱신, 지표"""
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+
+from token_manager import TokenManager, _utcnow
+
+
+class FakeCreds:
+    def __init__(self, lifetime=3600, delay=0.05, fail=False):
+        self.token = None
+        self.expiry = None
+        self.lifetime = lifetime
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def refresh(self, request):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("invalid_grant")
+        self.token = f"t{self.calls}"
+        self.expiry = _utcnow() + timedelta(seconds=self.lifetime)
+
+
+def test_concurrent_callers_share_one_refresh():
+    creds = FakeCreds()
+    manager = TokenManager(lambda: creds, request_factory=object, refresh_margin=600)
+    barrier = threading.Barrier(8)
+    results = []
+
+    def call():
+        barrier.wait()
+        results.append(manager.credentials().token)
+
+    threads = [threading.Thread(target=call) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert creds.calls == 1
+    assert results == ["t1"] * 8
+    stats = manager.stats()
+    assert stats["refreshes"] == 1 and stats["last_latency_ms"] >= 50
+    assert stats["expires_in_sec"] > 3500
+
+
+def test_refresh_only_inside_margin_unless_forced():
+    creds = FakeCreds(lifetime=3600, delay=0)
+    manager = TokenManager(lambda: creds, request_factory=object, refresh_margin=600)
+    manager.refresh()
+    manager.refresh()  # 아직 유효 → 그대로
+    assert creds.calls == 1
+    creds.expiry = _utcnow() + timedelta(seconds=300)  # margin 안쪽 → 백그라운드 갱신 대상
+    manager.refresh()
+    assert creds.calls == 2
+    manager.credentials()  # 유효한 토큰이면 요청 경로에서 갱신하지 않음
+    assert manager.stats()["inline_refreshes"] == 0
+    manager.refresh(force=True)
+    assert creds.calls == 3
+
+
+def test_failure_is_counted_and_raised():
+    creds = FakeCreds(delay=0, fail=True)
+    manager = TokenManager(lambda: creds, request_factory=object)
+    with pytest.raises(RuntimeError):
+        manager.credentials()
+    stats = manager.stats()
+    assert stats["failures"] == 1 and "invalid_grant" in stats["last_error"]
+
+
+def test_missing_credentials_raise():
+    with pytest.raises(RuntimeError, match="로드 실패"):
+        TokenManager(lambda: None).credentials()
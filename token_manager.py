@@ -0,0 +1,142 @@
+"""Google 액세스 토큰 관리 (만료 전 백그라운드 갱신 + 동시 갱신 합치기)
+
+예전 get_google_clients는 만료를 처음 발견한 요청이 그 자리에서 refresh했고 잠금이 없어,
+스레드풀에서 동시에 도는 핸들러(search_deals, load_estimate, estimate_history 등)가 같이 refresh할 수 있었다.
+
+- 백그라운드 스레드가 만료 refresh_margin초 전에 미리 갱신 → 요청 경로는 항상 유효한 토큰을 받음
+  (margin은 google-auth 자체 갱신 기준 3분 45초보다 커야 gspread/Drive 전송 계층이 요청 중 refresh하지 않음)
+- refresh()는 single-flight: 갱신 중에 들어온 호출은 그 결과를 기다렸다가 그대로 사용
+- 자격증명 객체는 하나를 제자리 갱신 → gspread·Drive 클라이언트를 다시 만들 필요 없음
+- stats(): 갱신 횟수/실패/합쳐진 호출/요청 경로 갱신 수, 갱신 지연(ms), 남은 유효 시간
+"""
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+from config import GOOGLE_TOKEN_REFRESH_MARGIN_SEC, GOOGLE_TOKEN_RETRY_SEC
+
+log = logging.getLogger(__name__)
+
+
+def _utcnow():
+    # google-auth의 expiry는 timezone 없는 UTC
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class TokenManager:
+    """credentials_factory() -> 토큰 없는 google.auth 자격증명 (없으면 None)"""
+
+    def __init__(self, credentials_factory, request_factory=None,
+                 refresh_margin=GOOGLE_TOKEN_REFRESH_MARGIN_SEC, retry_interval=GOOGLE_TOKEN_RETRY_SEC):
+        self.credentials_factory = credentials_factory
+        self.request_factory = request_factory
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self._creds = None
+        self._creds_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._generation = 0          # 성공한 갱신 수 (합치기 판단용)
+        self._thread = None
+        self.refreshes = 0
+        self.failures = 0
+        self.coalesced = 0
+        self.inline_refreshes = 0
+        self.last_error = None
+        self.last_refresh_at = None
+        self._latencies = deque(maxlen=100)
+
+    def _get_creds(self):
+        if self._creds is None:
+            with self._creds_lock:
+                if self._creds is None:
+                    creds = self.credentials_factory()
+                    if not creds:
+                        raise RuntimeError("Google credentials 로드 실패")
+                    self._creds = creds
+                    log.info("✅ [토큰] Google credentials 생성 완료")
+        return self._creds
+
+    def expires_in(self):
+        """남은 유효 시간(초). 토큰이 없으면 None, 만료 시각이 없는 토큰이면 inf"""
+        creds = self._creds
+        if creds is None or not getattr(creds, "token", None):
+            return None
+        if creds.expiry is None:
+            return float("inf")
+        return (creds.expiry - _utcnow()).total_seconds()
+
+    def _needs_refresh(self, margin):
+        remaining = self.expires_in()
+        return remaining is None or remaining <= margin
+
+    def credentials(self):
+        """유효한 토큰을 가진 자격증명. 토큰이 없거나 만료됐을 때만 요청 경로에서 갱신 (백그라운드가 아직 못 한 경우)"""
+        creds = self._get_creds()
+        if self._needs_refresh(0):
+            self.inline_refreshes += 1
+            self.refresh()
+        return creds
+
+    def refresh(self, force=False):
+        """토큰 갱신 (single-flight). force=False면 만료 margin 안쪽일 때만. 실패하면 예외"""
+        creds = self._get_creds()
+        generation = self._generation
+        with self._refresh_lock:
+            if self._generation != generation:
+                # 기다리는 동안 다른 스레드가 갱신 완료 → 그 토큰 사용
+                self.coalesced += 1
+                return creds
+            if not force and not self._needs_refresh(self.refresh_margin):
+                return creds
+            started = time.perf_counter()
+            try:
+                if self.request_factory is None:
+                    from google.auth.transport.requests import Request
+                    self.request_factory = Request
+                creds.refresh(self.request_factory())
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                log.warning(f"⚠️ [토큰] Google 토큰 갱신 실패: {e}")
+                raise
+            self._latencies.append((time.perf_counter() - started) * 1000)
+            self.refreshes += 1
+            self.last_error = None
+            self.last_refresh_at = time.time()
+            self._generation += 1
+        return creds
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="google-token", daemon=True)
+        self._thread.start()
+
+    def _loop(self):
+        while True:
+            try:
+                self.refresh()
+                remaining = self.expires_in()
+                wait = max(remaining - self.refresh_margin, 1) if remaining is not None else self.retry_interval
+            except Exception:
+                wait = self.retry_interval
+            # 다른 스레드가 먼저 갱신했으면 일찍 깨어나도 refresh()가 아무것도 안 함
+            time.sleep(min(wait, 24 * 3600))
+
+    def stats(self):
+        latencies = list(self._latencies)
+        remaining = self.expires_in()
+        return {
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "coalesced": self.coalesced,
+            "inline_refreshes": self.inline_refreshes,
+            "last_latency_ms": round(latencies[-1], 1) if latencies else None,
+            "avg_latency_ms": round(sum(latencies) / len(latencies), 1) if latencies else None,
+            "max_latency_ms": round(max(latencies), 1) if latencies else None,
+            "expires_in_sec": None if remaining is None or remaining == float("inf") else int(remaining),
+            "last_refresh_at": self.last_refresh_at,
+            "last_error": self.last_error,
+        }
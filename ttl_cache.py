@@ -0,0 +1,93 @@
+"""TTL + LRU 메모리 캐시 (워커 프로세스 단위)
+
+항목마다 만료 시각을 두고, 최대 개수를 넘으면 가장 오래 사용하지 않은 항목부터 제거한다.
+적중/실패 횟수를 세어 /cache-stats로 확인할 수 있다.
+"""
+import threading
+import time
+from collections import Counter, OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize, ttl, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (만료 시각, 값), 뒤쪽이 최근 사용
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.counters = Counter()   # 사용하는 쪽에서 추가로 세는 값 (예: prefix_hits)
+
+    def _lookup(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        expires, value = entry
+        if expires <= self._clock():
+            del self._data[key]
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        """값 조회 (적중/실패 집계)"""
+        with self._lock:
+            value = self._lookup(key)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def peek(self, key, default=None):
+        """집계 없이 조회 (다른 키로 대체 응답이 가능한지 살필 때)"""
+        with self._lock:
+            value = self._lookup(key)
+            return default if value is _MISSING else value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            entry = self._data.pop(key, None)
+            return None if entry is None else entry[1]
+
+    def invalidate(self, predicate=None):
+        """predicate(key, value)가 참인 항목 제거 (None이면 전체). 제거한 개수 반환"""
+        with self._lock:
+            if predicate is None:
+                n = len(self._data)
+                self._data.clear()
+                return n
+            doomed = [k for k, (_, v) in self._data.items() if predicate(k, v)]
+            for k in doomed:
+                del self._data[k]
+            return len(doomed)
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_sec": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else None,
+                **self.counters,
+            }